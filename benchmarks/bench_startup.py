@@ -0,0 +1,87 @@
+"""
+Mede o tempo de inicialização das invocações curtas
+
+Cada comando roda em um processo novo (o custo de import não fica em
+cache entre execuções). Também informa se pandas/selenium/bs4 chegaram a
+ser importados, o que indica uma dependência pesada carregada cedo demais,
+e quais submódulos de ons_powerbi foram carregados: 'import ons_powerbi'
+e --help não devem carregar nenhum (o script sai com código 1 se carregarem).
+
+Uso:
+    python benchmarks/bench_startup.py [repetições]
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ('pandas', 'selenium', 'bs4', 'requests')
+
+# Executa o comando e, ao sair, imprime os módulos pesados e os submódulos que foram importados
+_PROBE = """
+import atexit, sys
+atexit.register(lambda: sys.stderr.write('HEAVY=' + ','.join(
+    m for m in {heavy!r} if m in sys.modules) + '\\n'))
+atexit.register(lambda: sys.stderr.write('SUBMODULES=' + ','.join(sorted(
+    m.split('.', 1)[1] for m in sys.modules
+    if m.startswith('ons_powerbi.') and m != 'ons_powerbi._lazy')) + '\\n'))
+sys.argv = {argv!r}
+{body}
+"""
+
+# (rótulo, argv, código, deve rodar sem carregar submódulos)
+COMMANDS = [
+    ("import ons_powerbi", [], "import ons_powerbi", True),
+    ("import ons_powerbi.browser", [], "import ons_powerbi.browser", False),
+    ("direct --help", ['scrape_ons_powerbi_direct.py', '--help'],
+     "import runpy; runpy.run_path('scrape_ons_powerbi_direct.py', run_name='__main__')", True),
+    ("direct --status", ['scrape_ons_powerbi_direct.py', '--status'],
+     "import runpy; runpy.run_path('scrape_ons_powerbi_direct.py', run_name='__main__')", False),
+]
+
+
+def time_command(argv, body, repeat):
+    """Executa o comando 'repeat' vezes e retorna (tempos em ms, módulos pesados, submódulos carregados)"""
+    code = _PROBE.format(heavy=HEAVY_MODULES, argv=argv or ['-c'], body=body)
+    timings = []
+    heavy = submodules = ''
+    for _ in range(repeat):
+        start = time.perf_counter()
+        completed = subprocess.run([sys.executable, '-c', code], cwd=ROOT,
+                                   capture_output=True, text=True)
+        timings.append((time.perf_counter() - start) * 1000)
+        for line in completed.stderr.splitlines():
+            if line.startswith('HEAVY='):
+                heavy = line[len('HEAVY='):]
+            elif line.startswith('SUBMODULES='):
+                submodules = line[len('SUBMODULES='):]
+    return timings, heavy, submodules
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    repeat = int(argv[0]) if argv else 10
+
+    baseline, _, _ = time_command([], "pass", repeat)
+    print(f"Interpretador vazio: mediana {statistics.median(baseline):.0f} ms\n")
+
+    print(f"{'comando':<28}{'mediana':>10}{'mín':>10}  {'pesados importados':<20}submódulos carregados")
+    flagged = []
+    for label, command_argv, body, lean in COMMANDS:
+        timings, heavy, submodules = time_command(command_argv, body, repeat)
+        print(f"{label:<28}{statistics.median(timings):>8.0f}ms{min(timings):>8.0f}ms  "
+              f"{heavy or '-':<20}{submodules or '-'}")
+        if lean and submodules:
+            flagged.append((label, submodules))
+
+    for label, submodules in flagged:
+        print(f"\n⚠️  '{label}' carregou submódulos que não usa: {submodules}")
+    return 1 if flagged else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,50 @@
+"""
+Compara duas extrações e lista os valores inseridos, removidos e revisados
+
+Uso:
+    python diff_outputs.py <extração_anterior> <extração_nova> [--output mudancas.csv]
+
+Cada extração pode ser o *_ALL_SERIES_CONSOLIDATED.csv ou a pasta de
+saída que o contém. Ver ons_powerbi/diff.py.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+from ons_powerbi import diff
+
+
+def main(argv=None):
+    """Compara as extrações informadas na linha de comando"""
+    parser = argparse.ArgumentParser(description="Diferenças entre duas extrações do Power BI da ONS")
+    parser.add_argument('old', help="Extração anterior (CSV consolidado ou pasta)")
+    parser.add_argument('new', help="Extração nova (CSV consolidado ou pasta)")
+    parser.add_argument('--output', help="CSV das mudanças (padrão: ALL_SERIES_DIFF.csv ao lado da extração nova)")
+    parser.add_argument('--partitions', type=int, default=diff.DEFAULT_PARTITIONS, help="Partições por hash")
+    parser.add_argument('--workers', type=int, default=diff.DEFAULT_WORKERS, help="Partições comparadas em paralelo")
+    parser.add_argument('--tolerance', type=float, default=diff.DEFAULT_TOLERANCE,
+                        help="Diferença absoluta considerada igual")
+    args = parser.parse_args(argv)
+
+    start_time = time.time()
+    changes, stats = diff.diff_outputs(args.old, args.new, partitions=args.partitions,
+                                       workers=args.workers, tolerance=args.tolerance)
+    elapsed = time.time() - start_time
+
+    print(f"📊 {stats['old_rows']} → {stats['new_rows']} ponto(s) em {elapsed:.2f}s")
+    print(f"  • Partições idênticas (puladas): {stats['identical_partitions']} de {stats['partitions']}")
+    print(f"  • Inseridos: {stats['inserted']}")
+    print(f"  • Removidos: {stats['deleted']}")
+    print(f"  • Revisados: {stats['revised']}")
+
+    output = args.output or os.path.join(os.path.dirname(diff.find_consolidated_file(args.new)),
+                                         "ALL_SERIES_DIFF.csv")
+    changes.to_csv(output, index=False, encoding='utf-8-sig')
+    print(f"\n✓ {output} - {len(changes)} mudança(s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,237 @@
+"""
+Executor de múltiplos dashboards a partir de um arquivo de jobs
+
+O arquivo (JSON, ou YAML se o PyYAML estiver instalado) declara os
+dashboards, páginas, intervalos de datas e seletores. Os jobs rodam em
+um pool de threads compartilhado, com limite de concorrência por host.
+
+Exemplo (ver jobs.example.json):
+
+    {
+        "max_workers": 4,
+        "per_host_limit": {"default": 2, "app.powerbi.com": 3},
+        "defaults": {"start_date": "01/10/2021", "headless": true},
+        "dashboards": [
+            {"name": "curtailment",
+             "page_url": "https://www.ons.org.br/Paginas/faq_curtailment.aspx",
+             "pages": "1-3",
+             "slicer_filters": {"Subsistema": "all"}}
+        ]
+    }
+
+Uso:
+    python jobs.py jobs.json
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from urllib.parse import urlparse
+
+import scrape_ons_powerbi_direct as direct
+from ons_powerbi import log
+from ons_powerbi._lazy import is_available, lazy_import
+
+
+# PyYAML é opcional e só é importado para arquivos .yaml/.yml
+yaml = lazy_import('yaml')
+
+
+DEFAULT_OUTPUT_ROOT = "extracao_powerbi"
+DEFAULT_MAX_WORKERS = 2
+DEFAULT_PER_HOST_LIMIT = 2
+
+# Campos do job repassados diretamente para run_extraction()
+_EXTRACTION_FIELDS = (
+    'page_url', 'embed_url', 'start_date', 'end_date', 'max_pages',
+    'target_class', 'additional_selectors', 'prefix', 'store_path', 'headless',
+    'window_days', 'workers', 'incremental', 'json_format', 'json_compression',
+    'strategies', 'slicer_filters', 'sync_groups', 'max_retries', 'unit_timeout',
+    'queue', 'queue_name', 'reopen_queue', 'browser_contexts', 'memory_limits', 'timings_path', 'timeout_margin',
+    'artifact_mode', 'artifact_options', 'writer_workers',
+)
+
+
+def load_job_file(path):
+    """Lê o arquivo de jobs (JSON ou YAML) e retorna o dicionário de configuração"""
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.lower().endswith(('.yaml', '.yml')):
+            if not is_available('yaml'):
+                raise RuntimeError("Arquivos YAML requerem o pacote PyYAML (pip install pyyaml)")
+            config = yaml.safe_load(f)
+        else:
+            config = json.load(f)
+
+    if not isinstance(config, dict) or not isinstance(config.get('dashboards'), list):
+        raise ValueError(f"Arquivo de jobs inválido: {path} (esperado objeto com lista 'dashboards')")
+    return config
+
+
+def expand_jobs(config):
+    """
+    Combina 'defaults' com cada dashboard e normaliza os campos
+
+    Cada dashboard pode listar 'date_ranges' ([[início, fim], ...]); nesse
+    caso é gerado um job por intervalo.
+    """
+    defaults = config.get('defaults', {})
+    jobs = []
+
+    for index, dashboard in enumerate(config['dashboards']):
+        merged = dict(defaults)
+        merged.update(dashboard)
+
+        if not merged.get('page_url') and not merged.get('embed_url'):
+            raise ValueError(f"Dashboard {index + 1}: informe 'page_url' ou 'embed_url'")
+
+        name = merged.get('name') or f"dashboard_{index + 1}"
+        mode, target_pages = direct.parse_page_spec(merged.get('pages', 'all'))
+
+        date_ranges = merged.get('date_ranges') or [[merged.get('start_date'), merged.get('end_date')]]
+        for range_index, (start_date, end_date) in enumerate(date_ranges):
+            job = {field: merged[field] for field in _EXTRACTION_FIELDS if field in merged}
+            job.update({
+                'name': name if len(date_ranges) == 1 else f"{name}_{range_index + 1}",
+                'mode': mode,
+                'target_pages': target_pages,
+                'start_date': start_date,
+                'end_date': end_date,
+            })
+            job.setdefault('prefix', f"ons_powerbi_{name}")
+            jobs.append(job)
+
+    return jobs
+
+
+def job_hosts(job):
+    """Hosts acessados por um job (página da ONS e/ou embed do Power BI)"""
+    hosts = set()
+    for key in ('page_url', 'embed_url'):
+        if job.get(key):
+            hosts.add(urlparse(job[key]).netloc.lower())
+    if not job.get('embed_url'):
+        # O iframe encontrado na página sempre aponta para o Power BI
+        hosts.add('app.powerbi.com')
+    return sorted(hosts)
+
+
+def _make_host_limiter(per_host_limit):
+    """Cria semáforos por host sob demanda, respeitando os limites configurados"""
+    if isinstance(per_host_limit, int):
+        per_host_limit = {'default': per_host_limit}
+    default_limit = per_host_limit.get('default', DEFAULT_PER_HOST_LIMIT)
+
+    semaphores = {}
+    lock = threading.Lock()
+
+    def semaphore_for(host):
+        with lock:
+            if host not in semaphores:
+                semaphores[host] = threading.BoundedSemaphore(per_host_limit.get(host, default_limit))
+            return semaphores[host]
+
+    return semaphore_for
+
+
+def run_job(job, output_root, semaphore_for, run_stamp):
+    """
+    Executa um job respeitando o limite de cada host envolvido
+
+    Os arquivos vão para output_root/<job>/<run_stamp>: cada execução do
+    arquivo de jobs tem a sua pasta, sem sobrescrever as anteriores.
+    """
+    hosts = job_hosts(job)
+    # Ordem fixa de aquisição evita deadlock entre jobs que compartilham hosts
+    acquired = []
+    start_time = time.time()
+    summary = {'name': job['name'], 'status': 'error', 'output_folder': None,
+               'saved_files': [], 'pages': 0, 'error': None}
+
+    try:
+        for host in hosts:
+            semaphore = semaphore_for(host)
+            semaphore.acquire()
+            acquired.append(semaphore)
+
+        output_folder = os.path.join(output_root, job['name'], run_stamp)
+        kwargs = {key: value for key, value in job.items() if key != 'name'}
+        result = direct.run_extraction(output_folder=output_folder, **kwargs)
+
+        summary['output_folder'] = output_folder
+        if result and result['data'] and result['data'].get('pages'):
+            summary['status'] = 'ok'
+            summary['pages'] = len(result['data']['pages'])
+            summary['saved_files'] = result['saved_files']
+            summary['timings'] = result.get('timings', {})
+        else:
+            summary['status'] = 'empty'
+
+    except Exception as e:
+        summary['error'] = f"{type(e).__name__}: {e}"
+
+    finally:
+        for semaphore in reversed(acquired):
+            semaphore.release()
+        summary['seconds'] = round(time.time() - start_time, 1)
+
+    return summary
+
+
+def run_jobs(config, output_root=DEFAULT_OUTPUT_ROOT):
+    """
+    Executa todos os jobs do arquivo de configuração em um pool compartilhado
+
+    Returns:
+        Lista com o resumo de cada job (nome, status, arquivos, erro, duração)
+    """
+    jobs = expand_jobs(config)
+    max_workers = config.get('max_workers', DEFAULT_MAX_WORKERS)
+    semaphore_for = _make_host_limiter(config.get('per_host_limit', DEFAULT_PER_HOST_LIMIT))
+    run_stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+
+    print("="*70)
+    print(f"  EXECUTANDO {len(jobs)} JOB(S) - {max_workers} worker(s)")
+    print("="*70)
+
+    summaries = []
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ons-job") as executor:
+        futures = {executor.submit(run_job, job, output_root, semaphore_for, run_stamp): job for job in jobs}
+        for future in as_completed(futures):
+            summary = future.result()
+            summaries.append(summary)
+            icon = {'ok': '✅', 'empty': '⚠️ '}.get(summary['status'], '❌')
+            print(f"\n{icon} Job '{summary['name']}': {summary['status']} "
+                  f"({summary['pages']} página(s), {summary['seconds']}s)")
+            if summary['error']:
+                print(f"   Erro: {summary['error']}")
+
+    if not os.path.exists(output_root):
+        os.makedirs(output_root)
+    summary_file = os.path.join(output_root, f"jobs_summary_{run_stamp}.json")
+    with open(summary_file, 'w', encoding='utf-8') as f:
+        json.dump(summaries, f, indent=2, ensure_ascii=False)
+    print(f"\n📄 Resumo dos jobs: {summary_file}")
+
+    return summaries
+
+
+def main(argv=None):
+    """Executa o arquivo de jobs informado na linha de comando"""
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        print("Uso: python jobs.py <arquivo_de_jobs.json|.yaml>")
+        return 2
+
+    # Execução em lote: sem prévias das séries no console
+    log.configure(previews=False)
+    config = load_job_file(argv[0])
+    summaries = run_jobs(config, output_root=config.get('output_root', DEFAULT_OUTPUT_ROOT))
+    return 0 if all(summary['status'] == 'ok' for summary in summaries) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+"""
+Biblioteca compartilhada dos extratores do Power BI da ONS
+
+Submódulos:
+    browser          - inicialização do Chrome e espera pelo Power BI
+    output           - pastas de saída
+    discovery        - descoberta da URL do Power BI via HTTP (com cache)
+    scheduler        - unidades de trabalho com retry/backoff
+    network_observer - captura filtrada das requisições de rede
+    json_export      - serialização JSON/JSONL compacta
+    excel_export     - exportação Excel em fluxo
+    store            - banco SQLite local
+    value_parsing    - datas e valores a partir dos textos do Power BI
+    geometry         - valores reconstruídos da geometria SVG dos gráficos
+    tooltips         - coleta em lote dos tooltips (eventos sintéticos)
+    show_data        - dados completos via "Exportar dados" / "Mostrar como tabela"
+    slicers          - descoberta dos slicers e combinações de filtros
+    filter_state     - estado dos filtros por sessão (evita reaplicar slicers)
+    work_queue       - fila compartilhada para dividir a extração entre máquinas
+    browser_pool     - contextos isolados em um único Chrome (sessões paralelas)
+    memory_watchdog  - vigia de memória que recicla sessões do navegador
+    rollups          - agregados pré-calculados por hora/dia/mês/ano, por série e por dimensão
+    read_api         - API HTTP local de leitura das séries (índice em memória)
+    diff             - valores inseridos/removidos/revisados entre duas extrações
+    log              - log estruturado (JSON Lines), modo silencioso e prévias sob demanda
+    page_buffer      - leitura em fatias de resultados grandes montados na página
+    timings          - timeouts adaptativos a partir do histórico de tempos de carregamento
+    artifacts        - screenshots/HTML de diagnóstico em segundo plano (comprimidos, sem repetição)
+    writers          - escrita paralela dos arquivos de saída, com manifesto
+
+Os submódulos e as dependências pesadas (pandas, selenium, bs4) são
+carregados sob demanda: 'import ons_powerbi' é praticamente instantâneo.
+"""
+
+import importlib
+
+
+_SUBMODULES = {
+    'browser', 'output', 'discovery', 'scheduler', 'network_observer',
+    'json_export', 'excel_export', 'store', 'value_parsing', 'geometry',
+    'tooltips', 'show_data', 'slicers', 'filter_state',
+    'work_queue', 'browser_pool', 'memory_watchdog',
+    'rollups', 'read_api', 'diff', 'log', 'page_buffer', 'timings',
+    'artifacts', 'writers',
+}
+
+# Funções reexportadas no nível do pacote -> submódulo de origem
+_EXPORTS = {
+    'setup_driver': 'browser',
+    'wait_for_powerbi_load': 'browser',
+    'wait_for_powerbi_iframe': 'browser',
+    'create_output_folder': 'output',
+}
+
+__all__ = sorted(_SUBMODULES | set(_EXPORTS))
+
+
+def __getattr__(name):
+    if name in _SUBMODULES:
+        return importlib.import_module(f"{__name__}.{name}")
+    if name in _EXPORTS:
+        module = importlib.import_module(f"{__name__}.{_EXPORTS[name]}")
+        return getattr(module, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return __all__
@@ -0,0 +1,106 @@
+"""
+Importação preguiçosa das dependências pesadas (pandas, selenium, bs4...)
+
+Os módulos só são importados no primeiro acesso a um atributo, de modo
+que invocações curtas (cache, consultas de status, --help) não pagam o
+custo de carregar bibliotecas que não vão usar.
+
+Uso:
+    pd = lazy_import('pandas')
+    By = lazy_attribute('selenium.webdriver.common.by', 'By')
+    timeout = resolve(timeout)  # padrão vindo de lazy_attribute()
+
+Classes usadas em 'except' precisam ser reais; acesse-as pelo módulo
+preguiçoso (ex.: except selenium_exceptions.TimeoutException).
+"""
+
+import importlib
+import importlib.util
+import threading
+
+
+_import_lock = threading.Lock()
+
+
+class _LazyModule:
+    """Representa um módulo que só é importado no primeiro acesso"""
+
+    def __init__(self, name):
+        self.__dict__['_lazy_name'] = name
+        self.__dict__['_lazy_module'] = None
+
+    def _lazy_load(self):
+        module = self.__dict__['_lazy_module']
+        if module is None:
+            with _import_lock:
+                module = self.__dict__['_lazy_module']
+                if module is None:
+                    module = importlib.import_module(self.__dict__['_lazy_name'])
+                    self.__dict__['_lazy_module'] = module
+        return module
+
+    def __getattr__(self, attribute):
+        return getattr(self._lazy_load(), attribute)
+
+    def __setattr__(self, attribute, value):
+        setattr(self._lazy_load(), attribute, value)
+
+    def __dir__(self):
+        return dir(self._lazy_load())
+
+    def __repr__(self):
+        state = "carregado" if self.__dict__['_lazy_module'] is not None else "não carregado"
+        return f"<módulo preguiçoso {self.__dict__['_lazy_name']!r} ({state})>"
+
+
+class _LazyAttribute:
+    """Representa um atributo (classe ou função) de um módulo preguiçoso"""
+
+    def __init__(self, module, attribute):
+        self.__dict__['_lazy_module'] = module
+        self.__dict__['_lazy_attribute'] = attribute
+
+    def _lazy_target(self):
+        return getattr(self.__dict__['_lazy_module'], self.__dict__['_lazy_attribute'])
+
+    def __getattr__(self, attribute):
+        if attribute == '__name__':
+            # Respondido sem importar: o argparse consulta o __name__ dos padrões ao montar o --help
+            return self.__dict__['_lazy_attribute']
+        return getattr(self._lazy_target(), attribute)
+
+    def __call__(self, *args, **kwargs):
+        return self._lazy_target()(*args, **kwargs)
+
+    def __repr__(self):
+        return f"<atributo preguiçoso {self.__dict__['_lazy_attribute']!r}>"
+
+
+def lazy_import(name):
+    """Retorna um módulo que é importado apenas no primeiro acesso"""
+    return _LazyModule(name)
+
+
+def lazy_attribute(module_name, attribute):
+    """Retorna um atributo de módulo (ex.: uma classe) resolvido no primeiro uso"""
+    return _LazyAttribute(_LazyModule(module_name), attribute)
+
+
+def resolve(value):
+    """
+    Valor real de um atributo preguiçoso (outros valores voltam como estão)
+
+    Permite usar lazy_attribute() como padrão de parâmetros e de opções
+    da linha de comando sem importar o módulo ao definir a função.
+    """
+    if isinstance(value, _LazyAttribute):
+        return value._lazy_target()
+    return value
+
+
+def is_available(name):
+    """Verifica se um pacote de nível superior está instalado, sem importá-lo"""
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
@@ -0,0 +1,253 @@
+"""
+Screenshots e HTML de diagnóstico gravados em segundo plano
+
+A extração salvava um PNG de tela cheia e o driver.page_source inteiro
+antes e depois de cada execução, de forma síncrona: o driver ficava
+parado enquanto o disco enchia de cópias quase iguais. Aqui:
+
+    - o modo decide o que é capturado: 'always' (tudo), 'on-failure'
+      (só falhas), 'sampled' (falhas e uma fração do resto) ou 'off';
+    - no driver só se pega o conteúdo (bytes do PNG e o HTML); compressão,
+      hash e gravação ficam com uma thread de fundo;
+    - screenshots viram WebP (requer Pillow; sem ele ficam em PNG) e o
+      HTML é comprimido com zstd (requer zstandard; sem ele, gzip);
+    - os arquivos são nomeados pelo sha256 do conteúdo: uma captura
+      idêntica a uma anterior não é gravada de novo;
+    - ao fechar, a pasta é podada por idade e tamanho total.
+
+O índice index.jsonl da pasta registra cada captura (nome, execução,
+arquivo). Uso:
+
+    store = ArtifactStore(mode='on-failure')
+    store.capture(driver, 'page1')
+    store.capture(driver, 'unit_p3', failure=True)
+    store.close()
+"""
+
+import gzip
+import hashlib
+import io
+import json
+import os
+import queue
+import random
+import threading
+import time
+from datetime import datetime
+
+from ons_powerbi._lazy import is_available, lazy_attribute, lazy_import
+
+
+# Pillow e zstandard são opcionais e só importados ao comprimir
+Image = lazy_attribute('PIL.Image', 'Image')
+zstandard = lazy_import('zstandard')
+
+DEFAULT_DIR = os.path.join("extracao_powerbi", "artifacts")
+INDEX_FILE = "index.jsonl"
+
+MODES = ('always', 'on-failure', 'sampled', 'off')
+DEFAULT_MODE = 'on-failure'
+DEFAULT_SAMPLE_RATE = 0.1
+
+DEFAULT_MAX_MB = 512
+DEFAULT_MAX_AGE_DAYS = 30
+
+# Extensões possíveis de cada tipo (a captura pode ter sido gravada com ou sem o pacote opcional)
+_EXTENSIONS = {'screenshot': ('.webp', '.png'), 'html': ('.html.zst', '.html.gz')}
+
+WEBP_QUALITY = 80
+ZSTD_LEVEL = 10
+
+
+def compress_screenshot(png_bytes):
+    """PNG -> WebP (sem Pillow, mantém o PNG); retorna (bytes, extensão)"""
+    if not is_available('PIL'):
+        return png_bytes, '.png'
+    buffer = io.BytesIO()
+    Image.open(io.BytesIO(png_bytes)).save(buffer, 'WEBP', quality=WEBP_QUALITY, method=4)
+    return buffer.getvalue(), '.webp'
+
+
+def compress_html(html_text):
+    """HTML -> zstd (sem zstandard, gzip); retorna (bytes, extensão)"""
+    raw = html_text.encode('utf-8')
+    if is_available('zstandard'):
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(raw), '.html.zst'
+    return gzip.compress(raw, compresslevel=6), '.html.gz'
+
+
+class ArtifactStore:
+    """
+    Capturas de diagnóstico com gravação em segundo plano
+
+    Args:
+        folder: Pasta dos artefatos (compartilhada entre execuções)
+        mode: Um de MODES
+        sample_rate: Fração das capturas sem falha gravadas no modo 'sampled'
+        max_mb: Tamanho máximo da pasta; as capturas mais antigas saem primeiro
+        max_age_days: Idade máxima de uma captura
+        run_label: Identificação da execução no índice (ex.: pasta de saída)
+    """
+
+    def __init__(self, folder=DEFAULT_DIR, mode=DEFAULT_MODE, sample_rate=DEFAULT_SAMPLE_RATE,
+                 max_mb=DEFAULT_MAX_MB, max_age_days=DEFAULT_MAX_AGE_DAYS, run_label=None):
+        if mode not in MODES:
+            raise ValueError(f"Modo de artefatos inválido: {mode} (use {', '.join(MODES)})")
+        self.folder = folder
+        self.mode = mode
+        self.sample_rate = sample_rate
+        self.max_mb = max_mb
+        self.max_age_days = max_age_days
+        self.run_label = run_label
+        self.stats = {'captured': 0, 'written': 0, 'deduplicated': 0, 'bytes': 0, 'errors': 0, 'removed': 0}
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def wants(self, failure=False):
+        """True se uma captura (de falha ou não) deve ser feita no modo atual"""
+        if self.mode == 'off':
+            return False
+        if failure or self.mode == 'always':
+            return True
+        return self.mode == 'sampled' and random.random() < self.sample_rate
+
+    def capture(self, driver, name, failure=False, screenshot=True, html=True):
+        """
+        Pega screenshot e/ou HTML do driver e agenda a gravação
+
+        Só a leitura do conteúdo usa o driver; o resto é feito em segundo
+        plano. Erros (ex.: navegador já fechado) são contados e ignorados.
+
+        Returns:
+            True se algo foi capturado
+        """
+        if not self.wants(failure):
+            return False
+        try:
+            items = []
+            if screenshot:
+                items.append(('screenshot', driver.get_screenshot_as_png()))
+            if html:
+                items.append(('html', driver.page_source))
+        except Exception as e:
+            print(f"  ⚠️  Não foi possível capturar '{name}': {e}")
+            self._count('errors')
+            return False
+
+        self._start()
+        for kind, content in items:
+            self._queue.put({'name': name, 'kind': kind, 'content': content, 'failure': failure,
+                             'captured_at': datetime.now().isoformat(timespec='seconds')})
+        self._count('captured')
+        return True
+
+    def _count(self, key, amount=1):
+        with self._lock:
+            self.stats[key] += amount
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='ons-artifacts', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            try:
+                self._write(item)
+            except Exception as e:
+                print(f"  ⚠️  Erro ao gravar artefato '{item['name']}': {e}")
+                self._count('errors')
+
+    def _write(self, item):
+        if item['kind'] == 'screenshot':
+            digest = hashlib.sha256(item['content']).hexdigest()
+        else:
+            digest = hashlib.sha256(item['content'].encode('utf-8')).hexdigest()
+
+        if not os.path.exists(self.folder):
+            os.makedirs(self.folder, exist_ok=True)
+
+        base = os.path.join(self.folder, digest[:32])
+        existing = [base + extension for extension in _EXTENSIONS[item['kind']] if os.path.exists(base + extension)]
+        if existing:
+            path = existing[0]
+            os.utime(path)  # conteúdo repetido conta como recente na retenção
+            self._count('deduplicated')
+        else:
+            if item['kind'] == 'screenshot':
+                data, extension = compress_screenshot(item['content'])
+            else:
+                data, extension = compress_html(item['content'])
+            path = base + extension
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            self._count('written')
+            self._count('bytes', len(data))
+
+        entry = {'captured_at': item['captured_at'], 'run': self.run_label, 'name': item['name'],
+                 'kind': item['kind'], 'failure': item['failure'], 'file': os.path.basename(path)}
+        with open(os.path.join(self.folder, INDEX_FILE), 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+
+    def enforce_retention(self):
+        """Remove capturas mais velhas que max_age_days e as mais antigas acima de max_mb"""
+        if not os.path.isdir(self.folder):
+            return 0
+        files = []
+        for filename in os.listdir(self.folder):
+            path = os.path.join(self.folder, filename)
+            if filename == INDEX_FILE or filename.endswith('.tmp') or not os.path.isfile(path):
+                continue
+            info = os.stat(path)
+            files.append((info.st_mtime, info.st_size, path))
+        files.sort()
+
+        cutoff = time.time() - self.max_age_days * 86400 if self.max_age_days else None
+        total = sum(size for _, size, _ in files)
+        limit = self.max_mb * 1024 * 1024 if self.max_mb else None
+        removed = 0
+        for mtime, size, path in files:
+            if (cutoff is None or mtime >= cutoff) and (limit is None or total <= limit):
+                break
+            os.remove(path)
+            total -= size
+            removed += 1
+
+        if removed:
+            self._prune_index()
+        self._count('removed', removed)
+        return removed
+
+    def _prune_index(self):
+        index_path = os.path.join(self.folder, INDEX_FILE)
+        if not os.path.exists(index_path):
+            return
+        present = set(os.listdir(self.folder))
+        with open(index_path, 'r', encoding='utf-8') as f:
+            kept = [line for line in f if line.strip() and json.loads(line).get('file') in present]
+        tmp_path = f"{index_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.writelines(kept)
+        os.replace(tmp_path, index_path)
+
+    def close(self):
+        """Espera as gravações pendentes, aplica a retenção e devolve as estatísticas"""
+        with self._lock:
+            thread = self._thread
+        if thread is not None:
+            self._queue.put(None)
+            thread.join()
+            with self._lock:
+                self._thread = None
+        try:
+            self.enforce_retention()
+        except OSError as e:
+            print(f"  ⚠️  Erro na retenção dos artefatos: {e}")
+        return dict(self.stats)
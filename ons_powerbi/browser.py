@@ -0,0 +1,175 @@
+"""
+Inicialização do Chrome e espera pelo carregamento do Power BI
+
+Compartilhado por scrape_ons_powerbi_direct.py e scrape_powerbi.py.
+O selenium só é importado quando um navegador é de fato usado.
+"""
+
+import time
+
+from ons_powerbi import network_observer, timings
+from ons_powerbi._lazy import lazy_attribute, lazy_import
+
+
+webdriver = lazy_import('selenium.webdriver')
+EC = lazy_import('selenium.webdriver.support.expected_conditions')
+selenium_exceptions = lazy_import('selenium.common.exceptions')
+By = lazy_attribute('selenium.webdriver.common.by', 'By')
+Options = lazy_attribute('selenium.webdriver.chrome.options', 'Options')
+WebDriverWait = lazy_attribute('selenium.webdriver.support.ui', 'WebDriverWait')
+
+
+def setup_driver(headless=False, capture_network=True, maximize=False, extra_arguments=(), tuned=True):
+    """
+    Configura Chrome com opções otimizadas para Power BI
+
+    Args:
+        headless: Executa sem interface
+        capture_network: Ativa o log de rede filtrado (ver network_observer)
+        maximize: Maximiza a janela após abrir
+        extra_arguments: Argumentos adicionais do Chrome
+        tuned: Inclui as opções de desempenho/janela (sem extensões, sem GPU,
+            1920x1080); False mantém só --no-sandbox e --disable-dev-shm-usage
+
+    Returns:
+        WebDriver ou None se o Chrome não pôde ser iniciado
+    """
+    options = Options()
+
+    if headless:
+        options.add_argument('--headless=new')
+
+    # Opções para melhor desempenho
+    options.add_argument('--no-sandbox')
+    options.add_argument('--disable-dev-shm-usage')
+    if tuned:
+        options.add_argument('--disable-extensions')
+        options.add_argument('--disable-gpu')
+        options.add_argument('--window-size=1920,1080')
+        options.add_argument('--start-maximized')
+    for argument in extra_arguments:
+        options.add_argument(argument)
+
+    # Ativa logs de performance restritos a eventos de rede (útil para debugar Power BI)
+    if capture_network:
+        network_observer.enable_network_capture(options)
+
+    print("Inicializando Chrome driver...")
+    try:
+        driver = webdriver.Chrome(options=options)
+    except Exception as e:
+        print(f"❌ Erro ao inicializar Chrome: {e}")
+        print("\nTente instalar webdriver-manager:")
+        print("  pip install webdriver-manager")
+        return None
+
+    if maximize:
+        driver.maximize_window()
+    return driver
+
+
+def wait_for_powerbi_load(driver, timeout=60, timing=None, phase='load'):
+    """
+    Aguarda Power BI carregar completamente
+    Power BI usa renderização assíncrona complexa
+    
+    timing: Perfil de tempos (ver timings); os limites fixos viram o
+        padrão e os tempos de cada etapa são registrados no histórico
+    phase: Nome da fase no histórico (ex.: 'load', 'filter_refresh')
+    """
+    timeout = timings.timeout(timing, phase, timeout)
+    print(f"\n⏳ Aguardando Power BI carregar (timeout: {timeout}s)...")
+
+    start_time = time.time()
+
+    # Estratégias progressivas
+    strategies = [
+        ("Body presente", 'body', By.TAG_NAME, "body", 5),
+        ("Elemento embed", 'embed', By.CSS_SELECTOR, "[class*='embed'], [class*='iframe']", 10),
+        ("Containers visuais", 'visual', By.CSS_SELECTOR, "[class*='visual'], [class*='Visual']", 15),
+        ("Elementos SVG (gráficos)", 'svg', By.TAG_NAME, "svg", 10),
+        ("Elementos de dados", 'data', By.CSS_SELECTOR, "[class*='label'], [class*='value']", 10),
+    ]
+
+    for description, step, by_type, selector, wait_time in strategies:
+        step_phase = f"{phase}:{step}"
+        try:
+            step_start = time.time()
+            remaining = max(1, timeout - (step_start - start_time))
+            wait_time = timings.timeout(timing, step_phase, wait_time)
+
+            print(f"  • {description}...", end=" ")
+            WebDriverWait(driver, min(wait_time, remaining),
+                          poll_frequency=timings.poll_interval(timing, step_phase)).until(
+                EC.presence_of_element_located((by_type, selector))
+            )
+            # Só os sucessos entram no histórico: elementos ausentes na página não são lentidão
+            timings.record(timing, step_phase, time.time() - step_start)
+            print("✓")
+
+        except selenium_exceptions.TimeoutException:
+            print("✗")
+
+        except Exception as e:
+            print(f"⚠️  {e}")
+
+    timings.record(timing, phase, time.time() - start_time)
+
+    # Aguarda adicional para JavaScript finalizar
+    print("  • Aguardando JavaScript finalizar...", end=" ")
+    time.sleep(10)
+    print("✓")
+
+    total_time = time.time() - start_time
+    print(f"\n✓ Carregamento concluído em {total_time:.1f}s")
+
+
+def execute_async_script(driver, script, *args, timeout):
+    """
+    execute_async_script com um timeout próprio, restaurando o timeout anterior do driver
+
+    O timeout de script vale para a sessão inteira: sem restaurar, a
+    próxima chamada assíncrona (de outro módulo) herdaria o valor.
+    """
+    previous = driver.timeouts.script
+    driver.set_script_timeout(timeout)
+    try:
+        return driver.execute_async_script(script, *args)
+    finally:
+        try:
+            driver.set_script_timeout(previous)
+        except Exception:
+            pass  # navegador já fechado
+
+
+def wait_for_powerbi_iframe(driver, timeout=60):
+    """
+    Aguarda o iframe do Power BI, entra nele e espera os visuais renderizarem
+    Retorna True se os visuais carregaram (o driver fica dentro do iframe)
+    """
+    print("Aguardando Power BI carregar...")
+
+    # Aguarda elementos específicos do Power BI
+    wait = WebDriverWait(driver, timeout)
+
+    try:
+        # Aguarda iframe principal carregar
+        wait.until(EC.frame_to_be_available_and_switch_to_it((By.TAG_NAME, "iframe")))
+        print("✓ Iframe carregado")
+
+        # Aguarda visualizações carregarem
+        time.sleep(15)  # Power BI precisa de tempo para renderizar
+
+        # Tenta encontrar elementos visuais
+        wait.until(EC.presence_of_element_located((
+            By.XPATH,
+            "//div[contains(@class, 'visual') or contains(@class, 'card')]"
+        )))
+        print("✓ Visualizações carregadas")
+
+        return True
+
+    except Exception as e:
+        print(f"⚠️  Timeout ao aguardar Power BI: {e}")
+        driver.switch_to.default_content()
+        return False
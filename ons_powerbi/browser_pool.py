@@ -0,0 +1,150 @@
+"""
+Pool de contextos isolados dentro de um único processo do Chrome
+
+Cada sessão com um webdriver.Chrome próprio custa um processo do Chrome
+inteiro (centenas de MB) e alguns segundos de partida. O pool usa um
+Chrome só (o navegador já aberto pelo chamador) e cria, via CDP, um
+contexto de navegação por sessão (Target.createBrowserContext): cookies,
+cache e armazenamento separados, como uma janela anônima.
+
+Cada contexto recebe um ChromeDriver próprio conectado ao mesmo Chrome
+(debuggerAddress) e posicionado na aba do contexto, de modo que os
+workers continuam usando a API do Selenium normalmente, em paralelo.
+
+O pool contabiliza o heap de JavaScript de cada contexto
+(Runtime.getHeapUsage) e as unidades já processadas; needs_recycle()
+indica quando o contexto deve ser descartado e recriado.
+"""
+
+import threading
+import time
+
+from ons_powerbi import network_observer
+from ons_powerbi.browser import Options, webdriver
+
+
+DEFAULT_MAX_HEAP_MB = 1024
+DEFAULT_MAX_UNITS_PER_CONTEXT = 50
+WINDOW_SIZE = (1920, 1080)
+
+
+class BrowserPool:
+    """
+    Contextos de navegação isolados em um Chrome compartilhado
+
+    Args:
+        host_driver: WebDriver do Chrome que hospeda os contextos
+        max_heap_mb: Heap de JavaScript (MB) acima do qual o contexto é reciclado
+        max_units: Unidades processadas por contexto antes da reciclagem
+        capture_network: Ativa o log de rede nos drivers dos contextos
+    """
+
+    def __init__(self, host_driver, max_heap_mb=DEFAULT_MAX_HEAP_MB,
+                 max_units=DEFAULT_MAX_UNITS_PER_CONTEXT, capture_network=True):
+        self.host_driver = host_driver
+        self.max_heap_mb = max_heap_mb
+        self.max_units = max_units
+        self.capture_network = capture_network
+        self.contexts = {}
+        self.recycled = 0
+        self._lock = threading.Lock()
+
+    @property
+    def debugger_address(self):
+        """Endereço do DevTools do Chrome hospedeiro (host:porta)"""
+        return self.host_driver.capabilities['goog:chromeOptions']['debuggerAddress']
+
+    def _host_cdp(self, command, params):
+        # Comandos de nível de navegador passam pelo driver hospedeiro, um por vez
+        with self._lock:
+            return self.host_driver.execute_cdp_cmd(command, params)
+
+    def _attach_driver(self, target_id):
+        options = Options()
+        options.debugger_address = self.debugger_address
+        if self.capture_network:
+            network_observer.enable_network_capture(options)
+        driver = webdriver.Chrome(options=options)
+        driver.switch_to.window(target_id)
+        return driver
+
+    def open_context(self, url=None):
+        """
+        Cria um contexto isolado com uma aba e um driver conectado a ela
+
+        Returns:
+            Dict com context_id, target_id, driver, units e created_at
+        """
+        context_id = self._host_cdp('Target.createBrowserContext', {'disposeOnDetach': False})['browserContextId']
+        try:
+            target_id = self._host_cdp('Target.createTarget', {
+                'url': 'about:blank', 'browserContextId': context_id, 'newWindow': True,
+            })['targetId']
+            driver = self._attach_driver(target_id)
+        except Exception:
+            self._host_cdp('Target.disposeBrowserContext', {'browserContextId': context_id})
+            raise
+
+        try:
+            driver.set_window_size(*WINDOW_SIZE)
+        except Exception:
+            pass  # janelas de alguns modos headless não aceitam redimensionamento
+        if url:
+            driver.get(url)
+
+        context = {'context_id': context_id, 'target_id': target_id, 'driver': driver,
+                   'units': 0, 'created_at': time.time()}
+        with self._lock:
+            self.contexts[context_id] = context
+        return context
+
+    def close_context(self, context):
+        """Fecha a aba, descarta o contexto (e sua memória) e encerra o driver conectado"""
+        with self._lock:
+            self.contexts.pop(context['context_id'], None)
+        try:
+            context['driver'].quit()  # driver conectado: não encerra o Chrome
+        except Exception:
+            pass
+        for command, params in (('Target.closeTarget', {'targetId': context['target_id']}),
+                                ('Target.disposeBrowserContext', {'browserContextId': context['context_id']})):
+            try:
+                self._host_cdp(command, params)
+            except Exception:
+                pass  # aba já fechada ou contexto já descartado
+
+    def heap_usage_mb(self, context):
+        """Heap de JavaScript em uso na aba do contexto (MB), ou None se indisponível"""
+        try:
+            usage = context['driver'].execute_cdp_cmd('Runtime.getHeapUsage', {})
+        except Exception:
+            return None
+        context['heap_mb'] = round(usage['usedSize'] / (1024 * 1024), 1)
+        return context['heap_mb']
+
+    def needs_recycle(self, context):
+        """True se o contexto passou do limite de unidades ou de memória"""
+        if context['units'] >= self.max_units:
+            return True
+        heap_mb = self.heap_usage_mb(context)
+        return heap_mb is not None and heap_mb > self.max_heap_mb
+
+    def recycle(self, context, url=None):
+        """Substitui o contexto por um novo (mesma URL)"""
+        self.close_context(context)
+        self.recycled += 1
+        return self.open_context(url)
+
+    def memory_report(self):
+        """Heap (MB) e unidades processadas de cada contexto aberto"""
+        with self._lock:
+            contexts = list(self.contexts.values())
+        return [{'context_id': context['context_id'], 'units': context['units'],
+                 'heap_mb': self.heap_usage_mb(context)} for context in contexts]
+
+    def close(self):
+        """Fecha todos os contextos (o Chrome hospedeiro continua com o chamador)"""
+        with self._lock:
+            contexts = list(self.contexts.values())
+        for context in contexts:
+            self.close_context(context)
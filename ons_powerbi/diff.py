@@ -0,0 +1,192 @@
+"""
+Diferenças entre duas extrações (valores inseridos, removidos e revisados)
+
+A ONS às vezes revisa valores passados. Este módulo compara dois
+arquivos *_ALL_SERIES_CONSOLIDATED.csv (ou os DataFrames de save_data())
+pela chave (página, série, filtros, data):
+
+    1. cada linha recebe um hash da chave e as duas bases são divididas em
+       partições pelo mesmo hash (linhas da mesma chave caem na mesma
+       partição nos dois lados);
+    2. cada partição tem um digest independente da ordem das linhas;
+       partições com o mesmo digest nos dois lados são puladas;
+    3. só as partições diferentes são comparadas (merge), em paralelo.
+
+O resultado lista as linhas com Mudanca = 'inserido', 'removido' ou
+'revisado', com Valor_Anterior e Valor_Novo.
+"""
+
+import glob
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from ons_powerbi import value_parsing
+from ons_powerbi._lazy import lazy_import
+from ons_powerbi.store import FILTER_COLUMN_PREFIX
+
+
+pd = lazy_import('pandas')
+np = lazy_import('numpy')
+
+DEFAULT_PARTITIONS = 64
+DEFAULT_WORKERS = 4
+DEFAULT_TOLERANCE = 1e-9
+
+SERIES_COLUMNS = ['Página', 'Serie_Label']
+CONSOLIDATED_SUFFIX = '_ALL_SERIES_CONSOLIDATED.csv'
+
+
+def find_consolidated_file(path):
+    """Aceita o CSV consolidado ou a pasta de saída de uma execução"""
+    if os.path.isdir(path):
+        matches = sorted(glob.glob(os.path.join(path, f"*{CONSOLIDATED_SUFFIX}")))
+        if not matches:
+            raise FileNotFoundError(f"Nenhum *{CONSOLIDATED_SUFFIX} em {path}")
+        return matches[-1]
+    return path
+
+
+def load_points(source):
+    """
+    Carrega (página, série, filtros, data, valor) de um CSV/pasta/DataFrame
+
+    Linhas sem data são descartadas; chaves repetidas (janelas de datas
+    sobrepostas) ficam com a última ocorrência.
+
+    Returns:
+        (DataFrame, colunas da chave)
+    """
+    if isinstance(source, str):
+        path = find_consolidated_file(source)
+        if path.endswith('.pkl'):
+            df = pd.read_pickle(path)
+        else:
+            df = pd.read_csv(path, encoding='utf-8-sig', dtype={'Data': str, 'Serie_Label': str})
+    else:
+        df = source
+
+    if 'Data' not in df.columns or 'Valor' not in df.columns:
+        df = value_parsing.add_point_columns(df.copy())
+
+    filter_columns = sorted(c for c in df.columns if str(c).startswith(FILTER_COLUMN_PREFIX))
+    key_columns = [c for c in SERIES_COLUMNS if c in df.columns] + filter_columns + ['Data']
+
+    points = df.loc[df['Data'].notna(), key_columns + ['Valor']].copy()
+    for column in key_columns:
+        points[column] = points[column].fillna('').astype(str)
+    points['Valor'] = pd.to_numeric(points['Valor'], errors='coerce')
+    points = points.drop_duplicates(subset=key_columns, keep='last').reset_index(drop=True)
+    return points, key_columns
+
+
+def partition(points, key_columns, partitions=DEFAULT_PARTITIONS):
+    """
+    Divide as linhas por hash da chave
+
+    Returns:
+        {número_da_partição: (DataFrame, digest)}
+    """
+    key_hash = pd.util.hash_pandas_object(points[key_columns], index=False).to_numpy()
+    # O digest cobre chave e valor; ordenar os hashes o torna independente da ordem das linhas
+    row_hash = pd.util.hash_pandas_object(points[key_columns + ['Valor']], index=False).to_numpy()
+    buckets = key_hash % np.uint64(partitions)
+
+    result = {}
+    for bucket in np.unique(buckets):
+        mask = buckets == bucket
+        digest = hashlib.sha1(np.sort(row_hash[mask]).tobytes()).hexdigest()
+        result[int(bucket)] = (points[mask], digest)
+    return result
+
+
+def _values_differ(old, new, tolerance):
+    both_missing = old.isna() & new.isna()
+    one_missing = old.isna() != new.isna()
+    changed = (old - new).abs() > tolerance
+    return ~both_missing & (one_missing | changed.fillna(False))
+
+
+def compare_partition(old, new, key_columns, tolerance=DEFAULT_TOLERANCE):
+    """Linhas inseridas, removidas e revisadas entre duas partições correspondentes"""
+    merged = old.merge(new, on=key_columns, how='outer', suffixes=('_Anterior', '_Novo'), indicator=True)
+
+    inserted = merged['_merge'] == 'right_only'
+    deleted = merged['_merge'] == 'left_only'
+    revised = (merged['_merge'] == 'both') & _values_differ(merged['Valor_Anterior'], merged['Valor_Novo'],
+                                                              tolerance)
+
+    changes = merged[inserted | deleted | revised].copy()
+    changes['Mudanca'] = np.select(
+        [inserted[changes.index], deleted[changes.index]], ['inserido', 'removido'], default='revisado'
+    )
+    return changes.drop(columns='_merge')
+
+
+def diff_points(old_points, new_points, key_columns, partitions=DEFAULT_PARTITIONS,
+                workers=DEFAULT_WORKERS, tolerance=DEFAULT_TOLERANCE):
+    """
+    Compara duas bases já carregadas por load_points()
+
+    Returns:
+        (DataFrame de mudanças, estatísticas)
+    """
+    old_parts = partition(old_points, key_columns, partitions)
+    new_parts = partition(new_points, key_columns, partitions)
+    empty = old_points.iloc[0:0]
+
+    pending = []
+    identical = 0
+    for bucket in sorted(set(old_parts) | set(new_parts)):
+        old, old_digest = old_parts.get(bucket, (empty, None))
+        new, new_digest = new_parts.get(bucket, (empty, None))
+        if old_digest is not None and old_digest == new_digest:
+            identical += 1
+            continue
+        pending.append((old, new))
+
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='ons-diff') as executor:
+        results = list(executor.map(lambda pair: compare_partition(pair[0], pair[1], key_columns, tolerance),
+                                    pending))
+
+    columns = key_columns + ['Valor_Anterior', 'Valor_Novo', 'Mudanca']
+    changes = pd.concat(results, ignore_index=True) if results else pd.DataFrame(columns=columns)
+    changes = changes[columns].sort_values(key_columns).reset_index(drop=True)
+
+    counts = changes['Mudanca'].value_counts()
+    stats = {
+        'old_rows': len(old_points),
+        'new_rows': len(new_points),
+        'partitions': len(set(old_parts) | set(new_parts)),
+        'identical_partitions': identical,
+        'compared_partitions': len(pending),
+        'inserted': int(counts.get('inserido', 0)),
+        'deleted': int(counts.get('removido', 0)),
+        'revised': int(counts.get('revisado', 0)),
+    }
+    return changes, stats
+
+
+def diff_outputs(old_source, new_source, partitions=DEFAULT_PARTITIONS, workers=DEFAULT_WORKERS,
+                 tolerance=DEFAULT_TOLERANCE):
+    """
+    Compara duas extrações (CSV consolidado, pasta de saída ou DataFrame)
+
+    Args:
+        old_source / new_source: Extração anterior e nova
+        partitions: Número de partições por hash
+        workers: Partições comparadas em paralelo
+        tolerance: Diferença absoluta abaixo da qual o valor é considerado igual
+
+    Returns:
+        (DataFrame de mudanças, estatísticas)
+
+    Raises:
+        ValueError: as duas extrações não têm as mesmas colunas de chave
+    """
+    old_points, old_keys = load_points(old_source)
+    new_points, new_keys = load_points(new_source)
+    if old_keys != new_keys:
+        raise ValueError(f"Chaves diferentes entre as extrações: {old_keys} x {new_keys}")
+    return diff_points(old_points, new_points, old_keys, partitions=partitions, workers=workers,
+                       tolerance=tolerance)
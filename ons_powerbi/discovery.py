@@ -0,0 +1,203 @@
+"""
+Descoberta da URL do Power BI via HTTP, sem abrir o navegador
+
+Baixa o HTML estático da página da ONS com requests, procura URLs
+'app.powerbi.com/view?r=' (iframes, links e scripts) e guarda o
+resultado em cache. O cache é revalidado com ETag/Last-Modified; o
+navegador só é necessário quando a URL não é encontrada no HTML.
+"""
+
+import hashlib
+import html
+import json
+import os
+import re
+import threading
+import time
+
+from ons_powerbi._lazy import is_available, lazy_attribute, lazy_import
+
+
+requests = lazy_import('requests')
+BeautifulSoup = lazy_attribute('bs4', 'BeautifulSoup')
+
+HTML_PARSER = 'lxml' if is_available('lxml') else 'html.parser'
+
+
+DEFAULT_CACHE_PATH = os.path.join("extracao_powerbi", ".cache", "powerbi_embeds.json")
+
+# Tempo (s) em que uma entrada do cache é usada sem revalidação
+DEFAULT_CACHE_TTL = 6 * 3600
+
+REQUEST_TIMEOUT = 15
+
+_EMBED_URL_PATTERN = re.compile(
+    r"https://app\.powerbi\.com/view\?r=[A-Za-z0-9%=_\-]+(?:&(?:amp;)?[A-Za-z0-9_]+=[A-Za-z0-9%=_\-]*)*"
+)
+
+_HEADERS = {
+    'User-Agent': ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+                   "(KHTML, like Gecko) Chrome/120.0 Safari/537.36"),
+    'Accept': "text/html,application/xhtml+xml",
+}
+
+# Leitura-alteração-gravação do cache (jobs.py descobre URLs em várias threads)
+_cache_lock = threading.Lock()
+
+
+def _load_cache(cache_path):
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_cache(cache, cache_path):
+    folder = os.path.dirname(cache_path)
+    if folder and not os.path.exists(folder):
+        os.makedirs(folder)
+    # Grava em arquivo temporário e renomeia para não deixar o cache corrompido
+    tmp_path = f"{cache_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(cache, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, cache_path)
+
+
+def _update_cache(cache_path, page_url, entry):
+    """Relê o cache e grava só a entrada da página (preserva as gravadas por outras threads)"""
+    with _cache_lock:
+        cache = _load_cache(cache_path)
+        cache[page_url] = entry
+        _save_cache(cache, cache_path)
+
+
+def _store_entry(cache_path, page_url, entry):
+    try:
+        _update_cache(cache_path, page_url, entry)
+    except OSError as e:
+        print(f"  ⚠️  Não foi possível gravar o cache de URLs ({e})")
+
+
+def _normalize_url(url):
+    url = html.unescape(url).replace('\\u0026', '&').replace('\\/', '/')
+    return url.strip()
+
+
+def find_embed_urls(page_html):
+    """
+    Procura URLs de Power BI embedado no HTML estático de uma página
+
+    Ordem de prioridade: src/data-src de iframes, links e, por fim,
+    qualquer ocorrência no texto (ex.: scripts que montam o iframe).
+    """
+    found = []
+
+    def add(url):
+        if url and 'app.powerbi.com/view?r=' in url:
+            url = _normalize_url(url)
+            if url not in found:
+                found.append(url)
+
+    soup = BeautifulSoup(page_html, HTML_PARSER)
+    for iframe in soup.find_all('iframe'):
+        add(iframe.get('src'))
+        add(iframe.get('data-src'))
+    for link in soup.find_all('a', href=True):
+        add(link['href'])
+
+    for match in _EMBED_URL_PATTERN.finditer(page_html):
+        add(match.group(0))
+
+    return found
+
+
+def discover_embed_url(page_url, session=None, cache_path=DEFAULT_CACHE_PATH,
+                       cache_ttl=DEFAULT_CACHE_TTL, force_refresh=False):
+    """
+    Retorna a URL do Power BI embedado na página, usando cache com revalidação
+
+    Args:
+        page_url: Página da ONS que contém o iframe
+        session: requests.Session a reutilizar (opcional)
+        cache_path: Arquivo JSON do cache (None desativa o cache)
+        cache_ttl: Segundos em que o cache é usado sem consultar o servidor
+        force_refresh: Ignora o TTL e revalida com o servidor
+
+    Returns:
+        URL do Power BI ou None (nesse caso use o fallback via navegador)
+    """
+    entry = _load_cache(cache_path).get(page_url) if cache_path else None
+
+    if entry and not force_refresh and time.time() - entry.get('validated_at', 0) < cache_ttl:
+        print(f"  ✓ URL do Power BI em cache ({cache_path})")
+        return entry['embed_url']
+
+    headers = dict(_HEADERS)
+    if entry:
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+
+    http = session or requests.Session()
+    try:
+        response = http.get(page_url, headers=headers, timeout=REQUEST_TIMEOUT)
+    except requests.RequestException as e:
+        if entry:
+            print(f"  ⚠️  Falha ao revalidar cache ({e}); usando URL em cache")
+            return entry['embed_url']
+        print(f"  ⚠️  Falha ao baixar a página via HTTP: {e}")
+        return None
+
+    if response.status_code == 304 and entry:
+        entry['validated_at'] = time.time()
+        if cache_path:
+            _store_entry(cache_path, page_url, entry)
+        print("  ✓ URL do Power BI em cache (revalidada: 304 Not Modified)")
+        return entry['embed_url']
+
+    if response.status_code != 200:
+        print(f"  ⚠️  Página retornou HTTP {response.status_code}")
+        return entry['embed_url'] if entry else None
+
+    content_hash = hashlib.sha1(response.content).hexdigest()
+    if entry and entry.get('content_hash') == content_hash:
+        # Servidor sem ETag, mas o conteúdo não mudou
+        embed_url = entry['embed_url']
+    else:
+        urls = find_embed_urls(response.text)
+        if not urls:
+            print("  ✗ Nenhuma URL do Power BI no HTML estático")
+            return None
+        embed_url = urls[0]
+        print(f"  ✓ URL do Power BI encontrada via HTTP: {embed_url[:80]}...")
+
+    if cache_path:
+        _store_entry(cache_path, page_url, {
+            'embed_url': embed_url,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'content_hash': content_hash,
+            'validated_at': time.time(),
+        })
+
+    return embed_url
+
+
+def remember_embed_url(page_url, embed_url, cache_path=DEFAULT_CACHE_PATH):
+    """
+    Guarda no cache uma URL encontrada pelo fallback via navegador
+
+    Raises:
+        OSError: falha ao gravar o cache
+    """
+    if not cache_path or not embed_url:
+        return
+    _update_cache(cache_path, page_url, {
+        'embed_url': embed_url,
+        'etag': None,
+        'last_modified': None,
+        'content_hash': None,
+        'validated_at': time.time(),
+    })
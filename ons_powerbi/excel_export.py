@@ -0,0 +1,170 @@
+"""
+Exportação para Excel com memória constante
+
+Escreve a aba com todos os dados e uma aba por série em uma única passada
+(groupby), usando o modo 'constant_memory' do xlsxwriter ou, na falta
+dele, o modo 'write_only' do openpyxl. As linhas são gravadas em fluxo,
+sem manter a planilha inteira em memória.
+"""
+
+import math
+import re
+
+from ons_powerbi._lazy import is_available, lazy_import
+
+
+# Writers opcionais, importados apenas na exportação
+xlsxwriter = lazy_import('xlsxwriter')
+openpyxl = lazy_import('openpyxl')
+
+
+# Limites do formato .xlsx
+EXCEL_MAX_ROWS = 1048576
+EXCEL_MAX_SHEET_NAME = 31
+
+_INVALID_SHEET_CHARS = re.compile(r"[\[\]:*?/\\]")
+
+
+def excel_engine_name():
+    """Retorna o nome do writer Excel disponível ('xlsxwriter', 'openpyxl' ou None)"""
+    if is_available('xlsxwriter'):
+        return 'xlsxwriter'
+    if is_available('openpyxl'):
+        return 'openpyxl'
+    return None
+
+
+def make_sheet_namer(reserved=('History',)):
+    """
+    Cria uma função que gera nomes de aba válidos e únicos
+
+    Regras do Excel: até 31 caracteres, sem []:*?/\\, sem apóstrofo no
+    início/fim, não vazio, e únicos sem diferenciar maiúsculas/minúsculas.
+    Nomes repetidos recebem sufixo _2, _3, ... respeitando o limite.
+    'History' é reservado pelo próprio Excel.
+    """
+    used = {name.lower() for name in reserved}
+
+    def sheet_name(label):
+        base = _INVALID_SHEET_CHARS.sub('_', str(label)).strip().strip("'")
+        base = base[:EXCEL_MAX_SHEET_NAME] or 'Serie'
+
+        candidate = base
+        counter = 2
+        while candidate.lower() in used:
+            suffix = f"_{counter}"
+            candidate = base[:EXCEL_MAX_SHEET_NAME - len(suffix)] + suffix
+            counter += 1
+
+        used.add(candidate.lower())
+        return candidate
+
+    return sheet_name
+
+
+def _clean_cell(value):
+    """Converte valores não suportados pelas planilhas (NaN/None) em célula vazia"""
+    if value is None:
+        return None
+    if isinstance(value, float) and (math.isnan(value) or math.isinf(value)):
+        return None
+    return value
+
+
+def _iter_row_chunks(df, max_rows):
+    """Divide um DataFrame em blocos que cabem em uma aba (descontando o cabeçalho)"""
+    rows_per_sheet = max_rows - 1
+    for start in range(0, max(len(df), 1), rows_per_sheet):
+        yield df.iloc[start:start + rows_per_sheet]
+
+
+class _XlsxWriterBook:
+    """Adaptador mínimo para o xlsxwriter em modo constant_memory"""
+
+    def __init__(self, path):
+        self._workbook = xlsxwriter.Workbook(path, {
+            'constant_memory': True,
+            'nan_inf_to_errors': True,
+            'strings_to_urls': False,
+        })
+
+    def write_sheet(self, name, columns, rows):
+        worksheet = self._workbook.add_worksheet(name)
+        worksheet.write_row(0, 0, columns)
+        row_number = 0
+        for row_number, row in enumerate(rows, start=1):
+            worksheet.write_row(row_number, 0, [_clean_cell(value) for value in row])
+        return row_number
+
+    def close(self):
+        self._workbook.close()
+
+
+class _OpenpyxlWriteOnlyBook:
+    """Adaptador mínimo para o openpyxl em modo write_only"""
+
+    def __init__(self, path):
+        self._path = path
+        self._workbook = openpyxl.Workbook(write_only=True)
+
+    def write_sheet(self, name, columns, rows):
+        worksheet = self._workbook.create_sheet(title=name)
+        worksheet.append(list(columns))
+        row_number = 0
+        for row_number, row in enumerate(rows, start=1):
+            worksheet.append([_clean_cell(value) for value in row])
+        return row_number
+
+    def close(self):
+        self._workbook.save(self._path)
+
+
+def _open_workbook(path, engine=None):
+    engine = engine or excel_engine_name()
+    if engine == 'xlsxwriter' and is_available('xlsxwriter'):
+        return _XlsxWriterBook(path)
+    if engine == 'openpyxl' and is_available('openpyxl'):
+        return _OpenpyxlWriteOnlyBook(path)
+    raise RuntimeError("Exportação Excel requer xlsxwriter ou openpyxl (pip install xlsxwriter)")
+
+
+def export_excel(df, path, group_column='Serie_Label', main_sheet='Todos_Dados',
+                 engine=None, max_rows=EXCEL_MAX_ROWS):
+    """
+    Exporta o DataFrame consolidado e uma aba por série em fluxo
+
+    Args:
+        df: DataFrame consolidado
+        path: Caminho do arquivo .xlsx
+        group_column: Coluna usada para separar as abas por série
+        main_sheet: Nome da aba com todos os dados
+        engine: 'xlsxwriter' ou 'openpyxl' (padrão: o disponível)
+        max_rows: Limite de linhas por aba (incluindo o cabeçalho); abas que
+            excedem o limite continuam em abas adicionais
+
+    Returns:
+        Lista de (nome_da_aba, rótulo, linhas) na ordem de escrita
+    """
+    namer = make_sheet_namer()
+    columns = [str(column) for column in df.columns]
+    sheets = []
+
+    book = _open_workbook(path, engine)
+    try:
+        for chunk_index, chunk in enumerate(_iter_row_chunks(df, max_rows)):
+            name = namer(main_sheet if chunk_index == 0 else f"{main_sheet}_parte{chunk_index + 1}")
+            rows = book.write_sheet(name, columns, chunk.itertuples(index=False, name=None))
+            sheets.append((name, None, rows))
+
+        if group_column in df.columns:
+            # Uma única passada: groupby particiona o DataFrame sem uma máscara por série
+            for label, group in df.groupby(group_column, sort=False, dropna=False):
+                for chunk_index, chunk in enumerate(_iter_row_chunks(group, max_rows)):
+                    base = label if chunk_index == 0 else f"{label}_parte{chunk_index + 1}"
+                    name = namer(base)
+                    rows = book.write_sheet(name, columns, chunk.itertuples(index=False, name=None))
+                    sheets.append((name, label, rows))
+    finally:
+        book.close()
+
+    return sheets
@@ -0,0 +1,149 @@
+"""
+Estado dos filtros aplicados em uma sessão do navegador
+
+Reaplicar um slicer de data custa ~5s (limpa o campo, digita, dispara
+eventos e aguarda o Power BI). Como o Power BI sincroniza slicers entre
+páginas, na maioria das páginas o valor já está correto. O rastreador lê
+o valor atual com uma única chamada de JavaScript e só reaplica quando
+ele difere do pedido.
+
+Grupos de sincronização: filtros do mesmo grupo valem em todas as
+páginas. Se a página atual não exibe o slicer (slicer sincronizado mas
+oculto), o valor já aplicado ao grupo nesta sessão é considerado vigente.
+
+O estado é um dict guardado na sessão (session['filter_state']).
+"""
+
+import re
+
+
+# Slicers de data do painel da ONS são sincronizados entre as páginas
+DEFAULT_SYNC_GROUPS = {'início': 'datas', 'fim': 'datas'}
+
+
+_READ_DATE_INPUTS_JS = """
+return Array.from(document.querySelectorAll('input.date-slicer-datepicker, input[class*="date-slicer"]'))
+    .map(input => ({label: input.getAttribute('aria-label') || '', value: input.value || ''}));
+"""
+
+_READ_SLICER_JS = """
+// Valores selecionados de um slicer, pelo título (texto de resumo ou itens marcados)
+const wanted = arguments[0];
+function text(element) { return element ? (element.textContent || '').trim() : ''; }
+function norm(value) { return value.replace(/\\s+/g, ' ').trim().toLowerCase(); }
+for (const container of document.querySelectorAll('visual-container, .visualContainer')) {
+    const title = text(container.querySelector('.slicer-header-text, [class*="slicerHeader"] [class*="text"], [class*="visualTitle"]'))
+        || container.getAttribute('aria-label') || '';
+    if (norm(title) !== norm(wanted)) continue;
+    const restatement = text(container.querySelector('.slicer-restatement, [class*="restatement"]'));
+    const selected = Array.from(container.querySelectorAll('.slicerItemContainer, [role="option"], [role="treeitem"]'))
+        .filter(item => item.getAttribute('aria-selected') === 'true' || item.getAttribute('aria-checked') === 'true')
+        .map(item => text(item.querySelector('.slicerText, [class*="slicerText"]')) || text(item));
+    return {found: true, restatement: restatement, selected: selected};
+}
+return {found: false};
+"""
+
+
+def new_state(sync_groups=None):
+    """Cria o estado de filtros de uma sessão"""
+    return {
+        'sync_groups': dict(DEFAULT_SYNC_GROUPS if sync_groups is None else sync_groups),
+        'applied': {},  # chave do filtro (ou grupo) -> valor aplicado
+        'skipped': 0,
+        'applied_count': 0,
+    }
+
+
+def _key(state, name):
+    # Cada filtro guarda o próprio valor; o grupo indica que ele vale em todas as páginas
+    group = state['sync_groups'].get(name)
+    return f"grupo:{group}:{name}" if group else f"filtro:{name}"
+
+
+def record(state, name, value):
+    """Registra que o filtro foi aplicado com sucesso"""
+    state['applied'][_key(state, name)] = value
+    state['applied_count'] += 1
+
+
+def forget(state, name=None):
+    """Descarta o estado conhecido (ex.: após recarregar o relatório)"""
+    if name is None:
+        state['applied'].clear()
+    else:
+        state['applied'].pop(_key(state, name), None)
+
+
+def read_date_inputs(driver):
+    """Valores atuais de todos os campos de data da página, em uma chamada"""
+    return driver.execute_script(_READ_DATE_INPUTS_JS)
+
+
+def current_date_value(inputs, date_type):
+    """
+    Valor do campo de data correspondente a date_type ('início' ou 'fim')
+
+    Returns:
+        Valor do campo, ou None se a página não exibe esse slicer
+    """
+    for item in inputs:
+        if f"Data de {date_type}".lower() in item['label'].lower():
+            return item['value']
+    for item in inputs:
+        if date_type.lower() in item['label'].lower():
+            return item['value']
+    return None
+
+
+def date_is_current(driver, state, date_type, target_date, inputs=None):
+    """
+    Verifica se o slicer de data já está com target_date
+
+    Lê o campo da página; se o slicer não estiver visível e pertencer a um
+    grupo de sincronização já aplicado com o mesmo valor, considera vigente.
+    """
+    if inputs is None:
+        inputs = read_date_inputs(driver)
+    current = current_date_value(inputs, date_type)
+
+    if current is not None:
+        is_current = current.strip() == target_date
+    else:
+        synced = date_type in state['sync_groups']
+        is_current = synced and state['applied'].get(_key(state, date_type)) == target_date
+
+    if is_current:
+        state['skipped'] += 1
+        state['applied'][_key(state, date_type)] = target_date
+    return is_current
+
+
+def _normalize_values(values):
+    if isinstance(values, str):
+        values = [values]
+    return sorted(re.sub(r"\s+", " ", str(v)).strip().lower() for v in values)
+
+
+def slicer_is_current(driver, state, title, values):
+    """
+    Verifica se o slicer 'title' já está com os valores pedidos
+
+    Usa o texto de resumo do slicer (dropdown) ou os itens marcados; se o
+    slicer não aparece na página, vale o grupo de sincronização.
+    """
+    wanted = _normalize_values(values)
+    selection = driver.execute_script(_READ_SLICER_JS, title)
+
+    if selection.get('found'):
+        selected = _normalize_values(selection['selected']) if selection['selected'] else None
+        restatement = _normalize_values(selection['restatement'].split(', ')) if selection['restatement'] else None
+        is_current = wanted in (selected, restatement)
+    else:
+        synced = title in state['sync_groups']
+        is_current = synced and _normalize_values(state['applied'].get(_key(state, title), [])) == wanted
+
+    if is_current:
+        state['skipped'] += 1
+        state['applied'][_key(state, title)] = values
+    return is_current
@@ -0,0 +1,338 @@
+"""
+Recuperação dos valores dos gráficos a partir da geometria SVG
+
+Quando o Power BI omite ou trunca os aria-labels, o valor de cada marca
+ainda está codificado na geometria: altura das colunas, coordenadas das
+linhas e posição dos ticks dos eixos. Uma única execução de JavaScript
+coleta tudo isso; a escala do eixo é invertida em NumPy para todas as
+marcas de uma vez.
+
+Precisão: as posições vêm em pixels (getBoundingClientRect), então cada
+extremidade tem erro de até meio pixel. O limite reportado é
+
+    0.5 * |escala| por extremidade + maior resíduo do ajuste dos ticks
+
+em unidades do eixo. Apenas eixos lineares e colunas verticais são
+invertidos; séries sem eixo numérico ficam sem valor recuperado.
+"""
+
+from datetime import date
+
+from ons_powerbi import value_parsing
+from ons_powerbi._lazy import lazy_import
+
+
+np = lazy_import('numpy')
+
+# Resíduo máximo aceito no ajuste dos ticks, relativo à faixa do eixo.
+# Acima disso o eixo provavelmente não é linear (ex.: logarítmico).
+MAX_RELATIVE_RESIDUAL = 0.02
+
+# Seletores dos eixos em visuais cartesianos do Power BI
+_Y_TICK_SELECTORS = ['.y.axis .tick', 'g.y.axis g.tick', '[class*="yAxis"] .tick']
+_X_TICK_SELECTORS = ['.x.axis .tick', 'g.x.axis g.tick', '[class*="xAxis"] .tick']
+
+
+_GEOMETRY_JS = """
+const targetClass = arguments[0];
+const additionalSelectors = arguments[1];
+const yTickSelectors = arguments[2];
+const xTickSelectors = arguments[3];
+
+function box(element) {
+    const r = element.getBoundingClientRect();
+    return [r.left, r.top, r.right, r.bottom];
+}
+
+function ticks(container, selectors) {
+    const seen = new Set();
+    const result = [];
+    selectors.forEach(selector => {
+        try {
+            container.querySelectorAll(selector).forEach(tick => {
+                if (seen.has(tick)) return;
+                seen.add(tick);
+                const label = tick.querySelector('text') || tick;
+                const text = (label.textContent || '').trim();
+                if (!text) return;
+                const [left, top, right, bottom] = box(label);
+                result.push({text: text, x: (left + right) / 2, y: (top + bottom) / 2});
+            });
+        } catch (e) {}
+    });
+    return result;
+}
+
+function pathPoints(path) {
+    // Apenas comandos absolutos M/L (o formato gerado pelo Power BI para linhas)
+    const d = path.getAttribute('d') || '';
+    if (/[A-KN-Za-z]/.test(d.replace(/e-?\\d/gi, ''))) return [];
+    const matrix = path.getScreenCTM();
+    const svg = path.ownerSVGElement;
+    if (!matrix || !svg) return [];
+    const numbers = (d.match(/-?\\d*\\.?\\d+(?:e-?\\d+)?/gi) || []).map(Number);
+    const points = [];
+    for (let i = 0; i + 1 < numbers.length; i += 2) {
+        const point = svg.createSVGPoint();
+        point.x = numbers[i];
+        point.y = numbers[i + 1];
+        const screen = point.matrixTransform(matrix);
+        points.push([screen.x, screen.y]);
+    }
+    return points;
+}
+
+// Mesmos seletores e mesma ordem de extract_specific_class_data(), para
+// que (série, elemento) coincidam com os elementos já extraídos
+let selectors = ['.' + targetClass.replace(/\\s+/g, '.'), '[class*="' + targetClass + '"]'];
+if (Array.isArray(additionalSelectors)) selectors = selectors.concat(additionalSelectors);
+
+const containers = [];
+const containerIndex = new Map();
+const series = [];
+
+document.querySelectorAll('[class*="series"]').forEach((seriesElement, seriesIndex) => {
+    const container = seriesElement.closest('.visualContainer, [class*="visualContainer"], visual-container')
+        || seriesElement.ownerSVGElement || document.body;
+    if (!containerIndex.has(container)) {
+        containerIndex.set(container, containers.length);
+        containers.push({
+            y_ticks: ticks(container, yTickSelectors),
+            x_ticks: ticks(container, xTickSelectors)
+        });
+    }
+
+    const elements = new Set();
+    selectors.forEach(selector => {
+        try {
+            seriesElement.querySelectorAll(selector).forEach(element => elements.add(element));
+        } catch (e) {}
+    });
+
+    const marks = Array.from(elements).map(element => ({
+        tag: element.tagName.toLowerCase(),
+        box: box(element)
+    }));
+
+    const lines = [];
+    seriesElement.querySelectorAll('path[class*="line"], path.line').forEach(path => {
+        const points = pathPoints(path);
+        if (points.length) lines.push(points);
+    });
+
+    series.push({
+        series_index: seriesIndex,
+        container: containerIndex.get(container),
+        marks: marks,
+        lines: lines
+    });
+});
+
+return {containers: containers, series: series};
+"""
+
+
+def collect_geometry(driver, target_class='column setFocusRing', additional_selectors=None):
+    """
+    Coleta, em uma única chamada de JavaScript, as caixas das marcas de
+    cada série, os pontos das linhas e os ticks dos eixos de cada visual
+
+    Returns:
+        Dicionário {'containers': [...], 'series': [...]} com coordenadas em pixels
+    """
+    return driver.execute_script(
+        _GEOMETRY_JS, target_class, list(additional_selectors or []),
+        _Y_TICK_SELECTORS, _X_TICK_SELECTORS
+    )
+
+
+def fit_axis_scale(ticks, coordinate='y'):
+    """
+    Ajusta a escala linear valor = a * pixel + b a partir dos ticks do eixo
+
+    Returns:
+        Dicionário {'slope', 'intercept', 'residual', 'ticks'} ou None se
+        houver menos de dois ticks numéricos ou se o eixo não for linear
+    """
+    pixels, values = [], []
+    for tick in ticks:
+        value = value_parsing.parse_number(tick['text'])
+        if value is not None:
+            pixels.append(tick[coordinate])
+            values.append(value)
+
+    if len(set(pixels)) < 2:
+        return None
+
+    pixels = np.asarray(pixels, dtype=float)
+    values = np.asarray(values, dtype=float)
+    slope, intercept = np.polyfit(pixels, values, 1)
+    residual = float(np.max(np.abs(values - (slope * pixels + intercept))))
+
+    value_range = float(np.ptp(values))
+    if slope == 0 or (value_range and residual > MAX_RELATIVE_RESIDUAL * value_range):
+        return None
+
+    return {'slope': float(slope), 'intercept': float(intercept),
+            'residual': residual, 'ticks': len(pixels)}
+
+
+def _tick_dates(ticks):
+    """Posições e datas dos ticks do eixo X que contêm datas"""
+    positions, dates = [], []
+    for tick in ticks:
+        iso = value_parsing.parse_date(tick['text'])
+        if iso:
+            positions.append(tick['x'])
+            dates.append(iso[:10])
+    return positions, dates
+
+
+def categories_for_positions(x_ticks, centers):
+    """
+    Associa cada posição horizontal a uma categoria do eixo X
+
+    Se os ticks forem datas, a data é interpolada linearmente (o Power BI
+    omite ticks em eixos densos); caso contrário usa o rótulo do tick mais
+    próximo, desde que a menos de meio espaçamento entre ticks.
+    """
+    centers = np.asarray(centers, dtype=float)
+    if not len(centers) or not x_ticks:
+        return [None] * len(centers)
+
+    positions, dates = _tick_dates(x_ticks)
+    if len(set(positions)) >= 2:
+        monthly = all(len(iso) == 7 for iso in dates)
+        if monthly:
+            ordinals = [int(iso[:4]) * 12 + int(iso[5:7]) - 1 for iso in dates]
+        else:
+            ordinals = [date.fromisoformat(iso if len(iso) == 10 else iso + '-01').toordinal() for iso in dates]
+        slope, intercept = np.polyfit(np.asarray(positions, dtype=float), np.asarray(ordinals, dtype=float), 1)
+        estimated = np.rint(slope * centers + intercept).astype(int)
+        if monthly:
+            return [f"{ordinal // 12:04d}-{ordinal % 12 + 1:02d}" for ordinal in estimated]
+        return [date.fromordinal(int(ordinal)).isoformat() for ordinal in estimated]
+
+    tick_x = np.asarray([tick['x'] for tick in x_ticks], dtype=float)
+    order = np.argsort(tick_x)
+    tick_x = tick_x[order]
+    labels = [x_ticks[i]['text'] for i in order]
+    spacing = float(np.median(np.diff(tick_x))) if len(tick_x) > 1 else float('inf')
+
+    nearest = np.abs(centers[:, None] - tick_x[None, :]).argmin(axis=1)
+    distance = np.abs(centers - tick_x[nearest])
+    return [labels[i] if d <= spacing / 2 else None for i, d in zip(nearest, distance)]
+
+
+def recover_series_values(series, container):
+    """
+    Reconstrói os valores das marcas e linhas de uma série
+
+    Colunas (rect) usam a altura entre as bordas superior e inferior, o
+    que também vale para colunas empilhadas; demais marcas usam o centro.
+
+    Returns:
+        Dicionário com 'values' e 'categories' (alinhados às marcas),
+        'lines' (lista de pontos {'category', 'value'}), 'precision' e 'scale'
+    """
+    result = {'values': [None] * len(series['marks']), 'categories': [None] * len(series['marks']),
+              'lines': [], 'precision': None, 'scale': None}
+
+    scale = fit_axis_scale(container['y_ticks'])
+    if scale is None:
+        return result
+    a, b = scale['slope'], scale['intercept']
+    half_pixel = 0.5 * abs(a)
+    result['scale'] = scale
+
+    if series['marks']:
+        boxes = np.asarray([mark['box'] for mark in series['marks']], dtype=float)
+        left, top, right, bottom = boxes.T
+        is_column = np.asarray([mark['tag'] == 'rect' for mark in series['marks']])
+
+        v_top, v_bottom = a * top + b, a * bottom + b
+        zero_px = -b / a
+        # Colunas negativas começam na linha de base e descem
+        below_baseline = (top >= zero_px - 0.5) & (bottom > zero_px + 0.5)
+        column_values = np.where(below_baseline, v_bottom - v_top, v_top - v_bottom)
+        point_values = a * (top + bottom) / 2 + b
+
+        values = np.where(is_column, column_values, point_values)
+        result['values'] = [float(v) for v in values]
+        result['categories'] = categories_for_positions(container['x_ticks'], (left + right) / 2)
+        result['precision'] = (2 if is_column.any() else 1) * half_pixel + scale['residual']
+
+    for points in series['lines']:
+        points = np.asarray(points, dtype=float)
+        values = a * points[:, 1] + b
+        categories = categories_for_positions(container['x_ticks'], points[:, 0])
+        result['lines'].append([{'category': c, 'value': float(v)} for c, v in zip(categories, values)])
+        if result['precision'] is None:
+            result['precision'] = half_pixel + scale['residual']
+
+    return result
+
+
+def attach_geometry_values(driver, page_data, target_class='column setFocusRing', additional_selectors=None):
+    """
+    Acrescenta aos elementos de page_data os valores recuperados da geometria
+
+    Cada elemento recebe 'geometry_value', 'geometry_category' e
+    'geometry_precision'; séries com linhas recebem 'geometry_lines'.
+
+    Returns:
+        Número de marcas com valor recuperado
+    """
+    geometry = collect_geometry(driver, target_class, additional_selectors)
+    recovered = 0
+
+    by_index = {series['series_index']: series for series in geometry['series']}
+    for series_index, series in enumerate(page_data.get('series', [])):
+        geometry_series = by_index.get(series.get('series_index', series_index))
+        if geometry_series is None:
+            continue
+
+        values = recover_series_values(geometry_series, geometry['containers'][geometry_series['container']])
+        if values['precision'] is None:
+            continue
+
+        series['geometry_precision'] = values['precision']
+        if values['lines']:
+            series['geometry_lines'] = values['lines']
+
+        elements = series.get('elements', [])
+        if len(elements) != len(values['values']):
+            # A página mudou entre as duas leituras; não arrisca desalinhar
+            continue
+        for element, value, category in zip(elements, values['values'], values['categories']):
+            element['geometry_value'] = value
+            element['geometry_category'] = category
+            element['geometry_precision'] = values['precision']
+            recovered += 1
+
+    return recovered
+
+
+def fill_missing_points(df):
+    """
+    Completa 'Data' e 'Valor' do DataFrame consolidado com a geometria
+
+    Só preenche onde o aria-label/texto (e o tooltip) não trouxeram o dado;
+    a coluna 'Fonte_Valor' indica a origem ('aria', 'tooltip' ou 'geometria').
+    Opera no próprio DataFrame e o retorna.
+    """
+    if 'Valor_Geometria' not in df.columns:
+        return df
+
+    if 'Fonte_Valor' not in df.columns:
+        df['Fonte_Valor'] = None
+        df.loc[df['Valor'].notna(), 'Fonte_Valor'] = 'aria'
+
+    missing_value = df['Valor'].isna() & df['Valor_Geometria'].notna()
+    df.loc[missing_value, 'Valor'] = df.loc[missing_value, 'Valor_Geometria']
+    df.loc[missing_value, 'Fonte_Valor'] = 'geometria'
+
+    missing_date = df['Data'].isna() & df['Categoria_Geometria'].notna()
+    df.loc[missing_date, 'Data'] = [value_parsing.parse_date(c) for c in df.loc[missing_date, 'Categoria_Geometria']]
+    return df
+
@@ -0,0 +1,318 @@
+"""
+Serialização rápida e compacta do resultado completo da extração
+
+Formatos suportados:
+    'json'  - JSON tradicional (um único documento, indentado)
+    'jsonl' - JSON Lines compacto: um cabeçalho, uma linha por página e
+              uma linha por série, permitindo leitura preguiçosa série a série
+
+Compressão opcional em streaming ('gzip' ou 'zstd') e backend orjson
+quando disponível (com fallback para o módulo json padrão).
+"""
+
+import gzip
+import io
+import json
+import os
+
+try:
+    import orjson
+except ImportError:  # orjson é opcional
+    orjson = None
+
+from ons_powerbi._lazy import is_available, lazy_import
+
+
+# zstandard é opcional e só é importado ao gravar/ler arquivos .zst
+zstandard = lazy_import('zstandard')
+
+
+JSONL_FORMAT_NAME = "ons_powerbi_jsonl"
+JSONL_FORMAT_VERSION = 1
+
+COMPRESSION_EXTENSIONS = {
+    None: "",
+    'gzip': ".gz",
+    'zstd': ".zst",
+}
+
+_GZIP_MAGIC = b"\x1f\x8b"
+_ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+
+def json_backend_name():
+    """Retorna o nome do backend JSON em uso ('orjson' ou 'json')"""
+    return "orjson" if orjson is not None else "json"
+
+
+def dumps_bytes(obj, indent=False):
+    """
+    Serializa um objeto para bytes UTF-8 usando o backend mais rápido disponível
+
+    Args:
+        obj: Objeto serializável em JSON
+        indent: Se True, gera saída indentada com 2 espaços
+    """
+    if orjson is not None:
+        option = orjson.OPT_INDENT_2 if indent else 0
+        try:
+            return orjson.dumps(obj, option=option | orjson.OPT_SERIALIZE_NUMPY)
+        except TypeError:
+            # Tipos que o orjson não suporta (ex.: chaves não-string) vão para o json padrão
+            pass
+    if indent:
+        return json.dumps(obj, indent=2, ensure_ascii=False).encode('utf-8')
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def loads(data):
+    """Desserializa bytes ou str JSON usando o backend mais rápido disponível"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def output_filename(prefix, json_format='json', compression=None):
+    """
+    Monta o nome do arquivo de saída para o formato e compressão escolhidos
+
+    Ex.: ons_powerbi_data_complete.json, ons_powerbi_data_complete.jsonl.zst
+    """
+    if compression not in COMPRESSION_EXTENSIONS:
+        raise ValueError(f"Compressão não suportada: {compression!r}")
+    extension = ".jsonl" if json_format == 'jsonl' else ".json"
+    return f"{prefix}_data_complete{extension}{COMPRESSION_EXTENSIONS[compression]}"
+
+
+def _open_write(path, compression):
+    """Abre um stream binário de escrita, com compressão em streaming se solicitada"""
+    if compression is None:
+        return open(path, 'wb')
+    if compression == 'gzip':
+        return gzip.open(path, 'wb', compresslevel=6)
+    if compression == 'zstd':
+        if not is_available('zstandard'):
+            raise RuntimeError("Compressão zstd requer o pacote 'zstandard' (pip install zstandard)")
+        raw = open(path, 'wb')
+        return zstandard.ZstdCompressor(level=3).stream_writer(raw, closefd=True)
+    raise ValueError(f"Compressão não suportada: {compression!r}")
+
+
+def _open_read(path):
+    """Abre um stream binário de leitura, detectando a compressão pelos magic bytes"""
+    with open(path, 'rb') as f:
+        magic = f.read(4)
+
+    if magic.startswith(_GZIP_MAGIC):
+        return gzip.open(path, 'rb')
+    if magic.startswith(_ZSTD_MAGIC):
+        if not is_available('zstandard'):
+            raise RuntimeError("Leitura de arquivo zstd requer o pacote 'zstandard' (pip install zstandard)")
+        raw = open(path, 'rb')
+        return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(raw, closefd=True))
+    return open(path, 'rb')
+
+
+def compact_series(series):
+    """
+    Remove campos redundantes de uma série para serialização compacta
+
+    - 'inner_text' é omitido quando idêntico a 'text_content'
+    - 'series_summary.unique_texts' é omitido (é derivável dos elementos)
+
+    A operação é revertida por expand_series().
+    """
+    compacted = dict(series)
+
+    elements = []
+    for element in series.get('elements', []):
+        element = dict(element)
+        if element.get('inner_text') == element.get('text_content'):
+            element.pop('inner_text', None)
+        elements.append(element)
+    compacted['elements'] = elements
+
+    summary = series.get('series_summary')
+    if isinstance(summary, dict) and 'unique_texts' in summary:
+        summary = dict(summary)
+        summary.pop('unique_texts')
+        compacted['series_summary'] = summary
+
+    return compacted
+
+
+def expand_series(series):
+    """Restaura os campos removidos por compact_series() (opera no próprio dicionário)"""
+    for element in series.get('elements', []):
+        if 'inner_text' not in element:
+            element['inner_text'] = element.get('text_content', '')
+
+    summary = series.get('series_summary')
+    if isinstance(summary, dict) and 'unique_texts' not in summary:
+        # dict.fromkeys preserva a ordem de primeira ocorrência, como o Set do JavaScript
+        summary['unique_texts'] = list(dict.fromkeys(
+            element['text_content'] for element in series.get('elements', [])
+            if element.get('text_content')
+        ))
+
+    return series
+
+
+def write_json(data, path, compression=None):
+    """Grava o resultado completo como um único documento JSON indentado"""
+    with _open_write(path, compression) as f:
+        f.write(dumps_bytes(data, indent=True))
+    return path
+
+
+def write_jsonl(data, path, compression=None, compact=True):
+    """
+    Grava o resultado completo em JSON Lines, uma série por linha
+
+    Estrutura das linhas:
+        {"_type": "header", ...}             - metadados do resultado (sem 'pages')
+        {"_type": "page", "page_number": N, "data": {...}}   - página sem 'series'
+        {"_type": "series", "page_number": N, "series": {...}}
+
+    Args:
+        data: Resultado de extract_all_pages_data()
+        path: Caminho do arquivo de saída
+        compression: None, 'gzip' ou 'zstd'
+        compact: Remove campos redundantes (ver compact_series)
+    """
+    header_data = {key: value for key, value in data.items() if key != 'pages'}
+
+    with _open_write(path, compression) as f:
+        f.write(dumps_bytes({
+            '_type': 'header',
+            'format': JSONL_FORMAT_NAME,
+            'version': JSONL_FORMAT_VERSION,
+            'compact': compact,
+            'has_pages': 'pages' in data,
+            'data': header_data,
+        }))
+        f.write(b"\n")
+
+        for page in data.get('pages', []):
+            page_number = page.get('page_number')
+            page_meta = {key: value for key, value in page.items() if key != 'series'}
+            f.write(dumps_bytes({
+                '_type': 'page',
+                'page_number': page_number,
+                'has_series': 'series' in page,
+                'data': page_meta,
+            }))
+            f.write(b"\n")
+
+            for series in page.get('series', []):
+                f.write(dumps_bytes({
+                    '_type': 'series',
+                    'page_number': page_number,
+                    'series': compact_series(series) if compact else series,
+                }))
+                f.write(b"\n")
+
+    return path
+
+
+def save_complete_json(data, output_folder=".", prefix="powerbi", json_format='json', compression=None):
+    """
+    Salva o resultado completo no formato escolhido e retorna o caminho gerado
+
+    Args:
+        data: Resultado de extract_all_pages_data()
+        output_folder: Pasta de destino
+        prefix: Prefixo do arquivo
+        json_format: 'json' (documento único) ou 'jsonl' (compacto, uma série por linha)
+        compression: None, 'gzip' ou 'zstd'
+    """
+    path = os.path.join(output_folder, output_filename(prefix, json_format, compression))
+    if json_format == 'jsonl':
+        return write_jsonl(data, path, compression=compression)
+    if json_format == 'json':
+        return write_json(data, path, compression=compression)
+    raise ValueError(f"Formato JSON não suportado: {json_format!r}")
+
+
+def _iter_jsonl_records(path):
+    """Itera sobre as linhas de um arquivo JSONL (comprimido ou não) sem carregá-lo inteiro"""
+    with _open_read(path) as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield line
+
+
+def _is_jsonl(path):
+    """Verifica se o arquivo está no formato JSONL deste módulo"""
+    with _open_read(path) as f:
+        first_line = f.readline()
+    try:
+        header = loads(first_line)
+    except ValueError:
+        return False
+    return isinstance(header, dict) and header.get('format') == JSONL_FORMAT_NAME
+
+
+def iter_series(path):
+    """
+    Lê as séries de um arquivo salvo de forma preguiçosa, uma de cada vez
+
+    Para arquivos JSONL, apenas uma série fica em memória por vez.
+    Arquivos JSON tradicionais são carregados inteiros (compatibilidade).
+
+    Yields:
+        (page_number, series)
+    """
+    if not _is_jsonl(path):
+        for page in load_data(path).get('pages', []):
+            for series in page.get('series', []):
+                yield page.get('page_number'), series
+        return
+
+    compact = False
+    for line in _iter_jsonl_records(path):
+        # Linhas de série são identificadas pelo prefixo, sem decodificar as demais
+        if line.startswith(b'{"_type":"series"'):
+            record = loads(line)
+            series = record['series']
+            yield record['page_number'], expand_series(series) if compact else series
+        elif line.startswith(b'{"_type":"header"'):
+            compact = loads(line).get('compact', False)
+
+
+def load_data(path):
+    """
+    Carrega o resultado completo de um arquivo JSON ou JSONL (comprimido ou não)
+
+    Retorna a mesma estrutura produzida por extract_all_pages_data().
+    """
+    if not _is_jsonl(path):
+        with _open_read(path) as f:
+            return loads(f.read())
+
+    data = {}
+    pages = []
+    compact = False
+    has_pages = False
+
+    for line in _iter_jsonl_records(path):
+        record = loads(line)
+        record_type = record.get('_type')
+
+        if record_type == 'header':
+            data.update(record.get('data', {}))
+            compact = record.get('compact', False)
+            has_pages = record.get('has_pages', True)
+        elif record_type == 'page':
+            page = dict(record.get('data', {}))
+            if record.get('has_series', True):
+                page['series'] = []
+            pages.append(page)
+        elif record_type == 'series':
+            series = record['series']
+            pages[-1]['series'].append(expand_series(series) if compact else series)
+
+    if has_pages:
+        data['pages'] = pages
+    return data
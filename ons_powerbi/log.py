@@ -0,0 +1,185 @@
+"""
+Log estruturado e modo silencioso das extrações
+
+Os extratores escrevem o progresso com print(); em execuções grandes as
+prévias (to_string() dos DataFrames, primeiros elementos de cada série)
+custam tempo e não servem para nada sob um agendador. Este módulo:
+
+    - registra eventos com nível em JSON Lines (um objeto por linha), em
+      arquivo ou na saída padrão ('-');
+    - no modo silencioso descarta os print() do console; avisos e erros
+      (registrados por aqui ou impressos com ⚠️/❌) continuam indo para
+      stderr;
+    - só calcula as prévias quando elas estão ligadas (preview() recebe
+      uma função) - desligadas por padrão quando a saída não é um
+      terminal (cron, jobs, CI);
+    - acumula contadores e monta o resumo final só quando pedido.
+
+Uso:
+    log.configure(level='info', json_path='execucao.jsonl', quiet=True)
+    log.event('unit_done', page=3, seconds=12.4)
+    log.preview(lambda: df.head(10).to_string())
+    ...
+    log.close()  # devolve o console e fecha o arquivo de eventos
+"""
+
+import io
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+
+from ons_powerbi import json_export
+
+
+LEVELS = {'debug': 10, 'info': 20, 'warning': 30, 'error': 40}
+
+_config = {
+    'level': LEVELS['info'],
+    'quiet': False,
+    'previews': None,       # None: decide pelo terminal
+    'json_stream': None,
+    'console': sys.stdout,  # saída real do console (antes do modo silencioso)
+}
+_counters = {}
+_started_at = time.time()
+_lock = threading.Lock()
+
+
+# Linhas impressas com estes marcadores são avisos/erros e não são descartadas
+_STDERR_MARKERS = ('⚠', '❌')
+
+
+class _QuietStream(io.TextIOBase):
+    """Destino do print() no modo silencioso: descarta o progresso e repassa avisos e erros ao stderr"""
+
+    def __init__(self):
+        self._pending = threading.local()  # linha incompleta de cada thread
+
+    def write(self, text):
+        *lines, rest = (getattr(self._pending, 'text', '') + text).split('\n')
+        self._pending.text = rest
+        for line in lines:
+            if line.lstrip().startswith(_STDERR_MARKERS):
+                sys.stderr.write(line + '\n')
+        return len(text)
+
+    def isatty(self):
+        return False
+
+
+def configure(level='info', json_path=None, quiet=False, previews=None):
+    """
+    Configura o log da execução
+
+    Args:
+        level: Nível mínimo ('debug', 'info', 'warning', 'error')
+        json_path: Arquivo JSON Lines dos eventos ('-' = saída padrão; None desativa)
+        quiet: Silencia os print() do console
+        previews: Liga/desliga as prévias (None: só quando a saída é um terminal)
+    """
+    with _lock:
+        if _config['json_stream'] not in (None, _config['console']):
+            _config['json_stream'].close()
+
+        _config['level'] = LEVELS[level]
+        _config['quiet'] = quiet
+        _config['previews'] = previews
+
+        if json_path == '-':
+            _config['json_stream'] = _config['console']
+        elif json_path:
+            folder = os.path.dirname(json_path)
+            if folder and not os.path.exists(folder):
+                os.makedirs(folder)
+            _config['json_stream'] = open(json_path, 'a', encoding='utf-8', buffering=1)
+        else:
+            _config['json_stream'] = None
+
+    # JSON na saída padrão também silencia o texto, para não misturar os dois
+    sys.stdout = _QuietStream() if quiet or json_path == '-' else _config['console']
+
+
+def close():
+    """Devolve o console ao sys.stdout e fecha o arquivo de eventos"""
+    with _lock:
+        if _config['json_stream'] not in (None, _config['console']):
+            _config['json_stream'].close()
+        _config['json_stream'] = None
+        _config['quiet'] = False
+    sys.stdout = _config['console']
+
+
+def previews_enabled():
+    """True se as prévias devem ser calculadas e mostradas"""
+    if _config['previews'] is not None:
+        return _config['previews']
+    return not _config['quiet'] and _config['console'].isatty()
+
+
+def preview(render):
+    """Mostra a prévia devolvida por render() - que só é chamada se as prévias estão ligadas"""
+    if previews_enabled():
+        print(render())
+
+
+def event(name, level='info', message=None, **fields):
+    """
+    Registra um evento estruturado
+
+    Args:
+        name: Nome do evento (ex.: 'unit_done')
+        level: Nível do evento
+        message: Texto para o console (avisos/erros vão para stderr no modo silencioso)
+        fields: Campos do evento (serializáveis em JSON)
+    """
+    severity = LEVELS[level]
+    if severity < _config['level']:
+        return
+
+    stream = _config['json_stream']
+    if stream is not None:
+        record = {'ts': datetime.now().isoformat(timespec='milliseconds'), 'level': level, 'event': name}
+        record.update(fields)
+        if message:
+            record['message'] = message
+        line = json_export.dumps_bytes(record).decode('utf-8')
+        with _lock:
+            stream.write(line + '\n')
+
+    if message:
+        if not _config['quiet'] and _config['json_stream'] is not _config['console']:
+            print(message)
+        elif severity >= LEVELS['warning']:
+            print(message, file=sys.stderr)
+
+
+def debug(message, name='debug', **fields):
+    event(name, 'debug', message, **fields)
+
+
+def info(message, name='info', **fields):
+    event(name, 'info', message, **fields)
+
+
+def warning(message, name='warning', **fields):
+    event(name, 'warning', message, **fields)
+
+
+def error(message, name='error', **fields):
+    event(name, 'error', message, **fields)
+
+
+def count(name, amount=1):
+    """Soma em um contador do resumo final"""
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + amount
+
+
+def summary():
+    """Resumo da execução (contadores e duração), calculado no momento da chamada"""
+    with _lock:
+        counters = dict(_counters)
+    counters['seconds'] = round(time.time() - _started_at, 1)
+    return counters
@@ -0,0 +1,127 @@
+"""
+Vigia de memória das sessões do navegador
+
+O Power BI vaza memória ao longo de navegações longas: depois de muitas
+páginas e janelas de datas o Chrome passa de alguns GB e cada
+execute_script fica mais lento. Entre uma unidade e outra o vigia mede:
+
+    - heap de JavaScript da aba (CDP Runtime.getHeapUsage, ou
+      performance.memory quando o CDP não está disponível)
+    - RSS dos processos do Chrome da sessão (opcional, requer psutil)
+
+e indica a reciclagem quando um limite absoluto é ultrapassado ou quando
+o heap cresce além de growth_factor vezes o valor medido logo após o
+carregamento. O estado é um dict guardado na sessão (session['watchdog']).
+"""
+
+from ons_powerbi._lazy import is_available, lazy_import
+
+
+psutil = lazy_import('psutil')
+
+DEFAULT_MAX_HEAP_MB = 768
+DEFAULT_MAX_RSS_MB = 3072
+DEFAULT_GROWTH_FACTOR = 3.0
+
+_MB = 1024 * 1024
+
+_PERFORMANCE_MEMORY_JS = """
+return window.performance && performance.memory ? performance.memory.usedJSHeapSize : null;
+"""
+
+
+def new_watchdog(max_heap_mb=DEFAULT_MAX_HEAP_MB, max_rss_mb=DEFAULT_MAX_RSS_MB,
+                 growth_factor=DEFAULT_GROWTH_FACTOR):
+    """
+    Cria o estado do vigia de uma sessão
+
+    Args:
+        max_heap_mb: Heap de JavaScript máximo da aba (None desativa)
+        max_rss_mb: RSS máximo dos processos do Chrome (None desativa)
+        growth_factor: Crescimento máximo do heap em relação ao início (None desativa)
+    """
+    return {
+        'max_heap_mb': max_heap_mb,
+        'max_rss_mb': max_rss_mb,
+        'growth_factor': growth_factor,
+        'baseline_heap_mb': None,
+        'last': None,
+        'peak_heap_mb': 0,
+        'recycles': 0,
+    }
+
+
+def js_heap_mb(driver):
+    """Heap de JavaScript em uso na aba atual (MB), ou None se não for possível medir"""
+    try:
+        used = driver.execute_cdp_cmd('Runtime.getHeapUsage', {})['usedSize']
+    except Exception:
+        try:
+            used = driver.execute_script(_PERFORMANCE_MEMORY_JS)
+        except Exception:
+            used = None
+    return None if used is None else round(used / _MB, 1)
+
+
+def chrome_rss_mb(driver):
+    """
+    RSS somado do Chrome iniciado pelo driver e seus subprocessos (MB)
+
+    Returns:
+        None se psutil não está instalado ou o driver não iniciou o Chrome
+        (ex.: driver conectado a um Chrome existente via debuggerAddress)
+    """
+    if not is_available('psutil'):
+        return None
+    try:
+        service = psutil.Process(driver.service.process.pid)
+        processes = service.children(recursive=True)
+    except Exception:
+        return None
+    if not processes:
+        return None
+
+    total = 0
+    for process in processes:
+        try:
+            total += process.memory_info().rss
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            pass
+    return round(total / _MB, 1)
+
+
+def sample(watchdog, driver):
+    """Mede heap e RSS e atualiza o estado; retorna a amostra"""
+    current = {'heap_mb': js_heap_mb(driver), 'rss_mb': chrome_rss_mb(driver)}
+    if current['heap_mb'] is not None:
+        if watchdog['baseline_heap_mb'] is None:
+            watchdog['baseline_heap_mb'] = current['heap_mb']
+        watchdog['peak_heap_mb'] = max(watchdog['peak_heap_mb'], current['heap_mb'])
+    watchdog['last'] = current
+    return current
+
+
+def check(watchdog, driver):
+    """
+    Mede a sessão e decide se ela deve ser reciclada
+
+    Returns:
+        Motivo da reciclagem (texto) ou None se a sessão está dentro dos limites
+    """
+    current = sample(watchdog, driver)
+    heap, rss = current['heap_mb'], current['rss_mb']
+    baseline = watchdog['baseline_heap_mb']
+
+    if heap is not None and watchdog['max_heap_mb'] and heap > watchdog['max_heap_mb']:
+        return f"heap {heap} MB > {watchdog['max_heap_mb']} MB"
+    if rss is not None and watchdog['max_rss_mb'] and rss > watchdog['max_rss_mb']:
+        return f"RSS {rss} MB > {watchdog['max_rss_mb']} MB"
+    if heap is not None and baseline and watchdog['growth_factor'] and heap > baseline * watchdog['growth_factor']:
+        return f"heap {heap} MB cresceu mais de {watchdog['growth_factor']}x (início: {baseline} MB)"
+    return None
+
+
+def reset(watchdog):
+    """Registra a reciclagem: a próxima medição vira a nova referência"""
+    watchdog['recycles'] += 1
+    watchdog['baseline_heap_mb'] = None
@@ -0,0 +1,127 @@
+"""
+Captura filtrada e incremental das requisições de rede do Chrome
+
+O log de performance do ChromeDriver acumula todos os eventos da página
+(pintura, layout, rede...) até ser lido. Este módulo:
+
+- restringe o log, na origem, ao domínio Network (perfLoggingPrefs);
+- esvazia o buffer de forma incremental (drain) durante a execução;
+- descarta eventos irrelevantes por comparação de texto, antes do json.loads;
+- mantém apenas as últimas max_entries requisições em memória.
+"""
+
+import json
+from collections import deque
+
+
+# Palavras-chave das URLs do Power BI que podem conter dados
+DEFAULT_URL_KEYWORDS = ('query', 'data', 'api', 'execute')
+
+DEFAULT_EVENTS = ('Network.responseReceived',)
+
+DEFAULT_MAX_ENTRIES = 5000
+
+
+def enable_network_capture(options):
+    """
+    Ativa no ChromeOptions o log de performance restrito a eventos de rede
+
+    Os eventos de página/timeline (pintura, layout) não são gerados.
+    """
+    options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+    options.add_experimental_option('perfLoggingPrefs', {
+        'enableNetwork': True,
+        'enablePage': False,
+    })
+    return options
+
+
+class NetworkObserver:
+    """
+    Consome o log de performance de um driver, guardando só o que interessa
+
+    Args:
+        driver: Selenium WebDriver com enable_network_capture() aplicado
+        url_keywords: Trechos de URL (minúsculos) que tornam a requisição relevante
+        events: Métodos CDP a considerar (ex.: 'Network.responseReceived')
+        max_entries: Máximo de requisições mantidas em memória
+    """
+
+    def __init__(self, driver, url_keywords=DEFAULT_URL_KEYWORDS, events=DEFAULT_EVENTS,
+                 max_entries=DEFAULT_MAX_ENTRIES):
+        self.driver = driver
+        self.url_keywords = tuple(keyword.lower() for keyword in url_keywords)
+        self.events = tuple(events)
+        self.entries = deque(maxlen=max_entries)
+        self.seen_events = 0
+        self.parsed_events = 0
+        self._event_markers = tuple(f'"method":"{event}"' for event in self.events)
+
+    def _is_candidate(self, message):
+        """Filtro barato no texto bruto, sem decodificar o JSON"""
+        if not any(marker in message for marker in self._event_markers):
+            return False
+        lowered = message.lower()
+        return any(keyword in lowered for keyword in self.url_keywords)
+
+    def drain(self):
+        """
+        Lê e esvazia o buffer do log de performance
+
+        Returns:
+            Lista das novas requisições relevantes encontradas nesta leitura
+        """
+        try:
+            logs = self.driver.get_log('performance')
+        except Exception as e:
+            print(f"  ⚠️  Log de performance indisponível: {e}")
+            return []
+
+        new_entries = []
+        for entry in logs:
+            self.seen_events += 1
+            message = entry.get('message', '')
+            if not self._is_candidate(message):
+                continue
+
+            self.parsed_events += 1
+            try:
+                log = json.loads(message)['message']
+            except (ValueError, KeyError):
+                continue
+
+            if log.get('method') not in self.events:
+                continue
+
+            params = log.get('params', {})
+            response = params.get('response', {})
+            url = response.get('url', '')
+            if not any(keyword in url.lower() for keyword in self.url_keywords):
+                continue
+
+            record = {
+                'url': url,
+                'status': response.get('status'),
+                'mimeType': response.get('mimeType'),
+                'requestId': params.get('requestId'),
+            }
+            self.entries.append(record)
+            new_entries.append(record)
+
+        return new_entries
+
+    def get_response_body(self, request_id):
+        """Obtém o corpo de uma resposta via CDP (enquanto o Chrome ainda o mantém)"""
+        try:
+            result = self.driver.execute_cdp_cmd('Network.getResponseBody', {'requestId': request_id})
+        except Exception:
+            return None
+        return result.get('body')
+
+    def stats(self):
+        """Resumo da captura: eventos lidos, decodificados e requisições mantidas"""
+        return {
+            'events_seen': self.seen_events,
+            'events_parsed': self.parsed_events,
+            'requests_kept': len(self.entries),
+        }
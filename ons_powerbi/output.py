@@ -0,0 +1,15 @@
+"""Pastas de saída dos arquivos gerados"""
+
+import os
+
+
+DEFAULT_OUTPUT_FOLDER = "extracao_powerbi"
+
+
+def create_output_folder(folder_name=DEFAULT_OUTPUT_FOLDER):
+    """Cria pasta para salvar os arquivos gerados"""
+    if not os.path.exists(folder_name):
+        os.makedirs(folder_name)
+        print(f"📁 Pasta criada: {folder_name}")
+    
+    return folder_name
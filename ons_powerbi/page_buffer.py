@@ -0,0 +1,173 @@
+"""
+Leitura em fatias de resultados grandes montados na página
+
+Os scripts de extração montam o resultado inteiro no navegador e o
+devolvem em um único execute_script. Com todas as séries (e, no caso de
+extract_powerbi_visuals, todas as linhas do innerText) isso gera uma
+única mensagem enorme: pode passar do limite do WebDriver e exige um
+json.loads gigante dos dois lados.
+
+Protocolo:
+    1. stash() executa o script e guarda o resultado em um buffer na
+       página (window.__onsBuffers); devolve só o "esqueleto", com os
+       campos grandes substituídos por {'__chunked__': True, 'length': n};
+    2. iter_slices() busca cada campo em fatias limitadas por número de
+       itens e por tamanho (caracteres do JSON), e cada fatia é entregue
+       ao Python assim que chega. Um item que sozinho passa do limite
+       (ex.: uma série com milhares de elementos) vem com as listas
+       internas marcadas como campos em fatias, lidas do mesmo jeito;
+    3. release() apaga o buffer da página.
+
+fetch() faz as três etapas; campos com consumidor são repassados fatia a
+fatia sem ficarem acumulados em memória.
+"""
+
+import json
+
+from ons_powerbi import log
+
+
+DEFAULT_MAX_ITEMS = 500
+DEFAULT_MAX_CHARS = 2 * 1024 * 1024
+
+_STASH_JS = """
+const chunkedFields = %(fields)s;
+const result = (function() { %(body)s }).apply(null, arguments);
+if (result === null || typeof result !== 'object') return {id: null, skeleton: result};
+
+window.__onsBuffers = window.__onsBuffers || {};
+const id = 'b' + Date.now().toString(36) + Math.random().toString(36).slice(2);
+window.__onsBuffers[id] = result;
+
+const skeleton = {};
+for (const key of Object.keys(result)) {
+    const value = result[key];
+    skeleton[key] = chunkedFields.includes(key) && Array.isArray(value)
+        ? {__chunked__: true, length: value.length}
+        : value;
+}
+return {id: id, skeleton: skeleton};
+"""
+
+_SLICE_JS = """
+// Fatia [start, ...) da lista no caminho, parando em maxItems itens ou maxChars caracteres de JSON
+let items = (window.__onsBuffers || {})[arguments[0]];
+for (const key of arguments[1]) items = items == null ? undefined : items[key];
+if (!Array.isArray(items)) return null;
+const start = arguments[2], maxItems = arguments[3], maxChars = arguments[4];
+const slice = [];
+let size = 0;
+for (let i = start; i < items.length && slice.length < maxItems; i++) {
+    let item = items[i];
+    let itemSize = JSON.stringify(item).length;
+    if (itemSize > maxChars && item && typeof item === 'object' && !Array.isArray(item)) {
+        // Item maior que uma fatia: as listas internas são lidas à parte
+        const shallow = {};
+        for (const key of Object.keys(item)) {
+            shallow[key] = Array.isArray(item[key]) ? {__chunked__: true, length: item[key].length} : item[key];
+        }
+        item = shallow;
+        itemSize = JSON.stringify(item).length;
+    }
+    if (slice.length && size + itemSize > maxChars) break;
+    slice.push(item);
+    size += itemSize;
+}
+return slice;
+"""
+
+_RELEASE_JS = """
+if (window.__onsBuffers) delete window.__onsBuffers[arguments[0]];
+"""
+
+
+def is_chunked(value):
+    """True se o valor do esqueleto é um campo guardado no buffer"""
+    return isinstance(value, dict) and value.get('__chunked__') is True
+
+
+def stash(driver, script_body, chunked_fields, *args):
+    """
+    Executa o corpo de script (que termina em 'return ...') e guarda o resultado na página
+
+    Returns:
+        (id do buffer, esqueleto) - id é None se o script não devolveu um objeto
+    """
+    script = _STASH_JS % {'fields': json.dumps(list(chunked_fields)), 'body': script_body}
+    stashed = driver.execute_script(script, *args)
+    return stashed['id'], stashed['skeleton']
+
+
+def iter_slices(driver, buffer_id, field, length, max_items=DEFAULT_MAX_ITEMS, max_chars=DEFAULT_MAX_CHARS):
+    """
+    Gera as fatias (listas) de um campo do buffer, na ordem
+
+    field é o nome do campo ou o caminho até uma lista interna (ex.:
+    ['series', 3, 'elements']). Os itens maiores que max_chars chegam
+    completos: as listas internas deles são buscadas em fatias antes.
+    """
+    path = [field] if isinstance(field, str) else list(field)
+    start = 0
+    while start < length:
+        items = driver.execute_script(_SLICE_JS, buffer_id, path, start, max_items, max_chars)
+        if not items:
+            raise RuntimeError(f"Buffer {buffer_id} perdido na página (campo {path}, item {start})")
+        for offset, item in enumerate(items):
+            if not isinstance(item, dict):
+                continue
+            for key, value in item.items():
+                if is_chunked(value):
+                    item[key] = [inner for part in iter_slices(driver, buffer_id, path + [start + offset, key],
+                                                               value['length'], max_items, max_chars)
+                                 for inner in part]
+        start += len(items)
+        yield items
+
+
+def release(driver, buffer_id):
+    """Apaga o buffer da página"""
+    try:
+        driver.execute_script(_RELEASE_JS, buffer_id)
+    except Exception:
+        pass  # página recarregada: o buffer já não existe
+
+
+def fetch(driver, script_body, chunked_fields, consumers=None, max_items=DEFAULT_MAX_ITEMS,
+          max_chars=DEFAULT_MAX_CHARS):
+    """
+    Executa o script e traz o resultado em fatias
+
+    Args:
+        driver: Selenium WebDriver
+        script_body: Corpo do script (termina em 'return <objeto>')
+        chunked_fields: Campos (listas) do resultado lidos em fatias
+        consumers: {campo: função(fatia)}; esses campos são repassados fatia a
+            fatia e ficam no resultado apenas como o total de itens
+        max_items / max_chars: Limites de cada fatia
+
+    Returns:
+        O objeto devolvido pelo script (None se o script devolveu null)
+    """
+    consumers = consumers or {}
+    buffer_id, result = stash(driver, script_body, chunked_fields)
+    if buffer_id is None:
+        return result
+
+    try:
+        slices = 0
+        for field, value in list(result.items()):
+            if not is_chunked(value):
+                continue
+            consumer = consumers.get(field)
+            collected = []
+            for items in iter_slices(driver, buffer_id, field, value['length'], max_items, max_chars):
+                slices += 1
+                if consumer is not None:
+                    consumer(items)
+                else:
+                    collected.extend(items)
+            result[field] = value['length'] if consumer is not None else collected
+        log.debug(f"  ↳ resultado lido em {slices} fatia(s)", 'page_buffer', slices=slices)
+    finally:
+        release(driver, buffer_id)
+    return result
@@ -0,0 +1,332 @@
+"""
+API HTTP local de leitura das séries extraídas
+
+Serve o banco local (ver store) sem que os consumidores varram as pastas
+extracao_powerbi/. Na partida, e sempre que uma nova execução é gravada,
+os valores vigentes de cada série são carregados em um índice em memória:
+datas ordenadas por série, com busca binária (bisect) nos intervalos.
+
+Rotas (GET):
+    /health                   versão do índice, séries e pontos
+    /series                   lista das séries (rótulo, página, dimensões, datas)
+    /series/<id>?start=&end=  pontos da série no intervalo
+    /latest?label=&page=      último valor de cada série
+
+Formato: ?format=json (lista de registros, padrão), columns (colunar:
+{'date': [...], 'value': [...]}) ou csv. Todas as respostas têm ETag; um
+GET com If-None-Match igual recebe 304 sem corpo.
+"""
+
+import bisect
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from urllib.request import pathname2url
+
+from ons_powerbi import json_export, store, value_parsing
+
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+DEFAULT_RELOAD_INTERVAL = 5
+
+FORMATS = ('json', 'columns', 'csv')
+
+class SeriesIndex:
+    """
+    Índice em memória das séries do banco local
+
+    Cada série guarda listas paralelas 'dates' (ordenadas) e 'values'.
+    reload() monta um índice novo e troca a tupla imutável 'snapshot'
+    (versão, séries, carregado_em) em uma única atribuição: cada
+    requisição lê o snapshot uma vez e vê versão e séries coerentes, sem
+    travas.
+
+    O banco é aberto só para leitura: a API nunca cria pastas, esquema ou
+    grava PRAGMAs no banco das extrações. A verificação periódica usa
+    PRAGMA data_version (muda quando outra conexão grava) em uma conexão
+    persistente e só consulta 'runs' quando algo mudou.
+    """
+
+    def __init__(self, db_path=store.DEFAULT_DB_PATH):
+        self.db_path = db_path
+        self.snapshot = (None, {}, None)
+        self._reload_lock = threading.Lock()
+        self._watch_conn = None
+        self._data_version = None
+
+    @property
+    def version(self):
+        return self.snapshot[0]
+
+    @property
+    def series(self):
+        return self.snapshot[1]
+
+    def _connect(self):
+        """Conexão somente leitura; None enquanto o banco ainda não existe"""
+        if not os.path.exists(self.db_path):
+            return None
+        uri = f"file:{pathname2url(os.path.abspath(self.db_path))}?mode=ro"
+        conn = sqlite3.connect(uri, uri=True, timeout=30, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def current_version(self):
+        """Versão dos dados: muda a cada execução gravada ou concluída (None sem banco)"""
+        if self._watch_conn is None:
+            self._watch_conn = self._connect()
+            if self._watch_conn is None:
+                return None
+        data_version = self._watch_conn.execute("PRAGMA data_version").fetchone()[0]
+        if data_version == self._data_version and self.version is not None:
+            return self.version
+        row = self._watch_conn.execute(
+            "SELECT COUNT(*), MAX(run_id), MAX(finished_at) FROM runs"
+        ).fetchone()
+        self._data_version = data_version
+        return f"{row[0]}:{row[1] or '-'}:{row[2] or '-'}"
+
+    def reload(self):
+        """Recarrega o índice a partir do banco; retorna True se os dados mudaram"""
+        with self._reload_lock:
+            version = self.current_version()
+            if version is None or version == self.version:
+                return False
+
+            conn = self._connect()
+            try:
+                series = {row['series_id']: {
+                    'series_id': row['series_id'],
+                    'page_number': row['page_number'],
+                    'label': row['label'],
+                    'dimensions': json.loads(row['dimensions']),
+                    'dates': [],
+                    'values': [],
+                } for row in store.list_series(conn)}
+
+                for series_id, obs_date, value in conn.execute(store.latest_values_sql()):
+                    entry = series.get(series_id)
+                    if entry is not None:
+                        entry['dates'].append(obs_date)
+                        entry['values'].append(value)
+            finally:
+                conn.close()
+
+            self.snapshot = (version, series, time.strftime('%Y-%m-%dT%H:%M:%S'))
+            return True
+
+    def watch(self, interval=DEFAULT_RELOAD_INTERVAL):
+        """Recarrega em segundo plano quando uma nova execução é gravada"""
+        def loop():
+            while True:
+                time.sleep(interval)
+                try:
+                    if self.reload():
+                        version, series, _ = self.snapshot
+                        print(f"♻️  Índice recarregado (versão {version}, {len(series)} séries)")
+                except Exception as e:
+                    print(f"⚠️  Erro ao recarregar o índice: {e}")
+
+        thread = threading.Thread(target=loop, name='ons-api-reload', daemon=True)
+        thread.start()
+        return thread
+
+    @staticmethod
+    def _summary(entry):
+        return {
+            'series_id': entry['series_id'],
+            'page_number': entry['page_number'],
+            'label': entry['label'],
+            'dimensions': entry['dimensions'],
+            'points': len(entry['dates']),
+            'first_date': entry['dates'][0] if entry['dates'] else None,
+            'last_date': entry['dates'][-1] if entry['dates'] else None,
+        }
+
+    def list_series(self, label=None, page_number=None, series=None):
+        """
+        Resumo das séries (opcionalmente filtradas por rótulo/página)
+
+        series: Séries de um snapshot já lido (padrão: o snapshot atual)
+        """
+        series = self.series if series is None else series
+        return [self._summary(entry) for entry in series.values()
+                if (label is None or entry['label'] == label)
+                and (page_number is None or entry['page_number'] == page_number)]
+
+    def range(self, series_id, start=None, end=None, series=None):
+        """
+        Pontos da série com start <= data <= end (datas ISO)
+
+        series: Séries de um snapshot já lido (padrão: o snapshot atual)
+
+        Returns:
+            (datas, valores) ou None se a série não existe
+        """
+        entry = (self.series if series is None else series).get(series_id)
+        if entry is None:
+            return None
+        dates = entry['dates']
+        low = 0 if start is None else bisect.bisect_left(dates, start)
+        # Datas com horário ('AAAA-MM-DD HH:MM') do dia final também entram
+        high = len(dates) if end is None else bisect.bisect_right(dates, end + '\uffff')
+        return dates[low:high], entry['values'][low:high]
+
+    def latest(self, label=None, page_number=None, series=None):
+        """Último ponto de cada série (series: ver list_series)"""
+        latest = []
+        for entry in (self.series if series is None else series).values():
+            if not entry['dates']:
+                continue
+            if label is not None and entry['label'] != label:
+                continue
+            if page_number is not None and entry['page_number'] != page_number:
+                continue
+            latest.append({'series_id': entry['series_id'], 'page_number': entry['page_number'],
+                           'label': entry['label'], 'dimensions': entry['dimensions'],
+                           'date': entry['dates'][-1], 'value': entry['values'][-1]})
+        return latest
+
+
+def _normalize_date(text):
+    """Aceita datas ISO ou DD/MM/AAAA nos parâmetros"""
+    if not text:
+        return None
+    return value_parsing.parse_date(text) or text
+
+
+def _csv_bytes(columns, rows):
+    def cell(value):
+        if value is None:
+            return ''
+        if isinstance(value, (dict, list)):
+            value = json.dumps(value, ensure_ascii=False)
+        value = str(value)
+        return '"' + value.replace('"', '""') + '"' if any(c in value for c in ',"\n') else value
+    lines = [','.join(columns)] + [','.join(cell(row.get(column)) for column in columns) for row in rows]
+    return ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+def render(records, output_format, columns):
+    """Serializa registros em json, columns (colunar) ou csv; retorna (bytes, content-type)"""
+    if output_format == 'csv':
+        return _csv_bytes(columns, records), 'text/csv; charset=utf-8'
+    if output_format == 'columns':
+        payload = {column: [record.get(column) for record in records] for column in columns}
+        return json_export.dumps_bytes(payload), 'application/json'
+    return json_export.dumps_bytes(records), 'application/json'
+
+
+class ReadApiHandler(BaseHTTPRequestHandler):
+    """Rotas de leitura; o índice fica em self.server.index"""
+
+    server_version = 'ONSPowerBIReadAPI/1.0'
+
+    def log_message(self, format, *args):
+        pass  # sem log por requisição
+
+    def _send(self, status, body=b'', content_type='application/json', etag=None):
+        self.send_response(status)
+        if etag:
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', 'no-cache')
+        if status != 304:
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if status != 304:
+            self.wfile.write(body)
+
+    def _error(self, status, message):
+        self._send(status, json_export.dumps_bytes({'error': message}))
+
+    def do_GET(self):
+        index = self.server.index
+        url = urlparse(self.path)
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        output_format = params.get('format', 'json')
+        if output_format not in FORMATS:
+            return self._error(400, f"format deve ser um de: {', '.join(FORMATS)}")
+
+        # Um único snapshot por requisição: a ETag e o corpo vêm da mesma versão
+        version, series, loaded_at = index.snapshot
+        # A resposta só depende da versão dos dados e da URL
+        etag = '"' + hashlib.sha1(f"{version}|{self.path}".encode('utf-8')).hexdigest()[:20] + '"'
+        if self.headers.get('If-None-Match') == etag:
+            return self._send(304, etag=etag)
+
+        page = params.get('page')
+        try:
+            page_number = int(page) if page else None
+        except ValueError:
+            return self._error(400, "page deve ser um número")
+
+        parts = [part for part in url.path.split('/') if part]
+        if parts == ['health']:
+            points = sum(len(entry['dates']) for entry in series.values())
+            body = json_export.dumps_bytes({'version': version, 'loaded_at': loaded_at,
+                                            'series': len(series), 'points': points})
+            return self._send(200, body, etag=etag)
+
+        if parts == ['series']:
+            records = index.list_series(label=params.get('label'), page_number=page_number, series=series)
+            body, content_type = render(records, output_format, ['series_id', 'page_number', 'label', 'dimensions',
+                                                                 'points', 'first_date', 'last_date'])
+            return self._send(200, body, content_type, etag)
+
+        if len(parts) == 2 and parts[0] == 'series':
+            try:
+                series_id = int(parts[1])
+            except ValueError:
+                return self._error(400, "id da série deve ser um número")
+            found = index.range(series_id, _normalize_date(params.get('start')), _normalize_date(params.get('end')),
+                                series=series)
+            if found is None:
+                return self._error(404, f"série {series_id} não encontrada")
+            dates, values = found
+            if output_format == 'columns':
+                body = json_export.dumps_bytes({'series_id': series_id, 'date': dates, 'value': values})
+                return self._send(200, body, etag=etag)
+            records = [{'date': d, 'value': v} for d, v in zip(dates, values)]
+            body, content_type = render(records, output_format, ['date', 'value'])
+            return self._send(200, body, content_type, etag)
+
+        if parts == ['latest']:
+            records = index.latest(label=params.get('label'), page_number=page_number, series=series)
+            body, content_type = render(records, output_format, ['series_id', 'page_number', 'label', 'dimensions',
+                                                                 'date', 'value'])
+            return self._send(200, body, content_type, etag)
+
+        return self._error(404, "rota não encontrada (use /health, /series, /series/<id> ou /latest)")
+
+
+def serve(db_path=store.DEFAULT_DB_PATH, host=DEFAULT_HOST, port=DEFAULT_PORT,
+          reload_interval=DEFAULT_RELOAD_INTERVAL):
+    """
+    Sobe a API de leitura e atende até Ctrl+C
+
+    Args:
+        db_path: Banco local gravado pelas extrações
+        host / port: Endereço de escuta (padrão: só a máquina local)
+        reload_interval: Intervalo (s) da verificação de novas execuções
+    """
+    index = SeriesIndex(db_path)
+    index.reload()
+    index.watch(reload_interval)
+
+    server = ThreadingHTTPServer((host, port), ReadApiHandler)
+    server.index = index
+    version, series, _ = index.snapshot
+    print(f"🌐 API de leitura em http://{host}:{port} ({len(series)} séries, versão {version})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -0,0 +1,362 @@
+"""
+Agregados pré-calculados das séries (hora → dia → mês → ano)
+
+Os painéis de análise agregam as mesmas séries por dia, mês, subsistema
+e fonte. Em vez de recalcular a partir das observações a cada consulta,
+este módulo materializa os agregados no banco local (ao lado de
+'observations'), com group-bys vetorizados do pandas:
+
+    rollups            - por série e período
+    dimension_rollups  - por (página, rótulo, dimensão, valor) e período,
+                         somando todas as séries com aquele valor de
+                         dimensão (Filtro_* gravados em series.dimensions,
+                         como subsistema e fonte)
+
+Atualização incremental: a partição é (série, ano). refresh_rollups(run_id=...)
+recalcula apenas as partições com observações gravadas naquela execução,
+e os grupos de dimensão das séries dessas partições (com todas as séries
+do grupo naquele ano); sem run_id, recalcula tudo.
+
+As datas seguem o value_parsing ('AAAA-MM', 'AAAA-MM-DD' ou
+'AAAA-MM-DD HH:MM'), então o período de cada granularidade é um prefixo
+da data; observações mais grossas que a granularidade (ex.: mensais no
+agregado diário) ficam de fora dela.
+"""
+
+from datetime import datetime
+
+from ons_powerbi import store
+from ons_powerbi._lazy import lazy_import
+
+
+pd = lazy_import('pandas')
+
+# Granularidade -> tamanho do prefixo da data ISO que define o período
+GRAINS = {
+    'hourly': 13,   # AAAA-MM-DD HH
+    'daily': 10,    # AAAA-MM-DD
+    'monthly': 7,   # AAAA-MM
+    'yearly': 4,    # AAAA
+}
+
+DEFAULT_GRAINS = ('hourly', 'daily', 'monthly', 'yearly')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS rollups (
+    grain         TEXT NOT NULL,
+    series_id     INTEGER NOT NULL REFERENCES series (series_id),
+    period        TEXT NOT NULL,
+    value_sum     REAL,
+    value_mean    REAL,
+    value_min     REAL,
+    value_max     REAL,
+    value_count   INTEGER NOT NULL,
+    updated_at    TEXT NOT NULL,
+    PRIMARY KEY (grain, series_id, period)
+);
+
+CREATE INDEX IF NOT EXISTS idx_rollups_series_period ON rollups (series_id, period);
+
+CREATE TABLE IF NOT EXISTS dimension_rollups (
+    grain            TEXT NOT NULL,
+    page_number      INTEGER NOT NULL,
+    label            TEXT NOT NULL,
+    dimension        TEXT NOT NULL,
+    dimension_value  TEXT NOT NULL,
+    period           TEXT NOT NULL,
+    value_sum        REAL,
+    value_mean       REAL,
+    value_min        REAL,
+    value_max        REAL,
+    value_count      INTEGER NOT NULL,
+    series_count     INTEGER NOT NULL,
+    updated_at       TEXT NOT NULL,
+    PRIMARY KEY (grain, page_number, label, dimension, dimension_value, period)
+);
+
+CREATE INDEX IF NOT EXISTS idx_dimension_rollups_value
+    ON dimension_rollups (dimension, dimension_value, grain, period);
+"""
+
+# Uma linha por (série, dimensão): os grupos de dimensão de cada série
+_SERIES_DIMENSIONS_SQL = """
+    SELECT s.series_id, s.page_number, s.label, d.key AS dimension, CAST(d.value AS TEXT) AS dimension_value
+    FROM series s, json_each(s.dimensions) d
+    WHERE d.type != 'null'
+"""
+
+_GROUP_COLUMNS = ['page_number', 'label', 'dimension', 'dimension_value']
+
+# Valores vigentes (ver store.latest_values_sql) só das partições da tabela temporária
+_LATEST_IN_PARTITIONS_SQL = store.latest_values_sql(
+    "JOIN _rollup_partitions p ON p.series_id = o.series_id AND p.year = substr(o.obs_date, 1, 4)"
+)
+
+
+def ensure_schema(conn):
+    """Cria a tabela de agregados, se necessário"""
+    conn.executescript(_SCHEMA)
+
+
+def touched_partitions(conn, run_id=None):
+    """
+    Partições (series_id, ano) afetadas por uma execução
+
+    Args:
+        run_id: Execução gravada por store.save_dataframe(); None = todas as partições
+    """
+    sql = "SELECT DISTINCT series_id, substr(obs_date, 1, 4) AS year FROM observations"
+    params = ()
+    if run_id is not None:
+        sql += " WHERE run_id = ?"
+        params = (run_id,)
+    return [(row[0], row[1]) for row in conn.execute(sql, params)]
+
+
+def load_partitions(conn, partitions):
+    """Valores vigentes (series_id, obs_date, value) das partições informadas, em um DataFrame"""
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS _rollup_partitions (series_id INTEGER, year TEXT)")
+    conn.execute("DELETE FROM _rollup_partitions")
+    conn.executemany("INSERT INTO _rollup_partitions (series_id, year) VALUES (?, ?)", partitions)
+    return pd.read_sql_query(_LATEST_IN_PARTITIONS_SQL, conn)
+
+
+def _periods(observations, grains):
+    """(granularidade, observações com a coluna 'period') de cada granularidade com dados"""
+    dates = observations['obs_date'].astype(str)
+    lengths = dates.str.len()
+    for grain in grains:
+        size = GRAINS[grain]
+        subset = observations[lengths >= size]
+        if not subset.empty:
+            yield grain, subset.assign(period=dates[lengths >= size].str.slice(0, size))
+
+
+def compute_rollups(observations, grains=DEFAULT_GRAINS):
+    """
+    Agrega as observações por série e período em cada granularidade
+
+    Args:
+        observations: DataFrame com series_id, obs_date e value
+        grains: Granularidades (chaves de GRAINS)
+
+    Returns:
+        DataFrame com grain, series_id, period, value_sum, value_mean,
+        value_min, value_max e value_count
+    """
+    frames = []
+    for grain, subset in _periods(observations, grains):
+        grouped = (subset.groupby(['series_id', 'period'])['value']
+                   .agg(['sum', 'mean', 'min', 'max', 'count'])
+                   .reset_index())
+        grouped.insert(0, 'grain', grain)
+        frames.append(grouped)
+
+    columns = ['grain', 'series_id', 'period', 'value_sum', 'value_mean', 'value_min', 'value_max', 'value_count']
+    if not frames:
+        return pd.DataFrame(columns=columns)
+    result = pd.concat(frames, ignore_index=True)
+    result.columns = columns
+    return result
+
+
+def compute_dimension_rollups(observations, memberships, grains=DEFAULT_GRAINS):
+    """
+    Agrega as observações por grupo de dimensão e período em cada granularidade
+
+    Args:
+        observations: DataFrame com series_id, obs_date e value
+        memberships: DataFrame com series_id, page_number, label, dimension
+            e dimension_value (uma linha por série e dimensão)
+        grains: Granularidades (chaves de GRAINS)
+
+    Returns:
+        DataFrame com grain, page_number, label, dimension, dimension_value,
+        period, value_sum, value_mean, value_min, value_max, value_count e
+        series_count
+    """
+    frames = []
+    grouped_observations = observations.merge(memberships, on='series_id')
+    for grain, subset in _periods(grouped_observations, grains):
+        grouped = (subset.groupby(_GROUP_COLUMNS + ['period'])
+                   .agg(value_sum=('value', 'sum'), value_mean=('value', 'mean'), value_min=('value', 'min'),
+                        value_max=('value', 'max'), value_count=('value', 'count'),
+                        series_count=('series_id', 'nunique'))
+                   .reset_index())
+        grouped.insert(0, 'grain', grain)
+        frames.append(grouped)
+
+    columns = ['grain', *_GROUP_COLUMNS, 'period', 'value_sum', 'value_mean', 'value_min', 'value_max',
+               'value_count', 'series_count']
+    if not frames:
+        return pd.DataFrame(columns=columns)
+    return pd.concat(frames, ignore_index=True)[columns]
+
+
+def dimension_groups(conn, partitions):
+    """
+    Grupos de dimensão afetados pelas partições e as partições completas desses grupos
+
+    Um grupo (página, rótulo, dimensão, valor) reúne várias séries; para
+    recalculá-lo em um ano é preciso carregar todas elas, e não só as
+    séries tocadas pela execução.
+
+    Returns:
+        (memberships, groups, partitions): DataFrame série -> grupo, DataFrame
+        dos grupos afetados com a coluna 'year' e lista de (series_id, ano)
+    """
+    memberships = pd.read_sql_query(_SERIES_DIMENSIONS_SQL, conn)
+    touched = pd.DataFrame(partitions, columns=['series_id', 'year'])
+    groups = touched.merge(memberships, on='series_id')[_GROUP_COLUMNS + ['year']].drop_duplicates()
+    expanded = groups.merge(memberships, on=_GROUP_COLUMNS)[['series_id', 'year']].drop_duplicates()
+    return memberships, groups, [(int(r.series_id), r.year) for r in expanded.itertuples(index=False)]
+
+
+def _nullable(value):
+    # NaN (soma/média de séries sem valor) -> NULL
+    return None if value != value else float(value)
+
+
+def refresh_rollups(db_path=store.DEFAULT_DB_PATH, run_id=None, grains=DEFAULT_GRAINS):
+    """
+    Recalcula os agregados das partições afetadas e grava na tabela 'rollups'
+
+    Args:
+        db_path: Banco local (ver store)
+        run_id: Atualiza só as partições desta execução (None = recalcula tudo)
+        grains: Granularidades materializadas
+
+    Returns:
+        Dict com partições recalculadas, linhas de agregado por série gravadas
+        e linhas de agregado por dimensão gravadas
+    """
+    conn = store.connect(db_path)
+    try:
+        ensure_schema(conn)
+        partitions = touched_partitions(conn, run_id)
+        if not partitions:
+            return {'partitions': 0, 'rows': 0, 'dimension_rows': 0}
+
+        memberships, groups, group_partitions = dimension_groups(conn, partitions)
+        # Uma única leitura cobre as partições tocadas e as demais séries dos grupos afetados
+        observations = load_partitions(conn, sorted(set(partitions) | set(group_partitions)))
+        keys = pd.MultiIndex.from_arrays([observations['series_id'],
+                                          observations['obs_date'].astype(str).str.slice(0, 4)])
+
+        rollups = compute_rollups(observations[keys.isin(partitions)], grains)
+        dimension_rollups = compute_dimension_rollups(observations, memberships, grains)
+        if not dimension_rollups.empty:
+            # Só os (grupo, ano) afetados: os demais grupos das séries carregadas estão incompletos
+            dimension_rollups = dimension_rollups.assign(year=dimension_rollups['period'].str.slice(0, 4)).merge(
+                groups, on=_GROUP_COLUMNS + ['year'])
+
+        updated_at = datetime.now().isoformat(timespec='seconds')
+        rows = [
+            (r.grain, int(r.series_id), r.period,
+             *(_nullable(v) for v in (r.value_sum, r.value_mean, r.value_min, r.value_max)),
+             int(r.value_count), updated_at)
+            for r in rollups.itertuples(index=False)
+        ]
+        dimension_rows = [
+            (r.grain, int(r.page_number), r.label, r.dimension, r.dimension_value, r.period,
+             *(_nullable(v) for v in (r.value_sum, r.value_mean, r.value_min, r.value_max)),
+             int(r.value_count), int(r.series_count), updated_at)
+            for r in dimension_rollups.itertuples(index=False)
+        ]
+
+        with conn:
+            # A partição inteira é substituída: períodos que deixaram de existir também somem
+            conn.executemany(
+                "DELETE FROM rollups WHERE series_id = ? AND substr(period, 1, 4) = ?",
+                partitions,
+            )
+            conn.executemany(
+                """
+                INSERT INTO rollups (grain, series_id, period, value_sum, value_mean,
+                                     value_min, value_max, value_count, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                rows,
+            )
+            conn.executemany(
+                "DELETE FROM dimension_rollups WHERE page_number = ? AND label = ? AND dimension = ? "
+                "AND dimension_value = ? AND substr(period, 1, 4) = ?",
+                [(int(g.page_number), g.label, g.dimension, g.dimension_value, g.year)
+                 for g in groups.itertuples(index=False)],
+            )
+            conn.executemany(
+                """
+                INSERT INTO dimension_rollups (grain, page_number, label, dimension, dimension_value, period,
+                                               value_sum, value_mean, value_min, value_max, value_count,
+                                               series_count, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                dimension_rows,
+            )
+    finally:
+        conn.close()
+
+    return {'partitions': len(partitions), 'rows': len(rows), 'dimension_rows': len(dimension_rows)}
+
+
+def query_rollup(conn, grain, label=None, start_period=None, end_period=None, page_number=None):
+    """
+    Consulta os agregados de uma granularidade (sem tocar em 'observations')
+
+    Returns:
+        Lista de dicts com page_number, label, dimensions, period e os agregados
+    """
+    ensure_schema(conn)
+    sql = """
+        SELECT s.page_number, s.label, s.dimensions, r.period,
+               r.value_sum, r.value_mean, r.value_min, r.value_max, r.value_count
+        FROM rollups r
+        JOIN series s ON s.series_id = r.series_id
+        WHERE r.grain = ?
+    """
+    params = [grain]
+    if label is not None:
+        sql += " AND s.label = ?"
+        params.append(label)
+    if page_number is not None:
+        sql += " AND s.page_number = ?"
+        params.append(page_number)
+    if start_period is not None:
+        sql += " AND r.period >= ?"
+        params.append(start_period)
+    if end_period is not None:
+        sql += " AND r.period <= ?"
+        params.append(end_period)
+    sql += " ORDER BY s.page_number, s.label, r.period"
+    return [dict(row) for row in conn.execute(sql, params)]
+
+
+def query_dimension_rollup(conn, grain, dimension, dimension_value=None, label=None, start_period=None,
+                           end_period=None, page_number=None):
+    """
+    Consulta os agregados por dimensão (ex.: dimension='Subsistema') de uma granularidade
+
+    Returns:
+        Lista de dicts com page_number, label, dimension_value, period, os
+        agregados e series_count
+    """
+    ensure_schema(conn)
+    sql = """
+        SELECT page_number, label, dimension_value, period, value_sum, value_mean,
+               value_min, value_max, value_count, series_count
+        FROM dimension_rollups
+        WHERE grain = ? AND dimension = ?
+    """
+    params = [grain, dimension]
+    for column, value in (('dimension_value', dimension_value), ('label', label), ('page_number', page_number)):
+        if value is not None:
+            sql += f" AND {column} = ?"
+            params.append(value)
+    if start_period is not None:
+        sql += " AND period >= ?"
+        params.append(start_period)
+    if end_period is not None:
+        sql += " AND period <= ?"
+        params.append(end_period)
+    sql += " ORDER BY page_number, label, dimension_value, period"
+    return [dict(row) for row in conn.execute(sql, params)]
@@ -0,0 +1,267 @@
+"""
+Agendador de unidades de trabalho com retry, backoff e reciclagem de sessão
+
+Uma unidade de trabalho é uma página × janela de datas (dict criado por
+make_unit). Cada worker mantém uma sessão (navegador) e consome unidades
+de uma fila compartilhada:
+
+- falhas são re-enfileiradas com backoff exponencial, até max_retries;
+- cada unidade tem um timeout; ao estourar, a sessão é descartada;
+- após recycle_after falhas seguidas, a sessão é trocada por uma nova.
+
+Assim uma renderização instável custa uma unidade repetida, e não o
+restante da execução.
+"""
+
+import heapq
+import itertools
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from datetime import datetime, timedelta
+
+from ons_powerbi import log
+
+
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_BACKOFF_BASE = 2.0
+DEFAULT_BACKOFF_MAX = 60.0
+DEFAULT_UNIT_TIMEOUT = 300
+DEFAULT_RECYCLE_AFTER = 2
+
+
+class LastPageReached(Exception):
+    """
+    Levantada por execute_unit quando a página pedida confirmadamente não
+    existe no relatório; as unidades além dela entram nas falhas
+    """
+
+    def __init__(self, last_page):
+        super().__init__(f"Última página do relatório: {last_page}")
+        self.last_page = last_page
+
+
+class UnitTimeout(Exception):
+    """Levantada quando uma unidade excede o timeout configurado"""
+
+
+def make_unit(page, start_date=None, end_date=None, filters=None):
+    """Cria uma unidade de trabalho (página × janela de datas)"""
+    return {
+        'page': page,
+        'start_date': start_date,
+        'end_date': end_date,
+        'filters': dict(filters or {}),
+        'attempts': 0,
+        'errors': [],
+    }
+
+
+def unit_key(unit):
+    """Chave estável que identifica a unidade (sem o estado de tentativas)"""
+    filters = json.dumps(unit.get('filters') or {}, sort_keys=True, ensure_ascii=False)
+    return f"p{unit['page']}|{unit.get('start_date') or ''}|{unit.get('end_date') or ''}|{filters}"
+
+
+def split_date_range(start_date, end_date, window_days):
+    """
+    Divide um intervalo DD/MM/AAAA em janelas de até window_days dias
+
+    Returns:
+        Lista de (início, fim) no mesmo formato
+    """
+    start = datetime.strptime(start_date, "%d/%m/%Y")
+    end = datetime.strptime(end_date, "%d/%m/%Y")
+    if end < start:
+        raise ValueError(f"Data final {end_date} anterior à inicial {start_date}")
+
+    windows = []
+    current = start
+    while current <= end:
+        window_end = min(current + timedelta(days=window_days - 1), end)
+        windows.append((current.strftime("%d/%m/%Y"), window_end.strftime("%d/%m/%Y")))
+        current = window_end + timedelta(days=1)
+    return windows
+
+
+def backoff_delay(attempt, base=DEFAULT_BACKOFF_BASE, maximum=DEFAULT_BACKOFF_MAX):
+    """Atraso exponencial com jitter para a tentativa informada (1, 2, 3...)"""
+    delay = min(maximum, base ** attempt)
+    return delay * random.uniform(0.5, 1.0)
+
+
+def run_work_units(units, session_factory, execute_unit, close_session=None, workers=1,
+                   max_retries=DEFAULT_MAX_RETRIES, backoff_base=DEFAULT_BACKOFF_BASE,
+                   backoff_max=DEFAULT_BACKOFF_MAX, unit_timeout=DEFAULT_UNIT_TIMEOUT,
+                   recycle_after=DEFAULT_RECYCLE_AFTER, on_result=None):
+    """
+    Executa as unidades com um pool de workers, cada um com sua sessão
+
+    Args:
+        units: Lista de unidades (make_unit), na ordem preferida de execução
+        session_factory: Função sem argumentos que cria uma sessão nova
+        execute_unit: Função (sessão, unidade) -> resultado
+        close_session: Função (sessão, motivo) chamada ao descartar uma sessão;
+            motivo é 'timeout', 'recycle' ou 'done' (fim do worker)
+        workers: Número de sessões em paralelo
+        max_retries: Tentativas extras por unidade antes de desistir
+        backoff_base / backoff_max: Parâmetros do backoff exponencial (s)
+        unit_timeout: Tempo máximo por unidade (s); None desativa
+        recycle_after: Falhas seguidas que forçam uma sessão nova
+        on_result: Função (unidade, resultado) chamada a cada sucesso
+
+    Returns:
+        (resultados, falhas): lista de (unidade, resultado) e lista de
+        unidades que esgotaram as tentativas ou ficaram além da última página
+    """
+    sequence = itertools.count()
+    # Heap de (pronta_em, ordem, unidade): a ordem original desempata
+    queue = [(0.0, next(sequence), unit) for unit in units]
+    heapq.heapify(queue)
+
+    state = {'in_flight': 0, 'last_page': None}
+    condition = threading.Condition()
+    results = []
+    failed = []
+
+    def beyond_last_page(unit):
+        return state['last_page'] is not None and unit['page'] > state['last_page']
+
+    def skip(unit):
+        # Página pedida que não existe: entra nas falhas, nunca some do resumo
+        unit['errors'].append(f"LastPageReached: além da última página ({state['last_page']})")
+        failed.append(unit)
+
+    def next_unit():
+        with condition:
+            while True:
+                # Descarta unidades além da última página confirmada
+                while queue and beyond_last_page(queue[0][2]):
+                    skip(heapq.heappop(queue)[2])
+                if not queue:
+                    if state['in_flight'] == 0:
+                        condition.notify_all()
+                        return None
+                    condition.wait()
+                    continue
+                ready_at = queue[0][0]
+                now = time.time()
+                if ready_at <= now:
+                    _, _, unit = heapq.heappop(queue)
+                    if beyond_last_page(unit):
+                        skip(unit)
+                        continue
+                    state['in_flight'] += 1
+                    return unit
+                condition.wait(timeout=ready_at - now)
+
+    def finish_unit(requeue=None, delay=0.0):
+        with condition:
+            state['in_flight'] -= 1
+            if requeue is not None:
+                heapq.heappush(queue, (time.time() + delay, next(sequence), requeue))
+            condition.notify_all()
+
+    def discard(session, reason):
+        if session is not None and close_session is not None:
+            try:
+                close_session(session, reason)
+            except Exception as e:
+                print(f"  ⚠️  Erro ao fechar sessão: {e}")
+
+    def worker(worker_index):
+        session = None
+        consecutive_failures = 0
+        runner = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"ons-unit-{worker_index}")
+
+        try:
+            while True:
+                unit = next_unit()
+                if unit is None:
+                    break
+
+                label = f"página {unit['page']}"
+                if unit.get('start_date') or unit.get('end_date'):
+                    label += f" [{unit.get('start_date') or '...'} → {unit.get('end_date') or '...'}]"
+
+                try:
+                    if session is None:
+                        session = session_factory()
+
+                    future = runner.submit(execute_unit, session, unit)
+                    try:
+                        result = future.result(timeout=unit_timeout)
+                    except FutureTimeoutError:
+                        # Fechar a sessão interrompe as chamadas pendentes ao navegador
+                        discard(session, 'timeout')
+                        session = None
+                        runner.shutdown(wait=False)
+                        runner = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"ons-unit-{worker_index}")
+                        raise UnitTimeout(f"Timeout de {unit_timeout}s excedido")
+
+                except LastPageReached as e:
+                    # execute_unit só levanta depois de confirmar o fim em uma sessão recarregada
+                    with condition:
+                        if state['last_page'] is None or e.last_page < state['last_page']:
+                            state['last_page'] = e.last_page
+                        skip(unit)
+                    log.warning(f"  ⚠️  Última página confirmada ({e.last_page}); {label} não existe",
+                                'last_page_reached', unit=label, last_page=e.last_page)
+                    finish_unit()
+                    continue
+
+                except Exception as e:
+                    unit['attempts'] += 1
+                    unit['errors'].append(f"{type(e).__name__}: {e}")
+                    consecutive_failures += 1
+
+                    if consecutive_failures >= recycle_after and session is not None:
+                        log.warning(f"  ♻️  {consecutive_failures} falhas seguidas - reciclando sessão",
+                                    'session_recycled', failures=consecutive_failures)
+                        discard(session, 'recycle')
+                        session = None
+                        consecutive_failures = 0
+
+                    if unit['attempts'] > max_retries:
+                        log.error(f"  ✗ {label}: falhou após {unit['attempts']} tentativa(s): {e}",
+                                  'unit_failed', unit=label, attempts=unit['attempts'], error=str(e))
+                        log.count('units_failed')
+                        failed.append(unit)
+                        finish_unit()
+                    else:
+                        delay = backoff_delay(unit['attempts'], backoff_base, backoff_max)
+                        log.warning(f"  ⚠️  {label}: tentativa {unit['attempts']} falhou ({e}); "
+                                    f"nova tentativa em {delay:.1f}s",
+                                    'unit_retry', unit=label, attempts=unit['attempts'], error=str(e),
+                                    delay=round(delay, 1))
+                        log.count('units_retried')
+                        finish_unit(requeue=unit, delay=delay)
+                    continue
+
+                consecutive_failures = 0
+                results.append((unit, result))
+                if on_result is not None:
+                    # Um erro no callback não pode impedir finish_unit(): os outros workers esperam por ele
+                    try:
+                        on_result(unit, result)
+                    except Exception as e:
+                        log.warning(f"  ⚠️  {label}: erro ao processar o resultado: {e}",
+                                    'result_callback_failed', unit=label, error=str(e))
+                finish_unit()
+
+        finally:
+            runner.shutdown(wait=False)
+            discard(session, 'done')
+
+    threads = [
+        threading.Thread(target=worker, args=(index,), name=f"ons-worker-{index}", daemon=True)
+        for index in range(max(1, workers))
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return results, failed
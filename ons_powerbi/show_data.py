@@ -0,0 +1,320 @@
+"""
+Dados completos de cada visual pelo menu "Mais opções" do Power BI
+
+A leitura do DOM só enxerga o que está renderizado. Quando o embed
+permite, o menu de contexto de cada visual oferece:
+
+    - "Exportar dados": baixa todas as linhas do visual (CSV/XLSX)
+    - "Mostrar como tabela": abre o visual com uma grade das linhas
+
+Uma ação por visual substitui rolagem e hover. Se nenhuma das opções
+estiver habilitada, o visual fica só com a leitura do DOM. O arquivo
+exportado é lido na hora e apagado: a tabela guarda só cabeçalhos e
+linhas (serializáveis, ex.: para a fila de work_queue).
+"""
+
+import glob
+import json
+import os
+import shutil
+import tempfile
+import time
+
+from ons_powerbi._lazy import lazy_attribute, lazy_import
+from ons_powerbi.browser import By, EC, WebDriverWait, execute_async_script
+
+
+pd = lazy_import('pandas')
+Keys = lazy_attribute('selenium.webdriver.common.keys', 'Keys')
+
+VISUAL_SELECTOR = "visual-container, .visualContainer"
+OPTIONS_BUTTON_SELECTORS = [
+    "button[aria-label='Mais opções']",
+    "button[aria-label='More options']",
+    "button.vcMenuBtn",
+    "[class*='visualHeader'] button[aria-haspopup]",
+]
+MENU_ITEM_SELECTOR = "[role='menuitem'], [role='menu'] button"
+EXPORT_LABELS = ('exportar dados', 'export data')
+SHOW_TABLE_LABELS = ('mostrar como tabela', 'show as a table')
+BACK_LABELS = ('voltar ao relatório', 'back to report')
+EXPORT_CONFIRM_LABELS = ('exportar', 'export')
+
+DEFAULT_TIMEOUT = 30
+
+
+_READ_GRID_JS = """
+// Lê a grade de "Mostrar como tabela" rolando o contêiner virtualizado
+const maxRows = arguments[0];
+const done = arguments[arguments.length - 1];
+
+const grid = document.querySelector('[role="grid"]');
+if (!grid) { done(null); return; }
+
+const headers = Array.from(grid.querySelectorAll('[role="columnheader"]'))
+    .map(cell => (cell.textContent || '').trim());
+const rows = new Map();
+const scroller = grid.querySelector('[class*="scroll"], [class*="Scroll"]') || grid;
+
+function collect() {
+    grid.querySelectorAll('[role="row"]').forEach((row, position) => {
+        const cells = row.querySelectorAll('[role="gridcell"], [role="rowheader"]');
+        if (!cells.length) return;
+        const key = row.getAttribute('aria-rowindex') || ('pos' + position + ':' + scroller.scrollTop);
+        rows.set(key, Array.from(cells).map(cell => (cell.textContent || '').trim()));
+    });
+}
+
+let previousTop = -1;
+function step() {
+    collect();
+    if (rows.size >= maxRows || scroller.scrollTop === previousTop) {
+        const ordered = Array.from(rows.entries())
+            .sort((a, b) => (parseInt(a[0]) || 0) - (parseInt(b[0]) || 0))
+            .map(entry => entry[1]);
+        done({headers: headers, rows: ordered});
+        return;
+    }
+    previousTop = scroller.scrollTop;
+    scroller.scrollTop += Math.max(scroller.clientHeight - 20, 100);
+    requestAnimationFrame(() => setTimeout(step, 30));
+}
+step();
+"""
+
+
+def _click(driver, element):
+    """Clique via JavaScript (funciona mesmo com o cabeçalho do visual oculto)"""
+    driver.execute_script("arguments[0].click();", element)
+
+
+def _reveal_header(driver, visual):
+    """Dispara o hover que exibe o cabeçalho (e o botão de opções) do visual"""
+    driver.execute_script("""
+        ['pointerover', 'mouseover', 'mouseenter', 'mousemove'].forEach(type =>
+            arguments[0].dispatchEvent(new MouseEvent(type, {bubbles: true})));
+    """, visual)
+
+
+def _find_by_text(driver, selector, labels, timeout=3):
+    """Primeiro elemento do seletor cujo texto/aria-label começa com um dos rótulos"""
+    end_time = time.time() + timeout
+    while True:
+        for element in driver.find_elements(By.CSS_SELECTOR, selector):
+            text = ((element.text or '') + ' ' + (element.get_attribute('aria-label') or '')).strip().lower()
+            if any(text.startswith(label) or f" {label}" in f" {text}" for label in labels):
+                return element
+        if time.time() >= end_time:
+            return None
+        time.sleep(0.2)
+
+
+def open_visual_menu(driver, visual):
+    """Abre o menu 'Mais opções' do visual; retorna False se o visual não tem menu"""
+    _reveal_header(driver, visual)
+    for selector in OPTIONS_BUTTON_SELECTORS:
+        buttons = visual.find_elements(By.CSS_SELECTOR, selector)
+        if buttons:
+            _click(driver, buttons[0])
+            try:
+                WebDriverWait(driver, 3).until(
+                    EC.presence_of_element_located((By.CSS_SELECTOR, MENU_ITEM_SELECTOR))
+                )
+                return True
+            except Exception:
+                return False
+    return False
+
+
+def close_menu(driver):
+    """Fecha menus/diálogos abertos"""
+    try:
+        driver.find_element(By.TAG_NAME, 'body').send_keys(Keys.ESCAPE)
+    except Exception:
+        pass
+
+
+def _wait_for_download(download_dir, known_files, timeout):
+    """Aguarda um arquivo novo e completo (sem .crdownload) na pasta de downloads"""
+    end_time = time.time() + timeout
+    while time.time() < end_time:
+        current = set(glob.glob(os.path.join(download_dir, '*')))
+        finished = [f for f in current - known_files if not f.endswith(('.crdownload', '.tmp'))]
+        pending = [f for f in current - known_files if f.endswith('.crdownload')]
+        if finished and not pending:
+            return max(finished, key=os.path.getmtime)
+        time.sleep(0.25)
+    return None
+
+
+def enable_downloads(driver, download_dir):
+    """Permite downloads do navegador para a pasta indicada (via CDP)"""
+    os.makedirs(download_dir, exist_ok=True)
+    driver.execute_cdp_cmd('Page.setDownloadBehavior', {'behavior': 'allow', 'downloadPath': download_dir})
+
+
+def export_visual_data(driver, download_dir, timeout=DEFAULT_TIMEOUT):
+    """
+    Usa 'Exportar dados' no menu já aberto e aguarda o arquivo
+
+    Returns:
+        Caminho do arquivo baixado ou None se a opção não existe/falhou
+    """
+    item = _find_by_text(driver, MENU_ITEM_SELECTOR, EXPORT_LABELS, timeout=1)
+    if item is None or item.get_attribute('aria-disabled') == 'true':
+        return None
+
+    known_files = set(glob.glob(os.path.join(download_dir, '*')))
+    _click(driver, item)
+
+    # Diálogo de exportação: mantém o tipo padrão (dados resumidos) e confirma
+    confirm = _find_by_text(driver, "[role='dialog'] button", EXPORT_CONFIRM_LABELS, timeout=5)
+    if confirm is None:
+        close_menu(driver)
+        return None
+    _click(driver, confirm)
+
+    return _wait_for_download(download_dir, known_files, timeout)
+
+
+def show_as_table(driver, max_rows=100000, timeout=DEFAULT_TIMEOUT):
+    """
+    Usa 'Mostrar como tabela' no menu já aberto, lê a grade e volta ao relatório
+
+    Returns:
+        {'headers': [...], 'rows': [[...], ...]} ou None se a opção não existe
+    """
+    item = _find_by_text(driver, MENU_ITEM_SELECTOR, SHOW_TABLE_LABELS, timeout=1)
+    if item is None or item.get_attribute('aria-disabled') == 'true':
+        return None
+
+    _click(driver, item)
+    try:
+        WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.CSS_SELECTOR, "[role='grid']")))
+        table = execute_async_script(driver, _READ_GRID_JS, max_rows, timeout=timeout)
+    finally:
+        back = _find_by_text(driver, "button", BACK_LABELS, timeout=2)
+        if back is not None:
+            _click(driver, back)
+        else:
+            close_menu(driver)
+    return table
+
+
+def read_export(path):
+    """
+    Lê o arquivo de 'Exportar dados' (CSV ou XLSX)
+
+    Returns:
+        {'headers': [...], 'rows': [[...], ...]} com valores serializáveis em JSON
+    """
+    if path.lower().endswith('.csv'):
+        df = pd.read_csv(path, encoding='utf-8-sig')
+    else:
+        # Exportações em Excel podem trazer o cabeçalho do relatório nas primeiras linhas:
+        # o cabeçalho da tabela é a primeira linha só de textos, sem células vazias
+        raw = pd.read_excel(path, header=None).dropna(axis=1, how='all')
+        is_text = raw.apply(lambda column: column.map(lambda value: isinstance(value, str) and value.strip() != ''))
+        mask = is_text.all(axis=1)
+        header_row = mask.idxmax() if mask.any() else raw.index[0] if len(raw) else None
+        if header_row is None:
+            df = pd.DataFrame()
+        else:
+            # Sem a linha de cabeçalho, as colunas voltam aos tipos numéricos/datas
+            df = raw.loc[header_row + 1:].reset_index(drop=True).infer_objects()
+            df.columns = raw.loc[header_row].astype(str).str.strip()
+    split = json.loads(df.to_json(orient='split', index=False, date_format='iso'))
+    return {'headers': [str(column) for column in split['columns']], 'rows': split['data']}
+
+
+def visual_title(visual):
+    """Título do visual (aria-label ou cabeçalho), quando houver"""
+    title = visual.get_attribute('aria-label') or ''
+    if not title:
+        headers = visual.find_elements(By.CSS_SELECTOR, "[class*='visualTitle'], [role='heading']")
+        title = headers[0].text if headers else ''
+    return title.strip()
+
+
+def extract_visual_tables(driver, download_dir=None, timeout=DEFAULT_TIMEOUT):
+    """
+    Extrai os dados completos de cada visual da página atual
+
+    Para cada visual tenta 'Exportar dados' (todas as linhas) e depois
+    'Mostrar como tabela'. Visuais sem nenhuma das opções são contados em
+    'unavailable' e ficam apenas com a leitura do DOM.
+
+    Args:
+        driver: Selenium WebDriver já posicionado na página
+        download_dir: Pasta dos downloads (padrão: pasta temporária)
+        timeout: Espera máxima (s) por download/leitura de cada visual
+
+    Returns:
+        (tabelas, estatísticas). Cada tabela tem visual_index, title,
+        source ('export' ou 'show_as_table'), headers e rows.
+    """
+    temporary_dir = download_dir is None
+    if temporary_dir:
+        download_dir = tempfile.mkdtemp(prefix='ons_powerbi_export_')
+    try:
+        return _extract_visual_tables(driver, download_dir, timeout)
+    finally:
+        if temporary_dir:
+            shutil.rmtree(download_dir, ignore_errors=True)
+
+
+def _extract_visual_tables(driver, download_dir, timeout):
+    try:
+        enable_downloads(driver, download_dir)
+        can_download = True
+    except Exception:
+        can_download = False  # navegador sem CDP: só "Mostrar como tabela"
+
+    tables = []
+    stats = {'visuals': 0, 'export': 0, 'show_as_table': 0, 'unavailable': 0}
+
+    visuals = driver.find_elements(By.CSS_SELECTOR, VISUAL_SELECTOR)
+    stats['visuals'] = len(visuals)
+
+    for index, visual in enumerate(visuals):
+        title = visual_title(visual)
+        table = None
+        try:
+            if can_download and open_visual_menu(driver, visual):
+                path = export_visual_data(driver, download_dir, timeout=timeout)
+                if path:
+                    try:
+                        table = dict(read_export(path), source='export')
+                    finally:
+                        os.remove(path)
+                else:
+                    close_menu(driver)
+
+            if table is None and open_visual_menu(driver, visual):
+                grid = show_as_table(driver, timeout=timeout)
+                if grid and grid.get('rows'):
+                    table = {'source': 'show_as_table', 'headers': grid['headers'], 'rows': grid['rows']}
+                else:
+                    close_menu(driver)
+        except Exception as e:
+            print(f"    ⚠️  Visual {index + 1} ({title or 'sem título'}): {e}")
+            close_menu(driver)
+
+        if table is None:
+            stats['unavailable'] += 1
+            continue
+
+        table.update({'visual_index': index, 'title': title})
+        tables.append(table)
+        stats[table['source']] += 1
+
+    return tables, stats
+
+
+def visual_table_frame(table):
+    """Converte uma tabela de extract_visual_tables() em DataFrame"""
+    headers = table.get('headers') or None
+    rows = table.get('rows', [])
+    if headers and rows and len(headers) != len(rows[0]):
+        headers = None
+    return pd.DataFrame(rows, columns=headers)
@@ -0,0 +1,358 @@
+"""
+Descoberta e seleção dos slicers (filtros) do Power BI
+
+Além das datas, o painel tem slicers como subsistema, tipo de fonte e
+usina. Este módulo lista todos os slicers e seus valores, monta o
+produto cartesiano dos valores pedidos e aplica cada combinação em uma
+sessão do navegador. Cada combinação vira uma unidade de trabalho do
+scheduler (ver build_work_units em scrape_ons_powerbi_direct.py), de modo
+que todas as combinações rodam em paralelo no pool de sessões.
+
+Formato dos filtros pedidos:
+
+    {'Subsistema': 'all', 'Fonte': ['Eólica', 'Solar']}
+
+'all' (ou '*') expande para todos os valores descobertos.
+"""
+
+import hashlib
+import itertools
+import json
+import re
+import time
+
+from ons_powerbi import filter_state
+from ons_powerbi.browser import execute_async_script
+from ons_powerbi.store import FILTER_COLUMN_PREFIX
+
+
+# Slicers de data são tratados por select_date_in_powerbi_calendar()
+_DISCOVER_JS = """
+const done = arguments[arguments.length - 1];
+const maxValues = arguments[0];
+
+function text(element) { return element ? (element.textContent || '').trim() : ''; }
+
+function itemsOf(root) {
+    return Array.from(root.querySelectorAll('.slicerItemContainer, [role="option"], [role="treeitem"]'));
+}
+
+function itemLabel(item) {
+    return text(item.querySelector('.slicerText, [class*="slicerText"]')) || item.getAttribute('title') || text(item);
+}
+
+function isSelected(item) {
+    return item.getAttribute('aria-selected') === 'true' || item.getAttribute('aria-checked') === 'true'
+        || !!item.querySelector('.slicerCheckbox.selected, [class*="partiallySelected"]');
+}
+
+async function readItems(root) {
+    // Lista virtualizada: rola a região até não surgirem itens novos
+    const values = new Map();
+    const scroller = root.querySelector('.scrollRegion, [class*="scrollRegion"], [class*="scrollbar"]') || root;
+    let previousTop = -1;
+    while (values.size < maxValues) {
+        itemsOf(root).forEach(item => {
+            const label = itemLabel(item);
+            if (label && !values.has(label)) values.set(label, isSelected(item));
+        });
+        if (scroller.scrollTop === previousTop) break;
+        previousTop = scroller.scrollTop;
+        scroller.scrollTop += Math.max(scroller.clientHeight - 10, 50);
+        await new Promise(resolve => requestAnimationFrame(() => setTimeout(resolve, 30)));
+    }
+    scroller.scrollTop = 0;
+    return values;
+}
+
+(async () => {
+    const slicers = [];
+    const containers = document.querySelectorAll('visual-container, .visualContainer');
+    for (let index = 0; index < containers.length; index++) {
+        const container = containers[index];
+        const slicer = container.querySelector('.slicer-container, [class*="slicer-container"], [class*="slicerContainer"]');
+        if (!slicer || container.querySelector('input.date-slicer-datepicker, [class*="date-slicer"]')) continue;
+
+        const title = text(container.querySelector('.slicer-header-text, [class*="slicerHeader"] [class*="text"], [class*="visualTitle"]'))
+            || container.getAttribute('aria-label') || ('Slicer ' + (slicers.length + 1));
+
+        let kind = 'list';
+        let root = slicer;
+        const dropdown = slicer.querySelector('.slicer-dropdown-menu, [class*="slicer-dropdown-menu"]');
+        if (dropdown) {
+            kind = 'dropdown';
+            dropdown.click();
+            await new Promise(resolve => setTimeout(resolve, 300));
+            root = document.querySelector('.slicer-dropdown-popup:not([style*="display: none"]), [class*="slicer-dropdown-popup"]') || slicer;
+        }
+
+        const values = await readItems(root);
+        if (dropdown) dropdown.click();
+
+        const multiSelect = !!slicer.querySelector('.slicerCheckbox, [role="checkbox"], [aria-multiselectable="true"]');
+        slicers.push({
+            index: index,
+            title: title,
+            kind: kind,
+            multi_select: multiSelect,
+            values: Array.from(values.keys()),
+            selected: Array.from(values.entries()).filter(entry => entry[1]).map(entry => entry[0])
+        });
+    }
+    done(slicers);
+})().catch(error => done({error: String(error)}));
+"""
+
+
+_SELECT_JS = """
+// Seleciona 'values' no slicer de índice 'index' (limpa a seleção anterior)
+const index = arguments[0];
+const values = arguments[1];
+const done = arguments[arguments.length - 1];
+
+function text(element) { return element ? (element.textContent || '').trim() : ''; }
+function itemLabel(item) {
+    return text(item.querySelector('.slicerText, [class*="slicerText"]')) || item.getAttribute('title') || text(item);
+}
+function isSelected(item) {
+    return item.getAttribute('aria-selected') === 'true' || item.getAttribute('aria-checked') === 'true'
+        || !!item.querySelector('.slicerCheckbox.selected');
+}
+function click(element, ctrl) {
+    ['mousedown', 'mouseup', 'click'].forEach(type => element.dispatchEvent(
+        new MouseEvent(type, {bubbles: true, cancelable: true, view: window, ctrlKey: ctrl, metaKey: ctrl})));
+}
+const pause = ms => new Promise(resolve => setTimeout(resolve, ms));
+
+(async () => {
+    const container = document.querySelectorAll('visual-container, .visualContainer')[index];
+    if (!container) { done({error: 'slicer não encontrado'}); return; }
+
+    const eraser = container.querySelector('[aria-label*="Limpar seleç"], [aria-label*="Clear selection"], .clear-filter');
+    if (eraser) { click(eraser, false); await pause(300); }
+
+    const dropdown = container.querySelector('.slicer-dropdown-menu, [class*="slicer-dropdown-menu"]');
+    let root = container;
+    if (dropdown) {
+        click(dropdown, false);
+        await pause(300);
+        root = document.querySelector('.slicer-dropdown-popup:not([style*="display: none"]), [class*="slicer-dropdown-popup"]') || container;
+    }
+
+    const pending = new Set(values);
+    const scroller = root.querySelector('.scrollRegion, [class*="scrollRegion"]') || root;
+    let previousTop = -1;
+    while (pending.size) {
+        for (const item of root.querySelectorAll('.slicerItemContainer, [role="option"], [role="treeitem"]')) {
+            const label = itemLabel(item);
+            if (pending.has(label)) {
+                if (!isSelected(item)) click(item, pending.size < values.length);
+                pending.delete(label);
+                await pause(50);
+            }
+        }
+        if (!pending.size || scroller.scrollTop === previousTop) break;
+        previousTop = scroller.scrollTop;
+        scroller.scrollTop += Math.max(scroller.clientHeight - 10, 50);
+        await pause(60);
+    }
+    scroller.scrollTop = 0;
+    if (dropdown) click(dropdown, false);
+    done({missing: Array.from(pending)});
+})().catch(error => done({error: String(error)}));
+"""
+
+
+def discover_slicers(driver, max_values=5000, timeout=60):
+    """
+    Lista os slicers da página atual (exceto os de data) e seus valores
+
+    Returns:
+        Lista de dicts com index, title, kind ('list' ou 'dropdown'),
+        multi_select, values e selected
+    """
+    slicers = execute_async_script(driver, _DISCOVER_JS, max_values, timeout=timeout)
+    if isinstance(slicers, dict) and 'error' in slicers:
+        raise RuntimeError(f"Erro ao listar slicers: {slicers['error']}")
+    return slicers
+
+
+def _normalize(text):
+    return re.sub(r"\s+", " ", str(text)).strip().lower()
+
+
+def find_slicer(slicers, title):
+    """
+    Localiza um slicer pelo título (sem diferenciar maiúsculas/espaços)
+
+    Sem título igual, aceita um título que contenha o pedido, desde que
+    seja o único: 'Fonte' não pode escolher ao acaso entre 'Fonte' de
+    dois visuais diferentes ('Tipo de Fonte', 'Fonte Primária').
+
+    Returns:
+        O slicer, ou None se nenhum título corresponde
+
+    Raises:
+        ValueError: mais de um slicer contém o título pedido
+    """
+    wanted = _normalize(title)
+    for slicer in slicers:
+        if _normalize(slicer['title']) == wanted:
+            return slicer
+    candidates = [slicer for slicer in slicers if wanted in _normalize(slicer['title'])]
+    if len(candidates) > 1:
+        raise ValueError(f"Slicer '{title}' ambíguo (candidatos: {', '.join(s['title'] for s in candidates)})")
+    return candidates[0] if candidates else None
+
+
+def build_filter_combinations(slicers, requested):
+    """
+    Produto cartesiano dos valores pedidos por slicer
+
+    Args:
+        slicers: Resultado de discover_slicers()
+        requested: {título: 'all' | valor | [valores]}
+
+    Returns:
+        Lista de dicts {título_do_slicer: valor}, um por combinação
+
+    Raises:
+        ValueError: slicer inexistente ou ambíguo, ou valor inexistente no relatório
+    """
+    titles, choices = [], []
+    for title, values in requested.items():
+        slicer = find_slicer(slicers, title)
+        if slicer is None:
+            available = ', '.join(s['title'] for s in slicers) or 'nenhum'
+            raise ValueError(f"Slicer '{title}' não encontrado (disponíveis: {available})")
+
+        if values in ('all', '*', None):
+            values = list(slicer['values'])
+        elif isinstance(values, str):
+            values = [values]
+
+        known = {_normalize(v): v for v in slicer['values']}
+        resolved = []
+        for value in values:
+            if _normalize(value) not in known:
+                raise ValueError(f"Valor '{value}' não existe no slicer '{slicer['title']}'")
+            resolved.append(known[_normalize(value)])
+
+        titles.append(slicer['title'])
+        choices.append(resolved)
+
+    return [dict(zip(titles, combination)) for combination in itertools.product(*choices)]
+
+
+def select_slicer_values(driver, slicer, values, timeout=30):
+    """
+    Seleciona os valores no slicer (substitui a seleção atual)
+
+    Returns:
+        Lista dos valores que não foram encontrados (vazia em caso de sucesso)
+    """
+    if isinstance(values, str):
+        values = [values]
+    result = execute_async_script(driver, _SELECT_JS, slicer['index'], list(values), timeout=timeout)
+    if 'error' in result:
+        raise RuntimeError(f"Erro ao selecionar '{slicer['title']}': {result['error']}")
+    return result['missing']
+
+
+def apply_filters(driver, filters, slicers=None, settle_time=2, state=None):
+    """
+    Aplica uma combinação de filtros {título: valor(es)} na página atual
+
+    Args:
+        state: Estado de filtros da sessão (ver filter_state); filtros que
+            já estão com o valor pedido não são reaplicados
+
+    Returns:
+        True se todos os valores foram selecionados
+    """
+    if not filters:
+        return True
+
+    ok = True
+    changed = False
+    for title, values in filters.items():
+        if state is not None and filter_state.slicer_is_current(driver, state, title, values):
+            print(f"  ✓ Filtro {title} = {values} já aplicado")
+            continue
+
+        if slicers is None:
+            slicers = discover_slicers(driver)
+        try:
+            slicer = find_slicer(slicers, title)
+        except ValueError as e:
+            print(f"  ❌ {e}")
+            ok = False
+            continue
+        if slicer is None:
+            print(f"  ❌ Slicer '{title}' não encontrado nesta página")
+            ok = False
+            continue
+        missing = select_slicer_values(driver, slicer, values)
+        changed = True
+        if missing:
+            print(f"  ❌ Valores não encontrados em '{slicer['title']}': {', '.join(missing)}")
+            ok = False
+            if state is not None:
+                filter_state.forget(state, title)
+        else:
+            print(f"  ✓ Filtro {slicer['title']} = {values}")
+            if state is not None:
+                filter_state.record(state, title, values)
+
+    if changed:
+        # Aguarda os visuais recalcularem com o novo filtro
+        time.sleep(settle_time)
+    return ok
+
+
+def parse_filter_spec(specs):
+    """
+    Converte argumentos 'Título=valor1,valor2' (ou 'Título=all') em dict
+
+    Returns:
+        {título: 'all' | [valores]}
+    """
+    requested = {}
+    for spec in specs or []:
+        if '=' not in spec:
+            raise ValueError(f"Filtro inválido: '{spec}' (use Título=valor1,valor2 ou Título=all)")
+        title, values = spec.split('=', 1)
+        values = values.strip()
+        if values.lower() in ('all', '*'):
+            requested[title.strip()] = 'all'
+        else:
+            requested[title.strip()] = [v.strip() for v in values.split(',') if v.strip()]
+    return requested
+
+
+def filter_tag(filters):
+    """
+    Identificador curto de uma combinação, para nomes de arquivo
+
+    O prefixo legível é cortado em 64 caracteres; o hash da combinação
+    completa no final evita que duas combinações com o mesmo prefixo (ou
+    que só diferem em acentos/pontuação) gravem no mesmo arquivo.
+    """
+    if not filters:
+        return ""
+    parts = []
+    for title, value in sorted(filters.items()):
+        value = '+'.join(value) if isinstance(value, (list, tuple)) else str(value)
+        parts.append(f"{title}-{value}")
+    tag = "".join(c if c.isalnum() or c in '-_+' else '' for c in "_".join(parts).replace(' ', ''))
+    digest = hashlib.sha1(json.dumps(filters, sort_keys=True).encode('utf-8')).hexdigest()[:8]
+    return f"{tag[:64]}_{digest}"
+
+
+def filter_columns(filters):
+    """Colunas 'Filtro_<título>' usadas no DataFrame consolidado"""
+    columns = {}
+    for title, value in (filters or {}).items():
+        column = FILTER_COLUMN_PREFIX + "".join(c if c.isalnum() else '_' for c in title).strip('_')
+        columns[column] = '+'.join(value) if isinstance(value, (list, tuple)) else value
+    return columns
@@ -0,0 +1,365 @@
+"""
+Armazenamento local (SQLite) de todas as extrações
+
+Esquema normalizado:
+    runs         - uma linha por execução (metadados da extração)
+    series       - séries identificadas por (página, rótulo, dimensões)
+    observations - valores por (série, data, execução), com upsert idempotente
+
+Consultas por série e data usam o índice (series_id, obs_date), sem
+varrer os CSVs das pastas de saída.
+"""
+
+import json
+import os
+import sqlite3
+from datetime import datetime
+
+from ons_powerbi import value_parsing
+
+
+DEFAULT_DB_PATH = os.path.join("extracao_powerbi", "ons_powerbi.sqlite")
+
+SCHEMA_VERSION = 1
+
+# Prefixo das colunas do DataFrame com os valores dos slicers aplicados
+FILTER_COLUMN_PREFIX = "Filtro_"
+
+# Valor vigente de cada (série, data): o da execução mais recente
+_LATEST_RUN_CONDITION = """
+    o.run_id = (
+        SELECT MAX(o2.run_id) FROM observations o2
+        WHERE o2.series_id = o.series_id AND o2.obs_date = o.obs_date
+    )
+"""
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id        TEXT PRIMARY KEY,
+    started_at    TEXT NOT NULL,
+    finished_at   TEXT,
+    source_url    TEXT,
+    mode          TEXT,
+    target_pages  TEXT,
+    total_pages   INTEGER,
+    total_rows    INTEGER,
+    metadata      TEXT NOT NULL DEFAULT '{}'
+);
+
+CREATE TABLE IF NOT EXISTS series (
+    series_id     INTEGER PRIMARY KEY,
+    page_number   INTEGER NOT NULL,
+    label         TEXT NOT NULL,
+    dimensions    TEXT NOT NULL DEFAULT '{}',
+    UNIQUE (page_number, label, dimensions)
+);
+
+CREATE TABLE IF NOT EXISTS observations (
+    series_id     INTEGER NOT NULL REFERENCES series (series_id),
+    obs_date      TEXT NOT NULL,
+    run_id        TEXT NOT NULL REFERENCES runs (run_id),
+    value         REAL,
+    text_content  TEXT,
+    aria_label    TEXT,
+    PRIMARY KEY (series_id, obs_date, run_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_observations_series_date ON observations (series_id, obs_date);
+CREATE INDEX IF NOT EXISTS idx_observations_run ON observations (run_id);
+CREATE INDEX IF NOT EXISTS idx_series_label ON series (label);
+"""
+
+
+def connect(db_path=DEFAULT_DB_PATH):
+    """Abre (e cria, se necessário) o banco SQLite com o esquema atualizado"""
+    folder = os.path.dirname(db_path)
+    if folder and not os.path.exists(folder):
+        os.makedirs(folder)
+
+    conn = sqlite3.connect(db_path, timeout=30)  # vários jobs podem gravar ao mesmo tempo
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    conn.executescript(_SCHEMA)
+    conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+    return conn
+
+
+def new_run_id():
+    """Gera um identificador de execução baseado no horário atual"""
+    return datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+
+
+def _dumps(value):
+    return json.dumps(value, ensure_ascii=False, sort_keys=True)
+
+
+def begin_run(conn, run_id=None, source_url=None, mode=None, target_pages=None, metadata=None):
+    """Registra o início de uma execução e retorna o run_id"""
+    run_id = run_id or new_run_id()
+    with conn:
+        conn.execute(
+            """
+            INSERT INTO runs (run_id, started_at, source_url, mode, target_pages, metadata)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (run_id) DO UPDATE SET
+                source_url = COALESCE(excluded.source_url, runs.source_url),
+                mode = COALESCE(excluded.mode, runs.mode),
+                target_pages = COALESCE(excluded.target_pages, runs.target_pages),
+                metadata = excluded.metadata
+            """,
+            (run_id, datetime.now().isoformat(timespec='seconds'), source_url, mode,
+             _dumps(target_pages) if target_pages is not None else None, _dumps(metadata or {})),
+        )
+    return run_id
+
+
+def finish_run(conn, run_id, total_pages=None, total_rows=None):
+    """Marca a execução como concluída"""
+    with conn:
+        conn.execute(
+            "UPDATE runs SET finished_at = ?, total_pages = ?, total_rows = ? WHERE run_id = ?",
+            (datetime.now().isoformat(timespec='seconds'), total_pages, total_rows, run_id),
+        )
+
+
+def get_series_id(conn, page_number, label, dimensions=None):
+    """Retorna o series_id de (página, rótulo, dimensões), criando a série se necessário"""
+    dimensions_json = _dumps(dimensions or {})
+    conn.execute(
+        "INSERT OR IGNORE INTO series (page_number, label, dimensions) VALUES (?, ?, ?)",
+        (page_number, label, dimensions_json),
+    )
+    row = conn.execute(
+        "SELECT series_id FROM series WHERE page_number = ? AND label = ? AND dimensions = ?",
+        (page_number, label, dimensions_json),
+    ).fetchone()
+    return row[0]
+
+
+def upsert_observations(conn, run_id, rows):
+    """
+    Insere ou atualiza observações de forma idempotente
+
+    Args:
+        rows: Iterável de dicts com page_number, label, date, value e,
+            opcionalmente, dimensions, text_content, aria_label
+
+    Returns:
+        (gravadas, ignoradas_sem_data)
+    """
+    series_cache = {}
+    batch = []
+    skipped = 0
+
+    for row in rows:
+        if not row.get('date'):
+            skipped += 1
+            continue
+
+        dimensions = row.get('dimensions') or {}
+        cache_key = (row['page_number'], row['label'], _dumps(dimensions))
+        series_id = series_cache.get(cache_key)
+        if series_id is None:
+            series_id = get_series_id(conn, row['page_number'], row['label'], dimensions)
+            series_cache[cache_key] = series_id
+
+        batch.append((series_id, row['date'], run_id, row.get('value'),
+                      row.get('text_content'), row.get('aria_label')))
+
+    with conn:
+        conn.executemany(
+            """
+            INSERT INTO observations (series_id, obs_date, run_id, value, text_content, aria_label)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (series_id, obs_date, run_id) DO UPDATE SET
+                value = excluded.value,
+                text_content = excluded.text_content,
+                aria_label = excluded.aria_label
+            """,
+            batch,
+        )
+
+    return len(batch), skipped
+
+
+def _page_number(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0
+
+
+def rows_from_dataframe(df, dimensions=None):
+    """
+    Converte o DataFrame consolidado de save_data() em linhas para upsert_observations()
+
+    Args:
+        dimensions: Atributos comuns a todas as séries (ex.: {'dashboard': ...})
+    """
+    if 'Data' not in df.columns or 'Valor' not in df.columns:
+        df = value_parsing.add_point_columns(df.copy())
+
+    # Colunas 'Filtro_*' (combinações de slicers) também distinguem as séries
+    filter_columns = [c for c in df.columns if str(c).startswith(FILTER_COLUMN_PREFIX)]
+
+    for record in df.to_dict('records'):
+        value = record.get('Valor')
+        row_dimensions = dimensions
+        if filter_columns:
+            row_dimensions = dict(dimensions or {})
+            for column in filter_columns:
+                if record.get(column) is not None and record.get(column) == record.get(column):
+                    row_dimensions[column[len(FILTER_COLUMN_PREFIX):]] = record[column]
+        yield {
+            'page_number': _page_number(record.get('Página')),
+            'label': record.get('Serie_Label', ''),
+            'date': record.get('Data'),
+            'value': None if value is None or value != value else float(value),  # NaN -> None
+            'text_content': record.get('Text_Content'),
+            'aria_label': record.get('Element_Aria_Label'),
+            'dimensions': row_dimensions,
+        }
+
+
+def save_dataframe(df, db_path=DEFAULT_DB_PATH, run_id=None, source_url=None, mode=None,
+                   target_pages=None, metadata=None, dimensions=None):
+    """
+    Grava o DataFrame consolidado de uma execução no banco local
+
+    Args:
+        dimensions: Atributos que distinguem as séries deste dashboard das
+            séries de outros dashboards gravados no mesmo banco
+
+    Returns:
+        Dict com run_id, linhas gravadas e linhas ignoradas (sem data)
+    """
+    conn = connect(db_path)
+    try:
+        run_id = begin_run(conn, run_id=run_id, source_url=source_url, mode=mode,
+                           target_pages=target_pages, metadata=metadata)
+        written, skipped = upsert_observations(conn, run_id, rows_from_dataframe(df, dimensions))
+        total_pages = int(df['Página'].nunique()) if 'Página' in df.columns else None
+        finish_run(conn, run_id, total_pages=total_pages, total_rows=written)
+    finally:
+        conn.close()
+
+    return {'run_id': run_id, 'written': written, 'skipped': skipped, 'db_path': db_path}
+
+
+def list_series(conn):
+    """Lista as séries armazenadas"""
+    return [dict(row) for row in conn.execute(
+        "SELECT series_id, page_number, label, dimensions FROM series ORDER BY page_number, label"
+    )]
+
+
+def list_runs(conn):
+    """Lista as execuções registradas, da mais recente para a mais antiga"""
+    return [dict(row) for row in conn.execute("SELECT * FROM runs ORDER BY started_at DESC")]
+
+
+def query_series(conn, label, start_date=None, end_date=None, page_number=None, run_id=None):
+    """
+    Consulta os valores mais recentes de uma série em um intervalo de datas
+
+    Para cada data retorna o valor da execução mais recente (ou da execução
+    informada em run_id). As datas usam o formato ISO do value_parsing.
+    """
+    sql = """
+        SELECT s.page_number, s.label, s.dimensions, o.obs_date, o.value, o.run_id
+        FROM series s
+        JOIN observations o ON o.series_id = s.series_id
+        WHERE s.label = ?
+    """
+    params = [label]
+    if page_number is not None:
+        sql += " AND s.page_number = ?"
+        params.append(page_number)
+    if start_date is not None:
+        sql += " AND o.obs_date >= ?"
+        params.append(start_date)
+    if end_date is not None:
+        sql += " AND o.obs_date <= ?"
+        params.append(end_date)
+    if run_id is not None:
+        sql += " AND o.run_id = ?"
+        params.append(run_id)
+    else:
+        sql += " AND " + _LATEST_RUN_CONDITION
+    sql += " ORDER BY s.page_number, o.obs_date"
+    return [dict(row) for row in conn.execute(sql, params)]
+
+
+def latest_values_sql(join=""):
+    """
+    SQL dos valores vigentes (series_id, obs_date, value) de todas as séries
+
+    Mesmo critério de query_series(): para cada (série, data), o valor da
+    execução mais recente. Ordenado por série e data.
+
+    Args:
+        join: JOIN adicional sobre 'observations o' para restringir as linhas
+    """
+    return f"""
+        SELECT o.series_id, o.obs_date, o.value
+        FROM observations o
+        {join}
+        WHERE {_LATEST_RUN_CONDITION}
+        ORDER BY o.series_id, o.obs_date
+    """
+
+
+def value_across_runs(conn, label, obs_date, page_number=None):
+    """Retorna o valor de uma série em uma data para cada execução que a capturou"""
+    sql = """
+        SELECT o.run_id, r.started_at, s.page_number, o.value
+        FROM series s
+        JOIN observations o ON o.series_id = s.series_id
+        JOIN runs r ON r.run_id = o.run_id
+        WHERE s.label = ? AND o.obs_date = ?
+    """
+    params = [label, obs_date]
+    if page_number is not None:
+        sql += " AND s.page_number = ?"
+        params.append(page_number)
+    sql += " ORDER BY o.run_id"
+    return [dict(row) for row in conn.execute(sql, params)]
+
+
+def latest_observation_date(db_path=DEFAULT_DB_PATH, dimensions=None):
+    """
+    Retorna a data mais recente gravada (DD/MM/AAAA) para as séries com as
+    dimensões informadas, ou None se o banco não tem dados
+
+    Basta a série ter as dimensões informadas: as que vêm dos slicers
+    (ex.: {'dashboard': ..., 'Subsistema': 'Sul'}) também entram.
+    """
+    if not os.path.exists(db_path):
+        return None
+
+    sql = """
+        SELECT MAX(o.obs_date) FROM observations o
+        JOIN series s ON s.series_id = o.series_id
+        WHERE 1 = 1
+    """
+    params = []
+    for key, value in (dimensions or {}).items():
+        sql += " AND json_extract(s.dimensions, ?) = ?"
+        params.extend([f'$."{key}"', value])
+
+    conn = connect(db_path)
+    try:
+        row = conn.execute(sql, params).fetchone()
+    finally:
+        conn.close()
+
+    latest = row[0] if row else None
+    if not latest:
+        return None
+
+    # 'AAAA-MM-DD[ HH:MM]' ou 'AAAA-MM' -> DD/MM/AAAA
+    parts = latest[:10].split('-')
+    day = parts[2] if len(parts) > 2 else '01'
+    return f"{day}/{parts[1]}/{parts[0]}"
@@ -0,0 +1,202 @@
+"""
+Timeouts adaptativos aprendidos com os tempos de carregamento anteriores
+
+Os tempos de espera eram números fixos (60 s para carregar o relatório,
+3 s por tentativa de achar o botão de próxima página, 15 s para os
+visuais...). Este módulo guarda os tempos observados por dashboard,
+página e fase em um histórico JSON e deriva deles os timeouts:
+
+    timeout = percentil 99 × margem
+
+limitado entre MIN_TIMEOUT e MAX_FACTOR × valor fixo. Com poucas
+amostras o valor fixo é usado. Páginas rápidas passam a falhar (ou
+seguir) rápido e páginas sabidamente lentas deixam de gerar timeouts
+espúrios. O intervalo de verificação (poll) do WebDriverWait também
+acompanha a mediana da fase.
+
+Uso:
+    profile = timings.new_profile(embed_url)
+    wait = timings.timeout(profile, 'page_visuals', 15, page=3)
+    ...
+    timings.record(profile, 'page_visuals', elapsed, page=3)
+    timings.save(profile)
+
+Todas as funções aceitam profile=None (timeouts fixos, nada registrado).
+"""
+
+import json
+import math
+import os
+import threading
+
+
+DEFAULT_PATH = os.path.join("extracao_powerbi", ".cache", "timings.json")
+
+DEFAULT_PERCENTILE = 99
+DEFAULT_MARGIN = 1.5
+
+# Amostras mantidas por fase (janela móvel) e mínimo para confiar no histórico
+DEFAULT_WINDOW = 200
+MIN_SAMPLES = 5
+
+MIN_TIMEOUT = 1.0
+MAX_FACTOR = 4
+
+MIN_POLL_INTERVAL = 0.1
+DEFAULT_POLL_INTERVAL = 0.5  # padrão do WebDriverWait
+
+_file_lock = threading.Lock()
+
+
+def _load_history(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_history(history, path):
+    folder = os.path.dirname(path)
+    if folder and not os.path.exists(folder):
+        os.makedirs(folder)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(history, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def _key(phase, page):
+    return phase if page is None else f"{phase}@{page}"
+
+
+def new_profile(dashboard, path=DEFAULT_PATH, margin=DEFAULT_MARGIN, percentile=DEFAULT_PERCENTILE,
+                window=DEFAULT_WINDOW):
+    """
+    Carrega o histórico de tempos de um dashboard
+
+    Args:
+        dashboard: Identificador do dashboard (ex.: URL do Power BI)
+        path: Arquivo JSON do histórico (compartilhado entre dashboards)
+        margin: Multiplicador aplicado ao percentil
+        percentile: Percentil dos tempos observados usado no timeout
+        window: Amostras mantidas por fase
+
+    Returns:
+        Dict do perfil (usado pelas demais funções)
+    """
+    with _file_lock:
+        samples = _load_history(path).get(dashboard, {})
+    return {
+        'dashboard': dashboard,
+        'path': path,
+        'margin': margin,
+        'percentile': percentile,
+        'window': window,
+        'samples': {key: list(values) for key, values in samples.items()},
+        'new': {},  # amostras desta execução, ainda não gravadas
+        'lock': threading.Lock(),
+    }
+
+
+def record(profile, phase, seconds, page=None):
+    """Registra um tempo observado (um timeout estourado entra com o tempo esperado)"""
+    if profile is None:
+        return
+    key = _key(phase, page)
+    seconds = round(seconds, 3)
+    with profile['lock']:
+        profile['samples'].setdefault(key, []).append(seconds)
+        del profile['samples'][key][:-profile['window']]
+        profile['new'].setdefault(key, []).append(seconds)
+
+
+def percentile(values, q):
+    """Percentil q (0-100) por interpolação linear"""
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100
+    low, high = math.floor(position), math.ceil(position)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+def _samples(profile, phase, page):
+    """Amostras da página; com poucas, as da fase em todas as páginas"""
+    with profile['lock']:
+        values = list(profile['samples'].get(_key(phase, page), []))
+        if len(values) < MIN_SAMPLES and page is not None:
+            prefix = f"{phase}@"
+            values = [value for key, found in profile['samples'].items()
+                      if key == phase or key.startswith(prefix) for value in found]
+    return values
+
+
+def timeout(profile, phase, default, page=None, minimum=MIN_TIMEOUT):
+    """
+    Timeout (s) da fase: percentil × margem, ou o valor fixo sem histórico
+
+    Args:
+        profile: Perfil de new_profile() (None: usa o valor fixo)
+        phase: Nome da fase (ex.: 'load', 'button_probe', 'page_visuals')
+        default: Valor fixo usado até haver MIN_SAMPLES amostras
+        page: Página do relatório (None para fases que não dependem dela)
+        minimum: Menor timeout devolvido
+    """
+    if profile is None:
+        return default
+    values = _samples(profile, phase, page)
+    if len(values) < MIN_SAMPLES:
+        return default
+    learned = percentile(values, profile['percentile']) * profile['margin']
+    return round(min(max(learned, minimum), default * MAX_FACTOR), 2)
+
+
+def poll_interval(profile, phase, page=None, default=DEFAULT_POLL_INTERVAL):
+    """Intervalo de verificação do WebDriverWait: um décimo da mediana da fase"""
+    if profile is None:
+        return default
+    values = _samples(profile, phase, page)
+    if len(values) < MIN_SAMPLES:
+        return default
+    return round(min(max(percentile(values, 50) / 10, MIN_POLL_INTERVAL), default), 2)
+
+
+def save(profile):
+    """
+    Grava as amostras desta execução no histórico
+
+    O arquivo é relido antes de gravar, para não perder as amostras de
+    outros dashboards ou de outras execuções em paralelo.
+    """
+    if profile is None:
+        return
+    with profile['lock']:
+        new = profile['new']
+        profile['new'] = {}
+    if not new:
+        return
+
+    with _file_lock:
+        history = _load_history(profile['path'])
+        samples = history.setdefault(profile['dashboard'], {})
+        for key, values in new.items():
+            samples[key] = (samples.get(key, []) + values)[-profile['window']:]
+        _save_history(history, profile['path'])
+
+
+def report(profile):
+    """Resumo por fase/página: amostras, mediana e percentil usados nos timeouts"""
+    if profile is None:
+        return {}
+    with profile['lock']:
+        keys = sorted(profile['samples'])
+    summary = {}
+    for key in keys:
+        phase, _, page = key.partition('@')
+        page = int(page) if page.isdigit() else None
+        values = _samples(profile, phase, page)
+        summary[key] = {
+            'samples': len(values),
+            'p50': round(percentile(values, 50), 2),
+            f"p{profile['percentile']}": round(percentile(values, profile['percentile']), 2),
+        }
+    return summary
@@ -0,0 +1,224 @@
+"""
+Coleta em lote dos tooltips dos gráficos
+
+Alguns valores só aparecem no tooltip. Em vez de um ActionChains por
+ponto (uma ida e volta ao navegador para cada hover), um único
+execute_async_script percorre todos os elementos de cada série dentro
+da página: dispara os eventos de ponteiro sintéticos no centro do
+elemento, lê o DOM do tooltip e devolve tudo em um só payload.
+
+O tooltip costuma ser atualizado no próprio handler do evento; quando
+não é, um MutationObserver aguarda a mudança por até max_wait_ms.
+"""
+
+import time
+
+from ons_powerbi import value_parsing
+from ons_powerbi.browser import execute_async_script
+
+
+# Contêineres de tooltip do Power BI (o primeiro visível é usado)
+TOOLTIP_SELECTORS = ['.tooltip-container', '[class*="tooltip-container"]', '[role="tooltip"]']
+
+DEFAULT_MAX_WAIT_MS = 150
+DEFAULT_TIMEOUT = 300
+
+
+_HARVEST_JS = """
+const targetClass = arguments[0];
+const additionalSelectors = arguments[1];
+const tooltipSelectors = arguments[2];
+const maxWaitMs = arguments[3];
+const done = arguments[arguments.length - 1];
+
+function findTooltip() {
+    for (const selector of tooltipSelectors) {
+        for (const element of document.querySelectorAll(selector)) {
+            const style = window.getComputedStyle(element);
+            if (style.display !== 'none' && style.visibility !== 'hidden' && element.textContent.trim()) {
+                return element;
+            }
+        }
+    }
+    return null;
+}
+
+function readTooltip() {
+    const tooltip = findTooltip();
+    if (!tooltip) return null;
+    const rows = [];
+    tooltip.querySelectorAll('.tooltip-row, [class*="tooltip-row"]').forEach(row => {
+        const title = row.querySelector('.tooltip-title-cell, [class*="title"]');
+        const value = row.querySelector('.tooltip-value-cell, [class*="value"]');
+        if (title || value) {
+            rows.push([(title ? title.textContent : '').trim(), (value ? value.textContent : '').trim()]);
+        }
+    });
+    return {text: tooltip.textContent.trim(), rows: rows};
+}
+
+function fire(element, types, x, y) {
+    types.forEach(type => {
+        const init = {bubbles: true, cancelable: true, composed: true, view: window,
+                      clientX: x, clientY: y, pointerId: 1, pointerType: 'mouse', isPrimary: true};
+        const event = type.startsWith('pointer') ? new PointerEvent(type, init) : new MouseEvent(type, init);
+        element.dispatchEvent(event);
+    });
+}
+
+function waitForChange(previous) {
+    // Resolve na primeira mutação que altera o texto do tooltip ou após maxWaitMs
+    return new Promise(resolve => {
+        const observer = new MutationObserver(() => {
+            const current = readTooltip();
+            if (current && current.text !== previous) {
+                observer.disconnect();
+                clearTimeout(timer);
+                resolve(current);
+            }
+        });
+        observer.observe(document.body, {childList: true, subtree: true, characterData: true});
+        const timer = setTimeout(() => { observer.disconnect(); resolve(readTooltip()); }, maxWaitMs);
+    });
+}
+
+let selectors = ['.' + targetClass.replace(/\\s+/g, '.'), '[class*="' + targetClass + '"]'];
+if (Array.isArray(additionalSelectors)) selectors = selectors.concat(additionalSelectors);
+
+(async () => {
+    const results = [];
+    let previousText = null;
+    let previousElement = null;
+
+    const seriesElements = document.querySelectorAll('[class*="series"]');
+    for (let seriesIndex = 0; seriesIndex < seriesElements.length; seriesIndex++) {
+        // Mesma seleção/ordem de extract_specific_class_data()
+        const elements = new Set();
+        selectors.forEach(selector => {
+            try {
+                seriesElements[seriesIndex].querySelectorAll(selector).forEach(e => elements.add(e));
+            } catch (e) {}
+        });
+
+        let elementIndex = 0;
+        for (const element of elements) {
+            const r = element.getBoundingClientRect();
+            const x = r.left + r.width / 2, y = r.top + r.height / 2;
+
+            if (previousElement) fire(previousElement, ['pointerout', 'pointerleave', 'mouseout', 'mouseleave'], x, y);
+            fire(element, ['pointerover', 'pointerenter', 'mouseover', 'mouseenter', 'pointermove', 'mousemove'], x, y);
+            previousElement = element;
+
+            let tooltip = readTooltip();
+            if (!tooltip || tooltip.text === previousText) {
+                tooltip = await waitForChange(previousText);
+            }
+            const changed = tooltip && tooltip.text !== previousText;
+            results.push({series_index: seriesIndex, element_index: elementIndex,
+                          tooltip: changed ? tooltip : null});
+            if (changed) previousText = tooltip.text;
+            elementIndex++;
+        }
+    }
+
+    if (previousElement) fire(previousElement, ['pointerout', 'pointerleave', 'mouseout', 'mouseleave'], 0, 0);
+    done(results);
+})().catch(error => done({error: String(error)}));
+"""
+
+
+def harvest_tooltips(driver, target_class='column setFocusRing', additional_selectors=None,
+                     max_wait_ms=DEFAULT_MAX_WAIT_MS, timeout=DEFAULT_TIMEOUT):
+    """
+    Passa o ponteiro (eventos sintéticos) por todos os elementos das séries
+    e lê os tooltips em uma única chamada ao navegador
+
+    Args:
+        driver: Selenium WebDriver já posicionado na página
+        target_class / additional_selectors: Ver extract_specific_class_data()
+        max_wait_ms: Espera máxima pelo tooltip de cada ponto
+        timeout: Limite (s) da chamada inteira
+
+    Returns:
+        Dicionário {'tooltips': [...], 'stats': {...}}; cada item tem
+        series_index, element_index e tooltip ({'text', 'rows'} ou None)
+    """
+    start_time = time.time()
+    results = execute_async_script(
+        driver, _HARVEST_JS, target_class, list(additional_selectors or []), TOOLTIP_SELECTORS, max_wait_ms,
+        timeout=timeout,
+    )
+    if isinstance(results, dict) and 'error' in results:
+        raise RuntimeError(f"Erro ao coletar tooltips: {results['error']}")
+
+    elapsed = time.time() - start_time
+    with_tooltip = sum(1 for item in results if item['tooltip'])
+    return {
+        'tooltips': results,
+        'stats': {
+            'points': len(results),
+            'with_tooltip': with_tooltip,
+            'seconds': round(elapsed, 2),
+            'points_per_second': round(len(results) / elapsed, 1) if elapsed else None,
+        },
+    }
+
+
+def tooltip_text(tooltip):
+    """Texto do tooltip em uma linha ('Título: valor | ...')"""
+    if not tooltip:
+        return ''
+    if tooltip.get('rows'):
+        return ' | '.join(f"{title}: {value}" if title else value for title, value in tooltip['rows'])
+    return tooltip.get('text', '')
+
+
+def attach_tooltips(page_data, harvest):
+    """
+    Associa os tooltips coletados aos elementos de page_data ('tooltip')
+
+    Returns:
+        Número de elementos que receberam tooltip
+    """
+    attached = 0
+    series_list = page_data.get('series', [])
+    by_index = {series.get('series_index', i): series for i, series in enumerate(series_list)}
+
+    for item in harvest['tooltips']:
+        series = by_index.get(item['series_index'])
+        if series is None or not item['tooltip']:
+            continue
+        elements = series.get('elements', [])
+        if item['element_index'] < len(elements):
+            elements[item['element_index']]['tooltip'] = item['tooltip']
+            attached += 1
+
+    page_data['tooltip_stats'] = harvest['stats']
+    return attached
+
+
+def fill_missing_points(df):
+    """
+    Completa 'Data' e 'Valor' do DataFrame consolidado com o texto do tooltip
+
+    Só preenche onde o aria-label/texto não trouxe o dado; a coluna
+    'Fonte_Valor' indica a origem ('aria' ou 'tooltip').
+    Opera no próprio DataFrame e o retorna.
+    """
+    if 'Tooltip' not in df.columns:
+        return df
+
+    if 'Fonte_Valor' not in df.columns:
+        df['Fonte_Valor'] = None
+        df.loc[df['Valor'].notna(), 'Fonte_Valor'] = 'aria'
+
+    no_value, no_date = df['Valor'].isna(), df['Data'].isna()
+    candidates = (no_value | no_date) & (df['Tooltip'].fillna('') != '')
+    for index in df.index[candidates]:
+        date, value = value_parsing.parse_point(df.at[index, 'Tooltip'])
+        if no_date[index] and date is not None:
+            df.at[index, 'Data'] = date
+        if no_value[index] and value is not None:
+            df.at[index, 'Valor'] = value
+            df.at[index, 'Fonte_Valor'] = 'tooltip'
+    return df
@@ -0,0 +1,191 @@
+"""
+Interpretação de datas e valores a partir dos textos extraídos do Power BI
+
+Os elementos 'column setFocusRing' trazem data e valor no aria-label, por
+exemplo: "Data 01/10/2021. Curtailment (MWmed) 1.234,56." Este módulo
+converte esses textos em (data ISO, valor numérico).
+"""
+
+import re
+
+
+MONTHS_PT = {
+    'janeiro': 1, 'jan': 1,
+    'fevereiro': 2, 'fev': 2,
+    'março': 3, 'marco': 3, 'mar': 3,
+    'abril': 4, 'abr': 4,
+    'maio': 5, 'mai': 5,
+    'junho': 6, 'jun': 6,
+    'julho': 7, 'jul': 7,
+    'agosto': 8, 'ago': 8,
+    'setembro': 9, 'set': 9,
+    'outubro': 10, 'out': 10,
+    'novembro': 11, 'nov': 11,
+    'dezembro': 12, 'dez': 12,
+}
+
+_MONTH_NAMES = "|".join(sorted(MONTHS_PT, key=len, reverse=True))
+
+_DATE_PATTERNS = [
+    # 01/10/2021 ou 01/10/2021 13:00
+    (re.compile(r"\b(\d{1,2})/(\d{1,2})/(\d{4})(?:\s+(\d{1,2}):(\d{2}))?"), 'dmy'),
+    # 2021-10-01 ou 2021-10-01T13:00
+    (re.compile(r"\b(\d{4})-(\d{2})-(\d{2})(?:[T\s](\d{2}):(\d{2}))?"), 'ymd'),
+    # 1 de outubro de 2021
+    (re.compile(rf"\b(\d{{1,2}})\s+de\s+({_MONTH_NAMES})\.?\s+de\s+(\d{{4}})", re.IGNORECASE), 'd_name_y'),
+    # outubro de 2021 / out 2021
+    (re.compile(rf"\b({_MONTH_NAMES})\.?\s+(?:de\s+)?(\d{{4}})\b", re.IGNORECASE), 'name_y'),
+]
+
+_NUMBER_PATTERN = re.compile(
+    r"(?<![\w/])([-−]?\d[\d.,]*)\s*(mil|mi|bi|k|m|b)?(?![\w/])",
+    re.IGNORECASE,
+)
+
+_SCALE_SUFFIXES = {
+    'mil': 1e3, 'k': 1e3,
+    'mi': 1e6, 'm': 1e6,
+    'bi': 1e9, 'b': 1e9,
+}
+
+
+def _format_date(year, month, day=None, hour=None, minute=None):
+    if day is None:
+        return f"{year:04d}-{month:02d}"
+    if hour is None:
+        return f"{year:04d}-{month:02d}-{day:02d}"
+    return f"{year:04d}-{month:02d}-{day:02d} {hour:02d}:{minute:02d}"
+
+
+def find_date(text):
+    """
+    Localiza a primeira data em um texto
+
+    Returns:
+        (data_iso, (inicio, fim)) ou (None, None). A data é 'AAAA-MM-DD',
+        'AAAA-MM-DD HH:MM' ou 'AAAA-MM' (quando só há mês/ano).
+    """
+    if not text:
+        return None, None
+
+    for pattern, kind in _DATE_PATTERNS:
+        match = pattern.search(text)
+        if not match:
+            continue
+        groups = match.groups()
+        try:
+            if kind == 'dmy':
+                day, month, year = int(groups[0]), int(groups[1]), int(groups[2])
+                hour = int(groups[3]) if groups[3] else None
+                minute = int(groups[4]) if groups[4] else None
+            elif kind == 'ymd':
+                year, month, day = int(groups[0]), int(groups[1]), int(groups[2])
+                hour = int(groups[3]) if groups[3] else None
+                minute = int(groups[4]) if groups[4] else None
+            elif kind == 'd_name_y':
+                day, month, year = int(groups[0]), MONTHS_PT[groups[1].lower()], int(groups[2])
+                hour = minute = None
+            else:
+                day = hour = minute = None
+                month, year = MONTHS_PT[groups[0].lower()], int(groups[1])
+        except (KeyError, ValueError):
+            continue
+
+        if not 1 <= month <= 12 or (day is not None and not 1 <= day <= 31):
+            continue
+        return _format_date(year, month, day, hour, minute), match.span()
+
+    return None, None
+
+
+def parse_date(text):
+    """Retorna a primeira data do texto em formato ISO, ou None"""
+    return find_date(text)[0]
+
+
+def parse_number(text):
+    """
+    Converte um número formatado (pt-BR ou en) em float
+
+    Aceita separadores de milhar/decimal nos dois padrões, sinal '−'
+    e sufixos de escala (mil, Mi, Bi, K, M, B). Retorna None se não houver número.
+    """
+    if text is None:
+        return None
+    match = _NUMBER_PATTERN.search(str(text))
+    if not match:
+        return None
+    return _number_from_match(match)
+
+
+def _number_from_match(match):
+    raw, suffix = match.group(1), match.group(2)
+    raw = raw.replace('−', '-').rstrip('.,')
+
+    if ',' in raw and '.' in raw:
+        # O separador que aparece por último é o decimal
+        if raw.rfind(',') > raw.rfind('.'):
+            raw = raw.replace('.', '').replace(',', '.')
+        else:
+            raw = raw.replace(',', '')
+    elif ',' in raw:
+        # Vírgula é decimal no padrão pt-BR, exceto em grupos de milhar "1,234,567"
+        if re.fullmatch(r"-?\d{1,3}(,\d{3}){2,}", raw):
+            raw = raw.replace(',', '')
+        else:
+            raw = raw.replace(',', '.')
+    elif raw.count('.') > 1 or re.fullmatch(r"-?\d{1,3}\.\d{3}", raw):
+        # "1.234" e "1.234.567" são milhares no padrão pt-BR
+        raw = raw.replace('.', '')
+
+    try:
+        value = float(raw)
+    except ValueError:
+        return None
+
+    if suffix:
+        value *= _SCALE_SUFFIXES[suffix.lower()]
+    return value
+
+
+def parse_point(aria_label, text_content=''):
+    """
+    Extrai (data, valor) de um elemento de gráfico
+
+    A data vem do aria-label (ou do texto); o valor é o último número do
+    aria-label depois de removida a data, com fallback para o texto.
+    """
+    aria_label = aria_label or ''
+    date, span = find_date(aria_label)
+    remainder = aria_label
+    if span:
+        remainder = aria_label[:span[0]] + ' ' + aria_label[span[1]:]
+    else:
+        date = parse_date(text_content)
+
+    value = None
+    matches = list(_NUMBER_PATTERN.finditer(remainder))
+    for match in reversed(matches):
+        value = _number_from_match(match)
+        if value is not None:
+            break
+
+    if value is None and text_content:
+        value = parse_number(text_content)
+
+    return date, value
+
+
+def add_point_columns(df, aria_column='Element_Aria_Label', text_column='Text_Content'):
+    """
+    Adiciona as colunas 'Data' e 'Valor' ao DataFrame consolidado
+
+    Opera no próprio DataFrame e o retorna.
+    """
+    points = [
+        parse_point(aria, text)
+        for aria, text in zip(df[aria_column].fillna(''), df[text_column].fillna(''))
+    ]
+    df['Data'] = [point[0] for point in points]
+    df['Valor'] = [point[1] for point in points]
+    return df
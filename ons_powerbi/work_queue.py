@@ -0,0 +1,884 @@
+"""
+Fila de trabalho compartilhada para dividir uma extração entre máquinas
+
+As unidades página × janela de datas × combinação de slicers (ver
+scheduler.make_unit) são gravadas em uma fila. Cada worker, em qualquer
+máquina, reivindica unidades com um lease, renova o lease (heartbeat)
+enquanto extrai e grava o resultado da unidade assim que termina. Leases
+vencidos (worker que caiu ou travou) voltam para a fila e contam como
+tentativa: uma unidade que sempre derruba o worker acaba como 'failed'.
+
+Backends:
+    SQLiteQueueBackend - arquivo SQLite local (processos na mesma máquina
+                         ou disco compartilhado com locking confiável)
+    RedisQueueBackend  - qualquer servidor compatível com Redis; aceita o
+                         cliente redis-py ou o LocalRedis (substituto em
+                         memória para desenvolvimento)
+
+open_backend() escolhe o backend pela URL:
+    sqlite:///extracao_powerbi/fila.sqlite, redis://host:6379/0, local://
+
+Ao final, collect_results() devolve (unidade, resultado) e as falhas no
+mesmo formato de scheduler.run_work_units(), então a consolidação com
+build_all_pages_data() produz o mesmo conjunto de dados de uma execução
+em uma única máquina.
+
+Cada extração usa uma fila com nome próprio: uma fila já consolidada
+(meta 'merged_by') não recebe unidades novas até ser reaberta com
+reopen().
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from ons_powerbi import json_export, scheduler
+from ons_powerbi._lazy import lazy_import
+
+
+redis = lazy_import('redis')
+
+DEFAULT_LEASE_SECONDS = 120
+DEFAULT_POLL_INTERVAL = 5
+
+
+def default_worker_id():
+    """Identificador do worker: host e PID"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _text(value):
+    return value.decode('utf-8') if isinstance(value, bytes) else value
+
+
+def _mark_skipped(units, statuses, last_page):
+    """Registra nas unidades puladas o motivo, como em scheduler.run_work_units()"""
+    for unit, status in zip(units, statuses):
+        if status == 'skipped':
+            unit['errors'].append(f"LastPageReached: além da última página ({last_page})")
+
+
+# ---------------------------------------------------------------------------
+# Backend SQLite
+# ---------------------------------------------------------------------------
+
+_SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS queue_units (
+    queue TEXT NOT NULL,
+    unit_key TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    page INTEGER NOT NULL,
+    unit TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    owner TEXT,
+    lease_until REAL,
+    ready_at REAL NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    errors TEXT NOT NULL DEFAULT '[]',
+    updated_at REAL,
+    PRIMARY KEY (queue, unit_key)
+);
+
+CREATE INDEX IF NOT EXISTS idx_queue_units_claim ON queue_units (queue, status, ready_at, seq);
+
+CREATE TABLE IF NOT EXISTS queue_results (
+    queue TEXT NOT NULL,
+    unit_key TEXT NOT NULL,
+    worker TEXT,
+    finished_at REAL,
+    result BLOB,
+    PRIMARY KEY (queue, unit_key)
+);
+
+CREATE TABLE IF NOT EXISTS queue_meta (
+    queue TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT,
+    PRIMARY KEY (queue, key)
+);
+"""
+
+
+class SQLiteQueueBackend:
+    """Fila em um arquivo SQLite (uma conexão por thread)"""
+
+    def __init__(self, path):
+        folder = os.path.dirname(path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+        self.path = path
+        self._local = threading.local()
+        self._conn().executescript(_SQLITE_SCHEMA)
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _transaction(self):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")  # trava de escrita: reivindicações não se sobrepõem
+        return conn
+
+    def enqueue(self, queue, units):
+        """Grava as unidades (idempotente: unidades já existentes são mantidas)"""
+        conn = self._transaction()
+        try:
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO queue_units (queue, unit_key, seq, page, unit, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(queue, scheduler.unit_key(unit), seq, unit['page'],
+                  json.dumps(unit, ensure_ascii=False), time.time())
+                 for seq, unit in enumerate(units)],
+            )
+            added = conn.total_changes - before
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return added
+
+    def _unit_from_row(self, row):
+        unit = json.loads(row['unit'])
+        unit['attempts'] = row['attempts']
+        unit['errors'] = json.loads(row['errors'])
+        return unit
+
+    def claim(self, queue, worker_id, lease_seconds=DEFAULT_LEASE_SECONDS):
+        """Reivindica a próxima unidade pronta; retorna a unidade ou None"""
+        now = time.time()
+        conn = self._transaction()
+        try:
+            last_page = self.get_meta(queue, 'last_page')
+            if last_page is not None:
+                conn.execute(
+                    "UPDATE queue_units SET status = 'skipped', updated_at = ? "
+                    "WHERE queue = ? AND status = 'pending' AND page > ?",
+                    (now, queue, int(last_page)),
+                )
+            row = conn.execute(
+                "SELECT * FROM queue_units WHERE queue = ? AND status = 'pending' AND ready_at <= ? "
+                "ORDER BY ready_at, seq LIMIT 1",
+                (queue, now),
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE queue_units SET status = 'leased', owner = ?, lease_until = ?, updated_at = ? "
+                    "WHERE queue = ? AND unit_key = ?",
+                    (worker_id, now + lease_seconds, now, queue, row['unit_key']),
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return None if row is None else self._unit_from_row(row)
+
+    def heartbeat(self, queue, unit_key, worker_id, lease_seconds=DEFAULT_LEASE_SECONDS):
+        """Renova o lease; retorna False se o worker perdeu a unidade"""
+        cursor = self._conn().execute(
+            "UPDATE queue_units SET lease_until = ?, updated_at = ? "
+            "WHERE queue = ? AND unit_key = ? AND status = 'leased' AND owner = ?",
+            (time.time() + lease_seconds, time.time(), queue, unit_key, worker_id),
+        )
+        return cursor.rowcount == 1
+
+    def complete(self, queue, unit_key, worker_id, result, status='done'):
+        """Grava o resultado da unidade; retorna False se o lease já não era deste worker"""
+        conn = self._transaction()
+        try:
+            cursor = conn.execute(
+                "UPDATE queue_units SET status = ?, owner = NULL, lease_until = NULL, updated_at = ? "
+                "WHERE queue = ? AND unit_key = ? AND status = 'leased' AND owner = ?",
+                (status, time.time(), queue, unit_key, worker_id),
+            )
+            if cursor.rowcount == 1 and result is not None:
+                conn.execute(
+                    "INSERT OR REPLACE INTO queue_results (queue, unit_key, worker, finished_at, result) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (queue, unit_key, worker_id, time.time(), json_export.dumps_bytes(result)),
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return cursor.rowcount == 1
+
+    def fail(self, queue, unit_key, worker_id, error, retry_delay, max_retries):
+        """
+        Registra uma falha: devolve a unidade à fila após retry_delay ou a
+        marca como 'failed' quando esgota as tentativas
+
+        Returns:
+            Novo status ('pending' ou 'failed'), ou None se o lease foi perdido
+        """
+        conn = self._transaction()
+        try:
+            row = conn.execute(
+                "SELECT attempts, errors FROM queue_units "
+                "WHERE queue = ? AND unit_key = ? AND status = 'leased' AND owner = ?",
+                (queue, unit_key, worker_id),
+            ).fetchone()
+            status = None
+            if row is not None:
+                attempts = row['attempts'] + 1
+                errors = json.loads(row['errors']) + [error]
+                status = 'failed' if attempts > max_retries else 'pending'
+                conn.execute(
+                    "UPDATE queue_units SET status = ?, owner = NULL, lease_until = NULL, ready_at = ?, "
+                    "attempts = ?, errors = ?, updated_at = ? WHERE queue = ? AND unit_key = ?",
+                    (status, time.time() + retry_delay, attempts, json.dumps(errors, ensure_ascii=False),
+                     time.time(), queue, unit_key),
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return status
+
+    def release_expired(self, queue, max_retries=None):
+        """
+        Devolve à fila as unidades com lease vencido, ou as marca como
+        'failed' quando esgotam as tentativas (mesmo corte de fail())
+
+        Returns:
+            Quantas unidades foram liberadas
+        """
+        now = time.time()
+        conn = self._transaction()
+        try:
+            rows = conn.execute(
+                "SELECT unit_key, owner, attempts, errors FROM queue_units "
+                "WHERE queue = ? AND status = 'leased' AND lease_until < ?",
+                (queue, now),
+            ).fetchall()
+            for row in rows:
+                attempts = row['attempts'] + 1
+                errors = json.loads(row['errors']) + [f"Lease vencido (worker {row['owner']})"]
+                status = 'failed' if max_retries is not None and attempts > max_retries else 'pending'
+                conn.execute(
+                    "UPDATE queue_units SET status = ?, owner = NULL, lease_until = NULL, "
+                    "ready_at = ?, attempts = ?, errors = ?, updated_at = ? WHERE queue = ? AND unit_key = ?",
+                    (status, now, attempts, json.dumps(errors, ensure_ascii=False), now, queue, row['unit_key']),
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return len(rows)
+
+    def reset(self, queue):
+        """Apaga unidades, resultados e metadados da fila"""
+        conn = self._transaction()
+        try:
+            for table in ('queue_units', 'queue_results', 'queue_meta'):
+                conn.execute(f"DELETE FROM {table} WHERE queue = ?", (queue,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def get_meta(self, queue, key):
+        row = self._conn().execute(
+            "SELECT value FROM queue_meta WHERE queue = ? AND key = ?", (queue, key)
+        ).fetchone()
+        return None if row is None else json.loads(row['value'])
+
+    def set_meta(self, queue, key, value):
+        self._conn().execute(
+            "INSERT OR REPLACE INTO queue_meta (queue, key, value) VALUES (?, ?, ?)",
+            (queue, key, json.dumps(value, ensure_ascii=False)),
+        )
+
+    def set_meta_if_absent(self, queue, key, value):
+        """Grava o valor só se a chave não existe; retorna True para quem gravou"""
+        cursor = self._conn().execute(
+            "INSERT OR IGNORE INTO queue_meta (queue, key, value) VALUES (?, ?, ?)",
+            (queue, key, json.dumps(value, ensure_ascii=False)),
+        )
+        return cursor.rowcount == 1
+
+    def set_last_page(self, queue, last_page):
+        """Registra a última página do relatório (o menor valor visto vence)"""
+        conn = self._transaction()
+        try:
+            current = self.get_meta(queue, 'last_page')
+            if current is None or last_page < current:
+                self.set_meta(queue, 'last_page', last_page)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def stats(self, queue):
+        """Contagem de unidades por status"""
+        rows = self._conn().execute(
+            "SELECT status, COUNT(*) AS total FROM queue_units WHERE queue = ? GROUP BY status", (queue,)
+        ).fetchall()
+        return {row['status']: row['total'] for row in rows}
+
+    def results(self, queue):
+        """Lista de (unidade, resultado) das unidades concluídas, na ordem original"""
+        rows = self._conn().execute(
+            "SELECT u.*, r.result FROM queue_units u JOIN queue_results r "
+            "ON r.queue = u.queue AND r.unit_key = u.unit_key "
+            "WHERE u.queue = ? AND u.status = 'done' ORDER BY u.seq",
+            (queue,),
+        ).fetchall()
+        return [(self._unit_from_row(row), json_export.loads(row['result'])) for row in rows]
+
+    def failed(self, queue):
+        """Unidades que esgotaram as tentativas ou ficaram além da última página"""
+        rows = self._conn().execute(
+            "SELECT * FROM queue_units WHERE queue = ? AND status IN ('failed', 'skipped') ORDER BY seq",
+            (queue,),
+        ).fetchall()
+        units = [self._unit_from_row(row) for row in rows]
+        _mark_skipped(units, [row['status'] for row in rows], self.get_meta(queue, 'last_page'))
+        return units
+
+
+# ---------------------------------------------------------------------------
+# Backend compatível com Redis
+# ---------------------------------------------------------------------------
+
+class LocalRedis:
+    """
+    Substituto em memória de um servidor Redis (apenas os comandos usados
+    por RedisQueueBackend), para desenvolvimento sem servidor
+
+    Compartilhado entre as threads do processo; não entre máquinas.
+    """
+
+    def __init__(self):
+        self._hashes = {}
+        self._zsets = {}
+        self._lock = threading.RLock()
+
+    def pipeline(self):
+        return _LocalPipeline(self)
+
+    def delete(self, *names):
+        with self._lock:
+            return sum(1 for name in names
+                       if self._hashes.pop(name, None) is not None or self._zsets.pop(name, None) is not None)
+
+    def hget(self, name, key):
+        with self._lock:
+            return self._hashes.get(name, {}).get(key)
+
+    def hset(self, name, key, value):
+        with self._lock:
+            created = key not in self._hashes.setdefault(name, {})
+            self._hashes[name][key] = value
+            return int(created)
+
+    def hsetnx(self, name, key, value):
+        with self._lock:
+            if key in self._hashes.get(name, {}):
+                return 0
+            return self.hset(name, key, value)
+
+    def hexists(self, name, key):
+        with self._lock:
+            return key in self._hashes.get(name, {})
+
+    def hdel(self, name, *keys):
+        with self._lock:
+            values = self._hashes.get(name, {})
+            return sum(1 for key in keys if values.pop(key, None) is not None)
+
+    def hgetall(self, name):
+        with self._lock:
+            return dict(self._hashes.get(name, {}))
+
+    def zadd(self, name, mapping, xx=False):
+        with self._lock:
+            zset = self._zsets.setdefault(name, {})
+            added = 0
+            for member, score in mapping.items():
+                if xx and member not in zset:
+                    continue
+                added += member not in zset
+                zset[member] = float(score)
+            return added
+
+    def zrem(self, name, *members):
+        with self._lock:
+            zset = self._zsets.get(name, {})
+            return sum(1 for member in members if zset.pop(member, None) is not None)
+
+    def zscore(self, name, member):
+        with self._lock:
+            return self._zsets.get(name, {}).get(member)
+
+    def zcard(self, name):
+        with self._lock:
+            return len(self._zsets.get(name, {}))
+
+    def zrangebyscore(self, name, min, max, start=None, num=None):
+        with self._lock:
+            low = float('-inf') if min == '-inf' else float(min)
+            high = float('inf') if max == '+inf' else float(max)
+            members = sorted((score, member) for member, score in self._zsets.get(name, {}).items()
+                             if low <= score <= high)
+            members = [member for _, member in members]
+            if start is not None:
+                members = members[start:start + num if num is not None else None]
+            return members
+
+
+class _LocalPipeline:
+    """
+    WATCH/MULTI/EXEC do LocalRedis, com a mesma interface do pipeline do redis-py
+
+    watch() trava o LocalRedis até execute()/reset(): como tudo roda no
+    mesmo processo, a transação nunca é abortada.
+    """
+
+    def __init__(self, client):
+        self._client = client
+        self._locked = False
+        self._buffered = False
+        self._commands = []
+
+    def watch(self, *names):
+        if not self._locked:
+            self._client._lock.acquire()
+            self._locked = True
+
+    def multi(self):
+        self._buffered = True
+
+    def __getattr__(self, name):
+        command = getattr(self._client, name)
+        if not self._buffered:
+            return command  # entre watch() e multi() os comandos rodam na hora
+
+        def buffer(*args, **kwargs):
+            self._commands.append((command, args, kwargs))
+            return self
+        return buffer
+
+    def execute(self):
+        try:
+            with self._client._lock:
+                return [command(*args, **kwargs) for command, args, kwargs in self._commands]
+        finally:
+            self.reset()
+
+    def reset(self):
+        self._commands = []
+        self._buffered = False
+        if self._locked:
+            self._locked = False
+            self._client._lock.release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.reset()
+
+
+_LOCAL_REDIS = LocalRedis()
+
+
+class RedisQueueBackend:
+    """
+    Fila em um servidor compatível com Redis
+
+    Chaves por fila (prefixo ons:<fila>:): units (hash), pending (zset por
+    pronto_em), leases (zset por vencimento), owners, status, results e
+    meta (hashes). Cada mudança de estado de uma unidade (reivindicação,
+    conclusão, falha, lease vencido) é uma transação WATCH/MULTI/EXEC:
+    um worker que cai no meio não deixa a unidade fora de 'pending' e de
+    'leases' ao mesmo tempo.
+    """
+
+    _NAMES = ('units', 'pending', 'leases', 'owners', 'status', 'results', 'meta')
+
+    def __init__(self, client):
+        self.client = client
+
+    def _key(self, queue, name):
+        return f"ons:{queue}:{name}"
+
+    def _atomic(self, watched, body):
+        """
+        Executa body(pipe) como transação otimista, repetindo se uma chave
+        observada mudar antes do EXEC
+
+        body lê pelo pipe (comandos imediatos), chama pipe.multi() antes
+        de escrever e devolve o resultado da operação.
+        """
+        while True:
+            with self.client.pipeline() as pipe:
+                try:
+                    pipe.watch(*watched)
+                    result = body(pipe)
+                    pipe.execute()
+                    return result
+                except Exception as e:
+                    if type(e).__name__ != 'WatchError':
+                        raise
+
+    def _load_unit(self, queue, unit_key, client=None):
+        return json.loads(_text((client or self.client).hget(self._key(queue, 'units'), unit_key)))
+
+    def enqueue(self, queue, units):
+        added = 0
+        for seq, unit in enumerate(units):
+            unit_key = scheduler.unit_key(unit)
+            stored = json.dumps(dict(unit, seq=seq), ensure_ascii=False)
+
+            def add(pipe, unit_key=unit_key, stored=stored, seq=seq):
+                if pipe.hexists(self._key(queue, 'units'), unit_key):
+                    return False
+                pipe.multi()
+                pipe.hset(self._key(queue, 'units'), unit_key, stored)
+                # Pontuação inicial = ordem original (sempre "pronta")
+                pipe.zadd(self._key(queue, 'pending'), {unit_key: seq})
+                pipe.hset(self._key(queue, 'status'), unit_key, 'pending')
+                return True
+
+            added += self._atomic([self._key(queue, 'units')], add)
+        return added
+
+    def claim(self, queue, worker_id, lease_seconds=DEFAULT_LEASE_SECONDS):
+        last_page = self.get_meta(queue, 'last_page')
+        pending = self._key(queue, 'pending')
+
+        def take(pipe, unit_key):
+            if pipe.zscore(pending, unit_key) is None:
+                return None  # outro worker reivindicou antes
+            unit = self._load_unit(queue, unit_key, pipe)
+            skip = last_page is not None and unit['page'] > last_page
+            pipe.multi()
+            pipe.zrem(pending, unit_key)
+            if skip:
+                pipe.hset(self._key(queue, 'status'), unit_key, 'skipped')
+                return 'skipped'
+            pipe.hset(self._key(queue, 'owners'), unit_key, worker_id)
+            pipe.zadd(self._key(queue, 'leases'), {unit_key: time.time() + lease_seconds})
+            pipe.hset(self._key(queue, 'status'), unit_key, 'leased')
+            return unit
+
+        while True:
+            candidates = self.client.zrangebyscore(pending, '-inf', time.time(), start=0, num=10)
+            if not candidates:
+                return None
+            for unit_key in map(_text, candidates):
+                unit = self._atomic([pending], lambda pipe: take(pipe, unit_key))
+                if isinstance(unit, dict):
+                    unit.pop('seq', None)
+                    return unit
+
+    def _owns(self, queue, unit_key, worker_id, client=None):
+        client = client or self.client
+        return (_text(client.hget(self._key(queue, 'owners'), unit_key)) == worker_id
+                and client.zscore(self._key(queue, 'leases'), unit_key) is not None)
+
+    def heartbeat(self, queue, unit_key, worker_id, lease_seconds=DEFAULT_LEASE_SECONDS):
+        if not self._owns(queue, unit_key, worker_id):
+            return False
+        self.client.zadd(self._key(queue, 'leases'), {unit_key: time.time() + lease_seconds}, xx=True)
+        return True
+
+    def _release(self, pipe, queue, unit_key):
+        pipe.zrem(self._key(queue, 'leases'), unit_key)
+        pipe.hdel(self._key(queue, 'owners'), unit_key)
+
+    def complete(self, queue, unit_key, worker_id, result, status='done'):
+        def finish(pipe):
+            if not self._owns(queue, unit_key, worker_id, pipe):
+                return False
+            pipe.multi()
+            self._release(pipe, queue, unit_key)
+            if result is not None:
+                pipe.hset(self._key(queue, 'results'), unit_key, json_export.dumps_bytes(result).decode('utf-8'))
+            pipe.hset(self._key(queue, 'status'), unit_key, status)
+            return True
+
+        return self._atomic([self._key(queue, 'leases'), self._key(queue, 'owners')], finish)
+
+    def _requeue(self, pipe, queue, unit_key, error, ready_at, max_retries=None):
+        """Dentro de MULTI: libera o lease e devolve a unidade à fila (ou a marca como 'failed')"""
+        unit = self._load_unit(queue, unit_key, pipe)
+        unit['attempts'] += 1
+        unit['errors'].append(error)
+        status = 'failed' if max_retries is not None and unit['attempts'] > max_retries else 'pending'
+        pipe.multi()
+        self._release(pipe, queue, unit_key)
+        pipe.hset(self._key(queue, 'units'), unit_key, json.dumps(unit, ensure_ascii=False))
+        if status == 'pending':
+            pipe.zadd(self._key(queue, 'pending'), {unit_key: ready_at})
+        pipe.hset(self._key(queue, 'status'), unit_key, status)
+        return status
+
+    def fail(self, queue, unit_key, worker_id, error, retry_delay, max_retries):
+        def record(pipe):
+            if not self._owns(queue, unit_key, worker_id, pipe):
+                return None
+            return self._requeue(pipe, queue, unit_key, error, time.time() + retry_delay, max_retries)
+
+        return self._atomic([self._key(queue, 'leases'), self._key(queue, 'owners')], record)
+
+    def release_expired(self, queue, max_retries=None):
+        leases = self._key(queue, 'leases')
+
+        def release(pipe, unit_key):
+            score = pipe.zscore(leases, unit_key)
+            if score is None or score >= time.time():
+                return False  # já liberada ou renovada
+            owner = _text(pipe.hget(self._key(queue, 'owners'), unit_key))
+            self._requeue(pipe, queue, unit_key, f"Lease vencido (worker {owner})", time.time(), max_retries)
+            return True
+
+        released = 0
+        for unit_key in map(_text, self.client.zrangebyscore(leases, '-inf', time.time())):
+            released += self._atomic([leases, self._key(queue, 'owners')], lambda pipe: release(pipe, unit_key))
+        return released
+
+    def reset(self, queue):
+        """Apaga unidades, resultados e metadados da fila"""
+        self.client.delete(*(self._key(queue, name) for name in self._NAMES))
+
+    def get_meta(self, queue, key):
+        value = self.client.hget(self._key(queue, 'meta'), key)
+        return None if value is None else json.loads(_text(value))
+
+    def set_meta(self, queue, key, value):
+        self.client.hset(self._key(queue, 'meta'), key, json.dumps(value, ensure_ascii=False))
+
+    def set_meta_if_absent(self, queue, key, value):
+        return bool(self.client.hsetnx(self._key(queue, 'meta'), key, json.dumps(value, ensure_ascii=False)))
+
+    def set_last_page(self, queue, last_page):
+        current = self.get_meta(queue, 'last_page')
+        if current is None or last_page < current:
+            self.set_meta(queue, 'last_page', last_page)
+
+    def stats(self, queue):
+        counts = {}
+        for status in self.client.hgetall(self._key(queue, 'status')).values():
+            status = _text(status)
+            counts[status] = counts.get(status, 0) + 1
+        return counts
+
+    def _units_with_status(self, queue, wanted):
+        statuses = {_text(k): _text(v) for k, v in self.client.hgetall(self._key(queue, 'status')).items()}
+        units = [(key, self._load_unit(queue, key)) for key, status in statuses.items() if status == wanted]
+        units.sort(key=lambda item: item[1].get('seq', 0))
+        return units
+
+    def results(self, queue):
+        results = []
+        for unit_key, unit in self._units_with_status(queue, 'done'):
+            unit.pop('seq', None)
+            result = self.client.hget(self._key(queue, 'results'), unit_key)
+            results.append((unit, json_export.loads(_text(result))))
+        return results
+
+    def failed(self, queue):
+        failed = [(unit, 'failed') for _, unit in self._units_with_status(queue, 'failed')]
+        skipped = [(unit, 'skipped') for _, unit in self._units_with_status(queue, 'skipped')]
+        pairs = sorted(failed + skipped, key=lambda pair: pair[0].get('seq', 0))
+        units = [unit for unit, _ in pairs]
+        for unit in units:
+            unit.pop('seq', None)
+        _mark_skipped(units, [status for _, status in pairs], self.get_meta(queue, 'last_page'))
+        return units
+
+
+def open_backend(url):
+    """
+    Abre o backend da fila a partir de uma URL
+
+    sqlite:///caminho.sqlite (ou apenas um caminho), redis://host:porta/db,
+    rediss://... e local:// (LocalRedis em memória, compartilhado no processo)
+    """
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisQueueBackend(redis.Redis.from_url(url, decode_responses=True))
+    if url.startswith('local://'):
+        return RedisQueueBackend(_LOCAL_REDIS)
+    if url.startswith('sqlite:///'):
+        url = url[len('sqlite:///'):]
+    return SQLiteQueueBackend(url)
+
+
+# ---------------------------------------------------------------------------
+# Coordenação
+# ---------------------------------------------------------------------------
+
+def is_drained(backend, queue):
+    """True quando não há unidades pendentes nem em andamento"""
+    stats = backend.stats(queue)
+    return not stats.get('pending') and not stats.get('leased')
+
+
+def merged_by(backend, queue):
+    """Worker que consolidou a fila (None se ainda não foi consolidada)"""
+    return backend.get_meta(queue, 'merged_by')
+
+
+def reopen(backend, queue):
+    """Apaga a fila (unidades, resultados e metadados) para uma nova extração com o mesmo nome"""
+    backend.reset(queue)
+
+
+def enqueue_units(backend, queue, units, metadata=None):
+    """
+    Grava as unidades na fila (idempotente) e os metadados da extração
+
+    Várias máquinas podem chamar com a mesma configuração: as unidades
+    são identificadas por scheduler.unit_key() e não são duplicadas.
+    """
+    added = backend.enqueue(queue, units)
+    for key, value in (metadata or {}).items():
+        backend.set_meta_if_absent(queue, key, value)
+    return added
+
+
+def _heartbeat_loop(backend, queue, unit_key, worker_id, lease_seconds, stop):
+    while not stop.wait(lease_seconds / 3):
+        if not backend.heartbeat(queue, unit_key, worker_id, lease_seconds):
+            print(f"  ⚠️  Lease de {unit_key} perdido pelo worker {worker_id}")
+            return
+
+
+def run_queue_worker(backend, queue, session_factory, execute_unit, close_session=None, workers=1,
+                     worker_id=None, lease_seconds=DEFAULT_LEASE_SECONDS, poll_interval=DEFAULT_POLL_INTERVAL,
+                     max_retries=scheduler.DEFAULT_MAX_RETRIES, backoff_base=scheduler.DEFAULT_BACKOFF_BASE,
+                     backoff_max=scheduler.DEFAULT_BACKOFF_MAX, unit_timeout=scheduler.DEFAULT_UNIT_TIMEOUT,
+                     recycle_after=scheduler.DEFAULT_RECYCLE_AFTER):
+    """
+    Processa unidades da fila até ela se esvaziar
+
+    Mesmo contrato de sessão de scheduler.run_work_units(); cada unidade
+    concluída é gravada na fila imediatamente (resultado parcial), então
+    uma máquina que cai perde no máximo as unidades em andamento.
+
+    Returns:
+        Dicionário com as contagens deste processo (done, failed, retried, lost)
+    """
+    worker_id = worker_id or default_worker_id()
+    counts = {'done': 0, 'failed': 0, 'retried': 0, 'lost': 0, 'skipped': 0}
+    counts_lock = threading.Lock()
+
+    def count(name):
+        with counts_lock:
+            counts[name] += 1
+
+    def worker(index):
+        thread_id = f"{worker_id}:{index}"
+        session = None
+        consecutive_failures = 0
+        runner = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"ons-queue-unit-{index}")
+
+        try:
+            while True:
+                backend.release_expired(queue, max_retries)
+                unit = backend.claim(queue, thread_id, lease_seconds)
+                if unit is None:
+                    if is_drained(backend, queue):
+                        break
+                    time.sleep(poll_interval)  # outras máquinas ainda têm unidades em andamento
+                    continue
+
+                unit_key = scheduler.unit_key(unit)
+                stop = threading.Event()
+                heartbeat = threading.Thread(
+                    target=_heartbeat_loop, args=(backend, queue, unit_key, thread_id, lease_seconds, stop),
+                    name=f"ons-heartbeat-{index}", daemon=True,
+                )
+                heartbeat.start()
+
+                try:
+                    if session is None:
+                        session = session_factory()
+                    future = runner.submit(execute_unit, session, unit)
+                    try:
+                        result = future.result(timeout=unit_timeout)
+                    except FutureTimeoutError:
+                        if close_session is not None:
+                            try:
+                                close_session(session, 'timeout')
+                            except Exception:
+                                pass
+                        session = None
+                        runner.shutdown(wait=False)
+                        runner = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"ons-queue-unit-{index}")
+                        raise scheduler.UnitTimeout(f"Timeout de {unit_timeout}s excedido")
+
+                except scheduler.LastPageReached as e:
+                    stop.set()
+                    backend.set_last_page(queue, e.last_page)
+                    backend.complete(queue, unit_key, thread_id, None, status='skipped')
+                    count('skipped')
+                    continue
+
+                except Exception as e:
+                    stop.set()
+                    consecutive_failures += 1
+                    if consecutive_failures >= recycle_after and session is not None:
+                        if close_session is not None:
+                            try:
+                                close_session(session, 'recycle')
+                            except Exception:
+                                pass
+                        session = None
+                        consecutive_failures = 0
+
+                    delay = scheduler.backoff_delay(unit['attempts'] + 1, backoff_base, backoff_max)
+                    status = backend.fail(queue, unit_key, thread_id, f"{type(e).__name__}: {e}", delay, max_retries)
+                    count({'failed': 'failed', 'pending': 'retried'}.get(status, 'lost'))
+                    print(f"  ⚠️  Unidade {unit_key}: {e} ({status or 'lease perdido'})")
+                    continue
+
+                stop.set()
+                consecutive_failures = 0
+                if backend.complete(queue, unit_key, thread_id, result):
+                    count('done')
+                    print(f"  ✓ Unidade {unit_key} concluída por {thread_id}")
+                else:
+                    # O lease venceu e outra máquina assumiu a unidade
+                    count('lost')
+
+        finally:
+            runner.shutdown(wait=False)
+            if session is not None and close_session is not None:
+                try:
+                    close_session(session, 'done')
+                except Exception as e:
+                    print(f"  ⚠️  Erro ao fechar sessão: {e}")
+
+    threads = [
+        threading.Thread(target=worker, args=(index,), name=f"ons-queue-worker-{index}", daemon=True)
+        for index in range(max(1, workers))
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return counts
+
+
+def collect_results(backend, queue):
+    """
+    Resultados e falhas da fila no formato de scheduler.run_work_units()
+
+    Returns:
+        (lista de (unidade, resultado), lista de unidades com falha)
+    """
+    return backend.results(queue), backend.failed(queue)
@@ -0,0 +1,154 @@
+"""
+Escrita paralela dos arquivos de saída, com manifesto
+
+save_data() gravava um CSV por série por página, um depois do outro, e
+depois o CSV consolidado, o Pickle e o Excel. Em dashboards com muitas
+séries são centenas de escritas pequenas e síncronas. WriterPool
+serializa e grava as saídas independentes em paralelo (threads: a
+serialização do pandas e a escrita em disco liberam o GIL boa parte do
+tempo, e os DataFrames não precisam ser copiados para outro processo).
+
+Cada arquivo agendado entra no manifesto ({prefix}_manifest.json) com
+formato, linhas, bytes, tempo e estado ('done' ou 'error'); um arquivo
+fora do manifesto, ou com estado diferente de 'done', está incompleto.
+O tempo total de escrita é somado por formato, e o evento 'file_saved'
+do log só é registrado depois que o arquivo foi de fato gravado.
+
+Uso:
+    pool = WriterPool(manifest_path)
+    pool.submit(path, 'csv', lambda p: df.to_csv(p, index=False), rows=len(df))
+    saved = pool.close()
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from ons_powerbi import json_export, log
+
+
+DEFAULT_WORKERS = 4
+
+
+def manifest_filename(prefix):
+    """Nome do manifesto de uma execução"""
+    return f"{prefix}_manifest.json"
+
+
+class WriterPool:
+    """
+    Pool de escrita dos arquivos de uma execução
+
+    Args:
+        manifest_path: Arquivo do manifesto (None: sem manifesto)
+        workers: Arquivos gravados em paralelo (1 grava na thread do chamador)
+    """
+
+    def __init__(self, manifest_path=None, workers=DEFAULT_WORKERS):
+        self.manifest_path = manifest_path
+        self.workers = max(1, workers)
+        self.entries = []
+        self._futures = []
+        self._lock = threading.Lock()
+        self._started_at = time.time()
+        self._executor = None
+        if self.workers > 1:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='ons-writer')
+
+    def submit(self, path, file_format, write, rows=None, detail=None):
+        """
+        Agenda a gravação de um arquivo
+
+        Args:
+            path: Caminho de destino
+            file_format: Formato (chave do tempo por formato: 'csv', 'pickle', ...)
+            write: Função write(path) que grava o arquivo
+            rows: Linhas gravadas (registradas no manifesto)
+            detail: Texto mostrado após o nome do arquivo quando a gravação termina
+        """
+        entry = {'file': os.path.basename(path), 'path': path, 'format': file_format, 'rows': rows,
+                 'status': 'pending'}
+        with self._lock:
+            self.entries.append(entry)
+        if self._executor is None:
+            self._write(entry, write, detail)
+        else:
+            self._futures.append(self._executor.submit(self._write, entry, write, detail))
+        return entry
+
+    def _write(self, entry, write, detail):
+        started = time.time()
+        try:
+            write(entry['path'])
+        except Exception as e:
+            entry.update(status='error', error=str(e), seconds=round(time.time() - started, 3))
+            print(f"⚠️  Erro ao salvar {entry['file']}: {e}")
+            return
+        entry.update(status='done', seconds=round(time.time() - started, 3),
+                     bytes=os.path.getsize(entry['path']) if os.path.exists(entry['path']) else None)
+        print(f"  ✓ {entry['file']}" + (f" - {detail}" if detail else ""))
+        log.event('file_saved', path=entry['path'], format=entry['format'],
+                  rows=None if entry['rows'] is None else int(entry['rows']), bytes=entry['bytes'])
+
+    def format_times(self):
+        """Tempo somado de escrita, arquivos e bytes por formato"""
+        totals = {}
+        with self._lock:
+            entries = list(self.entries)
+        for entry in entries:
+            total = totals.setdefault(entry['format'], {'files': 0, 'seconds': 0.0, 'bytes': 0, 'errors': 0})
+            total['files'] += 1
+            total['seconds'] = round(total['seconds'] + entry.get('seconds', 0), 3)
+            total['bytes'] += entry.get('bytes') or 0
+            total['errors'] += entry['status'] == 'error'
+        return totals
+
+    def write_manifest(self):
+        """Grava o manifesto com o estado atual de cada arquivo"""
+        if not self.manifest_path:
+            return None
+        with self._lock:
+            files = [{key: value for key, value in entry.items() if key != 'path'} for entry in self.entries]
+        manifest = {
+            'written_at': datetime.now().isoformat(timespec='seconds'),
+            'wall_seconds': round(time.time() - self._started_at, 3),
+            'workers': self.workers,
+            'formats': self.format_times(),
+            'files': files,
+        }
+        tmp_path = f"{self.manifest_path}.{os.getpid()}.tmp"
+        json_export.write_json(manifest, tmp_path)
+        os.replace(tmp_path, self.manifest_path)
+        return self.manifest_path
+
+    def close(self):
+        """
+        Espera as gravações, grava o manifesto e mostra o tempo por formato
+
+        Returns:
+            Caminhos gravados com sucesso, na ordem em que foram agendados
+        """
+        for future in self._futures:
+            future.result()
+        if self._executor is not None:
+            self._executor.shutdown()
+
+        totals = self.format_times()
+        wall_seconds = time.time() - self._started_at
+        print(f"\n⏱️  Arquivos gravados em {wall_seconds:.1f}s ({self.workers} em paralelo); tempo por formato:")
+        for file_format, total in sorted(totals.items(), key=lambda item: -item[1]['seconds']):
+            print(f"  • {file_format}: {total['seconds']:.1f}s em {total['files']} arquivo(s)"
+                  + (f", {total['errors']} com erro" if total['errors'] else ""))
+        log.event('files_written', wall_seconds=round(wall_seconds, 3), workers=self.workers, formats=totals)
+
+        saved = [entry['path'] for entry in self.entries if entry['status'] == 'done']
+        try:
+            manifest = self.write_manifest()
+        except OSError as e:
+            print(f"⚠️  Erro ao gravar o manifesto: {e}")
+            manifest = None
+        if manifest:
+            saved.append(manifest)
+        return saved
@@ -12,7 +12,8 @@ import json
 import os
 import sys
 
-url = "https://www.ons.org.br/Paginas/faq_curtailment.aspx"
+# URL da página ONS (pode ser informada como argumento: python scrape_ons.py <url>)
+url = sys.argv[1] if len(sys.argv) > 1 else "https://www.ons.org.br/Paginas/faq_curtailment.aspx"
 
 options = Options()
 # Removendo headless para debug - você pode adicionar de volta depois
@@ -5,31 +5,66 @@ Acessa primeiro a página da ONS e localiza o iframe do Power BI
 
 import time
 import json
-import pandas as pd
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException
 import os
 import sys
+import argparse
+import io
+import shutil
+import tempfile
+import threading
 from datetime import datetime
 
+from ons_powerbi._lazy import lazy_attribute, lazy_import, resolve
+
+# pandas, selenium e os próprios submódulos só são importados no primeiro
+# uso, assim --help, --status e --discover-only respondem rápido
+pd = lazy_import('pandas')
+
+artifacts = lazy_import('ons_powerbi.artifacts')
+browser_pool = lazy_import('ons_powerbi.browser_pool')
+discovery = lazy_import('ons_powerbi.discovery')
+excel_export = lazy_import('ons_powerbi.excel_export')
+filter_state = lazy_import('ons_powerbi.filter_state')
+geometry = lazy_import('ons_powerbi.geometry')
+json_export = lazy_import('ons_powerbi.json_export')
+log = lazy_import('ons_powerbi.log')
+memory_watchdog = lazy_import('ons_powerbi.memory_watchdog')
+network_observer = lazy_import('ons_powerbi.network_observer')
+page_buffer = lazy_import('ons_powerbi.page_buffer')
+rollups = lazy_import('ons_powerbi.rollups')
+scheduler = lazy_import('ons_powerbi.scheduler')
+show_data = lazy_import('ons_powerbi.show_data')
+slicers = lazy_import('ons_powerbi.slicers')
+store = lazy_import('ons_powerbi.store')
+timings = lazy_import('ons_powerbi.timings')
+tooltips = lazy_import('ons_powerbi.tooltips')
+value_parsing = lazy_import('ons_powerbi.value_parsing')
+work_queue = lazy_import('ons_powerbi.work_queue')
+writers = lazy_import('ons_powerbi.writers')
+
+By = lazy_attribute('ons_powerbi.browser', 'By')
+EC = lazy_attribute('ons_powerbi.browser', 'EC')
+WebDriverWait = lazy_attribute('ons_powerbi.browser', 'WebDriverWait')
+selenium_exceptions = lazy_attribute('ons_powerbi.browser', 'selenium_exceptions')
+setup_driver = lazy_attribute('ons_powerbi.browser', 'setup_driver')
+wait_for_powerbi_load = lazy_attribute('ons_powerbi.browser', 'wait_for_powerbi_load')
+create_output_folder = lazy_attribute('ons_powerbi.output', 'create_output_folder')
+
+# Padrões dos parâmetros que vêm dos submódulos, lidos só na chamada (ver resolve)
+DEFAULT_STORE_PATH = lazy_attribute('ons_powerbi.store', 'DEFAULT_DB_PATH')
+DEFAULT_MAX_RETRIES = lazy_attribute('ons_powerbi.scheduler', 'DEFAULT_MAX_RETRIES')
+DEFAULT_UNIT_TIMEOUT = lazy_attribute('ons_powerbi.scheduler', 'DEFAULT_UNIT_TIMEOUT')
+DEFAULT_RECYCLE_AFTER = lazy_attribute('ons_powerbi.scheduler', 'DEFAULT_RECYCLE_AFTER')
+DEFAULT_TIMINGS_PATH = lazy_attribute('ons_powerbi.timings', 'DEFAULT_PATH')
+DEFAULT_TIMEOUT_MARGIN = lazy_attribute('ons_powerbi.timings', 'DEFAULT_MARGIN')
+DEFAULT_ARTIFACT_MODE = lazy_attribute('ons_powerbi.artifacts', 'DEFAULT_MODE')
+DEFAULT_WRITER_WORKERS = lazy_attribute('ons_powerbi.writers', 'DEFAULT_WORKERS')
+
 # URL da página ONS
 PAGE_URL = "https://www.ons.org.br/Paginas/faq_curtailment.aspx"
 
-
-def create_output_folder():
-    """Cria pasta para salvar os arquivos gerados"""
-    folder_name = f"extracao_powerbi"
-    
-    if not os.path.exists(folder_name):
-        os.makedirs(folder_name)
-        print(f"📁 Pasta criada: {folder_name}")
-    
-    return folder_name
+# Estratégias de extração opcionais, aplicadas em cada página além da leitura do DOM
+EXTRACTION_STRATEGIES = ('tooltips', 'show_data')
 
 
 def find_powerbi_iframe(driver):
@@ -94,76 +129,6 @@ def find_powerbi_iframe(driver):
         return None
 
 
-def setup_driver():
-    """Configura Chrome com opções otimizadas para Power BI"""
-    options = Options()
-    
-    # Opções para melhor desempenho
-    options.add_argument('--no-sandbox')
-    options.add_argument('--disable-dev-shm-usage')
-    options.add_argument('--disable-extensions')
-    options.add_argument('--disable-gpu')
-    options.add_argument('--window-size=1920,1080')
-    options.add_argument('--start-maximized')
-    
-    # Ativa logs de performance (útil para debugar Power BI)
-    options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
-    
-    print("Inicializando Chrome driver...")
-    try:
-        driver = webdriver.Chrome(options=options)
-        return driver
-    except Exception as e:
-        print(f"❌ Erro ao inicializar Chrome: {e}")
-        print("\nTente instalar webdriver-manager:")
-        print("  pip install webdriver-manager")
-        return None
-
-
-def wait_for_powerbi_load(driver, timeout=60):
-    """
-    Aguarda Power BI carregar completamente
-    Power BI usa renderização assíncrona complexa
-    """
-    print(f"\n⏳ Aguardando Power BI carregar (timeout: {timeout}s)...")
-    
-    start_time = time.time()
-    
-    # Estratégias progressivas
-    strategies = [
-        ("Body presente", By.TAG_NAME, "body", 5),
-        ("Elemento embed", By.CSS_SELECTOR, "[class*='embed'], [class*='iframe']", 10),
-        ("Containers visuais", By.CSS_SELECTOR, "[class*='visual'], [class*='Visual']", 15),
-        ("Elementos SVG (gráficos)", By.TAG_NAME, "svg", 10),
-        ("Elementos de dados", By.CSS_SELECTOR, "[class*='label'], [class*='value']", 10),
-    ]
-    
-    for description, by_type, selector, wait_time in strategies:
-        try:
-            elapsed = time.time() - start_time
-            remaining = max(1, timeout - elapsed)
-            
-            print(f"  • {description}...", end=" ")
-            WebDriverWait(driver, min(wait_time, remaining)).until(
-                EC.presence_of_element_located((by_type, selector))
-            )
-            print("✓")
-            
-        except TimeoutException:
-            print("✗")
-            
-        except Exception as e:
-            print(f"⚠️  {e}")
-    
-    # Aguarda adicional para JavaScript finalizar
-    print("  • Aguardando JavaScript finalizar...", end=" ")
-    time.sleep(10)
-    print("✓")
-    
-    total_time = time.time() - start_time
-    print(f"\n✓ Carregamento concluído em {total_time:.1f}s")
-
-
 def navigate_powerbi_pages(driver, max_pages=10):
     """
     Navega pelas páginas do Power BI clicando no botão 'Próxima Página'
@@ -236,7 +201,7 @@ def navigate_powerbi_pages(driver, max_pages=10):
             print("✓")
             page_count = page_num
             
-        except TimeoutException:
+        except selenium_exceptions.TimeoutException:
             print(f"\n  ⚠️  Timeout ao navegar para página {page_num}")
             break
         except Exception as e:
@@ -416,7 +381,8 @@ def extract_specific_class_data(driver, target_class=None, additional_selectors=
     """
     
     try:
-        data = driver.execute_script(js_extraction)
+        # Séries lidas em fatias do buffer da página (sem uma única mensagem gigante)
+        data = page_buffer.fetch(driver, js_extraction, ['series'])
         
         print(f"✓ Processamento concluído:")
         print(f"  • Classe alvo: '{target_class}'")
@@ -424,22 +390,9 @@ def extract_specific_class_data(driver, target_class=None, additional_selectors=
         print(f"  • Séries com elementos: {data['summary']['series_with_elements']}")
         print(f"  • Total de elementos em todas as séries: {data['summary']['total_elements_across_all_series']}")
         
-        # Mostra preview de cada série
+        # Preview de cada série (só com as prévias ligadas: terminal interativo)
         if data['series']:
-            print(f"\n📋 Preview das séries:")
-            for i, series in enumerate(data['series']):
-                print(f"\n  📊 Série {i+1}: \"{series['aria_label']}\"")
-                print(f"     • Elementos encontrados: {series['series_summary']['total_elements']}")
-                print(f"     • Elementos com texto: {series['series_summary']['elements_with_text']}")
-                
-                # Mostra primeiros elementos de cada série
-                if series['elements']:
-                    print(f"     • Preview dos primeiros elementos:")
-                    for j, element in enumerate(series['elements'][:3]):
-                        text_preview = element['text_content'][:60] + '...' if len(element['text_content']) > 60 else element['text_content']
-                        print(f"       {j+1}. {text_preview}")
-                else:
-                    print(f"     • Nenhum elemento '{target_class}' encontrado nesta série")
+            log.preview(lambda: series_preview(data['series'], target_class))
         
         return data
         
@@ -447,9 +400,54 @@ def extract_specific_class_data(driver, target_class=None, additional_selectors=
         print(f"❌ Erro ao executar extração: {e}")
         return None
 
+def series_preview(series_list, target_class):
+    """Texto da prévia das séries extraídas (primeiros elementos de cada uma)"""
+    lines = ["\n📋 Preview das séries:"]
+    for i, series in enumerate(series_list):
+        lines.append(f"\n  📊 Série {i+1}: \"{series['aria_label']}\"")
+        lines.append(f"     • Elementos encontrados: {series['series_summary']['total_elements']}")
+        lines.append(f"     • Elementos com texto: {series['series_summary']['elements_with_text']}")
+        
+        # Mostra primeiros elementos de cada série
+        if series['elements']:
+            lines.append(f"     • Preview dos primeiros elementos:")
+            for j, element in enumerate(series['elements'][:3]):
+                text_preview = element['text_content'][:60] + '...' if len(element['text_content']) > 60 else element['text_content']
+                lines.append(f"       {j+1}. {text_preview}")
+        else:
+            lines.append(f"     • Nenhum elemento '{target_class}' encontrado nesta série")
+    return "\n".join(lines)
+
+
+def consolidated_preview(consolidated_df):
+    """Texto da prévia do DataFrame consolidado e das estatísticas por série"""
+    # Mostra apenas algumas colunas essenciais para caber na tela
+    display_columns = ['Página', 'Serie_Label', 'Data', 'Valor', 'Text_Content']
+    available_columns = [col for col in display_columns if col in consolidated_df.columns]
+    series_stats = consolidated_df.groupby(['Serie_Label']).agg({
+        'Text_Content': 'count',
+        'Element_Aria_Label': lambda x: sum(1 for val in x if val.strip())
+    }).rename(columns={
+        'Text_Content': 'Total_Elementos',
+        'Element_Aria_Label': 'Elementos_com_Aria_Label'
+    })
+    return "\n".join([
+        "\n" + "="*80,
+        "Preview dos Dados Consolidados por Série:",
+        "="*80,
+        consolidated_df[available_columns].head(10).to_string(),
+        "="*80 + "\n",
+        "📊 Estatísticas por Série:",
+        series_stats.to_string(),
+    ])
+
+
 def extract_powerbi_visuals(driver):
     """
     Extrai dados dos visuais do Power BI usando JavaScript
+    
+    raw_text (fallback com o texto da página) volta como um único texto,
+    uma linha por linha visível, e raw_text_lines com o total de linhas.
     """
     print("\n📊 Extraindo visuais do Power BI...")
     
@@ -600,13 +598,23 @@ def extract_powerbi_visuals(driver):
     """
     
     try:
-        data = driver.execute_script(js_extraction)
+        # raw_text tem todas as linhas da página: cada lista vem em fatias limitadas, e as
+        # linhas são juntadas em um texto à medida que chegam (sem uma lista de milhares de strings)
+        raw_text = io.StringIO()
+        
+        def append_lines(lines):
+            raw_text.write(''.join(line + '\n' for line in lines))
+        
+        data = page_buffer.fetch(driver, js_extraction, ['tables', 'cards', 'charts', 'raw_text'],
+                                 consumers={'raw_text': append_lines})
+        data['raw_text_lines'] = data.get('raw_text') or 0
+        data['raw_text'] = raw_text.getvalue()
         
         print(f"✓ Encontrado:")
         print(f"  • {len(data.get('tables', []))} tabela(s)")
         print(f"  • {len(data.get('cards', []))} card(s)/KPI(s)")
         print(f"  • {len(data.get('charts', []))} gráfico(s)")
-        print(f"  • {len(data.get('raw_text', []))} linha(s) de texto")
+        print(f"  • {data['raw_text_lines']} linha(s) de texto")
         
         return data
         
@@ -615,6 +623,45 @@ def extract_powerbi_visuals(driver):
         return None
 
 
+def parse_page_spec(spec):
+    """
+    Converte uma especificação de páginas no formato (modo, paginas)
+    usado por extract_all_pages_data()
+
+    Aceita 'all', uma lista de inteiros ou um texto como "1,3,5-7".
+    Um único intervalo ("2-6") resulta no modo 'range'.
+    """
+    if spec is None or (isinstance(spec, str) and spec.strip().lower() in ('', 'all', 'todas')):
+        return ('all', None)
+
+    if isinstance(spec, int):
+        return ('specific', [spec])
+
+    if isinstance(spec, (list, tuple)):
+        pages = sorted(set(int(p) for p in spec))
+        return ('specific', pages)
+
+    pages = set()
+    parts = [part.strip() for part in str(spec).split(',') if part.strip()]
+    for part in parts:
+        if '-' in part:
+            start, end = (int(value) for value in part.split('-', 1))
+            if start < 1 or end < start:
+                raise ValueError(f"Intervalo de páginas inválido: {part!r}")
+            pages.update(range(start, end + 1))
+        else:
+            page = int(part)
+            if page < 1:
+                raise ValueError(f"Página inválida: {part!r}")
+            pages.add(page)
+
+    if not pages:
+        raise ValueError(f"Nenhuma página válida em {spec!r}")
+
+    mode = 'range' if len(parts) == 1 and '-' in parts[0] else 'specific'
+    return (mode, sorted(pages))
+
+
 def get_user_page_selection():
     """
     Solicita ao usuário qual(is) página(s) extrair
@@ -680,16 +727,451 @@ def get_user_page_selection():
             return (None, None)
 
 
-def extract_all_pages_data(driver, max_pages=10, mode='all', target_pages=None):
+NEXT_PAGE_SELECTORS = [
+    "//button[@aria-label='Próxima Página' and @aria-disabled='false']",
+    "//button[contains(@aria-label, 'Próxima') and @aria-disabled='false']",
+    "//button[@aria-label='Next Page' and @aria-disabled='false']",
+]
+
+PREVIOUS_PAGE_SELECTORS = [
+    "//button[@aria-label='Página Anterior' and @aria-disabled='false']",
+    "//button[contains(@aria-label, 'Anterior') and @aria-disabled='false']",
+    "//button[@aria-label='Previous Page' and @aria-disabled='false']",
+]
+
+
+def click_page_button(driver, selectors, probe_timeout=3, visual_timeout=15, timing=None, page=None):
+    """
+    Clica no botão de navegação de página (próxima/anterior)
+    Retorna False se o botão não existe ou está desabilitado
+    
+    timing: Perfil de tempos (ver timings); probe_timeout e visual_timeout
+        são o padrão até haver histórico
+    page: Página de destino (chave dos tempos dos visuais no histórico)
+    
+    O timeout aprendido só acelera o caso comum: antes de concluir que o
+    botão não existe (fim do relatório), a busca é refeita com probe_timeout.
+    """
+    def probe(wait):
+        probe_start = time.time()
+        for selector in selectors:
+            try:
+                button = WebDriverWait(driver, wait,
+                                       poll_frequency=timings.poll_interval(timing, 'button_probe')).until(
+                    EC.element_to_be_clickable((By.XPATH, selector))
+                )
+                if button:
+                    timings.record(timing, 'button_probe', time.time() - probe_start)
+                    return button
+            except selenium_exceptions.TimeoutException:
+                continue
+        return None
+    
+    learned_timeout = timings.timeout(timing, 'button_probe', probe_timeout)
+    button = probe(learned_timeout)
+    if not button and learned_timeout < probe_timeout:
+        print(f"  ⏳ Botão não apareceu em {learned_timeout:.1f}s; confirmando com {probe_timeout}s...")
+        button = probe(probe_timeout)
+    
+    if not button:
+        # Amostra censurada: o botão não apareceu no tempo esperado
+        timings.record(timing, 'button_probe', probe_timeout)
+        return False
+    
+    # Scroll até o botão
+    driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", button)
+    time.sleep(0.5)
+    
+    # Clica no botão
+    try:
+        button.click()
+    except Exception:
+        driver.execute_script("arguments[0].click();", button)
+    
+    # Aguarda a nova página carregar
+    time.sleep(5)
+    
+    # Aguarda elementos visuais carregarem
+    visual_timeout = timings.timeout(timing, 'page_visuals', visual_timeout, page=page)
+    visual_start = time.time()
+    try:
+        WebDriverWait(driver, visual_timeout,
+                      poll_frequency=timings.poll_interval(timing, 'page_visuals', page=page)).until(
+            EC.presence_of_element_located((By.CSS_SELECTOR, "[class*='visual'], svg, table"))
+        )
+        timings.record(timing, 'page_visuals', time.time() - visual_start, page=page)
+    except selenium_exceptions.TimeoutException:
+        # Entra no histórico com o tempo esperado: página lenta ganha mais tempo na próxima vez
+        timings.record(timing, 'page_visuals', visual_timeout, page=page)
+        print("  ⚠️  Timeout aguardando elementos visuais")
+    
+    return True
+
+
+def navigate_to_page(session, target_page):
+    """
+    Leva a sessão até a página desejada usando os botões próxima/anterior
+    
+    A falta do botão 'próxima' só é aceita como fim do relatório depois de
+    se repetir na mesma página com a sessão recarregada: um botão lento ou
+    um relatório travado não pode encerrar a extração.
+    
+    Levanta scheduler.LastPageReached se a página confirmadamente não existe,
+    ou RuntimeError (falha comum, com nova tentativa) se a confirmação diverge
+    """
+    missing_at = None
+    
+    while session['page'] < target_page:
+        print(f"\n➡️  Navegando para página {session['page'] + 1}...")
+        if click_page_button(session['driver'], NEXT_PAGE_SELECTORS, timing=session.get('timing'),
+                             page=session['page'] + 1):
+            session['page'] += 1
+            continue
+        
+        if missing_at is None:
+            missing_at = session['page']
+            print(f"  ↻ Botão 'próxima' ausente na página {missing_at}; recarregando para confirmar...")
+            reload_powerbi_session(session)
+        elif missing_at == session['page']:
+            raise scheduler.LastPageReached(missing_at)
+        else:
+            raise RuntimeError(f"Botão 'próxima' ausente nas páginas {missing_at} e {session['page']}")
+    
+    driver = session['driver']
+    
+    while session['page'] > target_page:
+        print(f"\n⬅️  Voltando para página {session['page'] - 1}...")
+        if not click_page_button(driver, PREVIOUS_PAGE_SELECTORS, timing=session.get('timing'),
+                                 page=session['page'] - 1):
+            # Sem botão 'anterior': recarrega o relatório na página 1
+            reload_powerbi_session(session)
+        else:
+            session['page'] -= 1
+
+
+def open_powerbi_session(embed_url, headless=False, timing=None):
+    """Abre um navegador novo já carregado no relatório Power BI"""
+    driver = setup_driver(headless=headless)
+    if not driver:
+        raise RuntimeError("Não foi possível inicializar o Chrome")
+    
+    session = {'driver': driver, 'embed_url': embed_url, 'page': 1, 'owned': True, 'dirty': False,
+               'network': network_observer.NetworkObserver(driver), 'headless': headless, 'timing': timing}
+    try:
+        reload_powerbi_session(session)
+    except Exception:
+        driver.quit()
+        raise
+    return session
+
+
+def open_context_session(pool, embed_url, timing=None):
+    """Abre uma sessão em um contexto isolado do Chrome compartilhado (ver browser_pool)"""
+    context = pool.open_context()
+    session = {'driver': context['driver'], 'embed_url': embed_url, 'page': 1, 'owned': True, 'dirty': False,
+               'network': network_observer.NetworkObserver(context['driver']), 'pool': pool, 'context': context,
+               'timing': timing}
+    try:
+        reload_powerbi_session(session)
+    except Exception:
+        pool.close_context(context)
+        raise
+    return session
+
+
+def recycle_context_session(session):
+    """Troca o contexto da sessão por um novo, liberando a memória acumulada pela aba"""
+    session['context'] = session['pool'].recycle(session['context'])
+    session['driver'] = session['context']['driver']
+    session['network'] = network_observer.NetworkObserver(session['driver'])
+    reload_powerbi_session(session)
+
+
+def recycle_browser_session(session, reason):
+    """
+    Recicla uma sessão que passou dos limites de memória
+    
+    Sessões em contexto do pool trocam de contexto, sessões próprias trocam
+    de Chrome e a sessão do chamador só recarrega o relatório (o que já
+    descarta o heap da aba). O estado de filtros é descartado, então a
+    unidade seguinte volta à sua página e reaplica datas e slicers.
+    """
+    print(f"\n♻️  Reciclando sessão do navegador: {reason}")
+    if session.get('context') is not None:
+        recycle_context_session(session)
+    elif session.get('owned', True):
+        try:
+            session['driver'].quit()
+        except Exception:
+            pass
+        fresh = open_powerbi_session(session['embed_url'], headless=session.get('headless', False),
+                                     timing=session.get('timing'))
+        session.update(driver=fresh['driver'], network=fresh['network'], page=1, dirty=False)
+    else:
+        reload_powerbi_session(session)
+    
+    if session.get('filter_state'):
+        filter_state.forget(session['filter_state'])
+    if session.get('watchdog'):
+        memory_watchdog.reset(session['watchdog'])
+        memory_watchdog.sample(session['watchdog'], session['driver'])
+
+
+def reload_powerbi_session(session):
+    """Recarrega o relatório na sessão, voltando à página 1 sem filtros aplicados"""
+    session['driver'].get(session['embed_url'])
+    wait_for_powerbi_load(session['driver'], timeout=60, timing=session.get('timing'))
+    session['page'] = 1
+    session['dirty'] = False
+    if session.get('filter_state'):
+        filter_state.forget(session['filter_state'])
+
+
+def close_powerbi_session(session, reason='done'):
+    """Fecha o navegador da sessão (o driver do chamador só é fechado se travou)"""
+    if session.get('download_dir'):
+        shutil.rmtree(session.pop('download_dir'), ignore_errors=True)
+    if session.get('context') is not None:
+        # Sessão em contexto do pool: fecha só a aba, o Chrome continua
+        session['pool'].close_context(session['context'])
+    elif session.get('owned', True) or reason == 'timeout':
+        session['driver'].quit()
+
+
+def extract_page_unit(session, unit, target_class='column setFocusRing', additional_selectors=None,
+                      strategies=(), sync_groups=None, memory_limits=None):
+    """
+    Executa uma unidade de trabalho: navega até a página, aplica as datas
+    e extrai os dados da página
+    
+    strategies: Estratégias opcionais (ver EXTRACTION_STRATEGIES)
+    sync_groups: Grupos de sincronização dos slicers (ver filter_state)
+    memory_limits: Limites do vigia de memória (ver memory_watchdog.new_watchdog)
+    """
+    if session.get('filter_state') is None:
+        session['filter_state'] = filter_state.new_state(sync_groups)
+    if session.get('watchdog') is None:
+        session['watchdog'] = memory_watchdog.new_watchdog(**(memory_limits or {}))
+    start_time = time.time()
+    try:
+        # Mede a memória entre unidades; acima do limite a sessão é reciclada antes de continuar
+        reason = memory_watchdog.check(session['watchdog'], session['driver'])
+        if reason is None and session.get('context') is not None and session['pool'].needs_recycle(session['context']):
+            reason = f"limite do contexto ({session['context']['units']} unidade(s))"
+        if reason:
+            recycle_browser_session(session, reason)
+        
+        if session.get('dirty'):
+            # Uma falha anterior deixou a sessão em estado incerto
+            print("  ↻ Recarregando relatório após falha...")
+            reload_powerbi_session(session)
+        
+        navigate_to_page(session, unit['page'])
+        
+        print(f"\n{'='*70}")
+        print(f"  PÁGINA {unit['page']}")
+        print(f"{'='*70}")
+        print("  ✓ Extraindo dados desta página...")
+        
+        # Só reaplica os filtros que diferem do estado atual da página
+        apply_date_filters(session['driver'], start_date=unit.get('start_date'), end_date=unit.get('end_date'),
+                           state=session['filter_state'])
+        
+        if unit.get('filters'):
+            if not slicers.apply_filters(session['driver'], unit['filters'], state=session['filter_state']):
+                raise RuntimeError(f"Falha ao aplicar filtros {unit['filters']}")
+        
+        # Extrai dados da página atual
+        page_data = extract_specific_class_data(session['driver'], target_class=target_class,
+                                                additional_selectors=additional_selectors)
+        if page_data is None:
+            raise RuntimeError("Extração da página não retornou dados")
+        
+        # Valores reconstruídos da geometria SVG (cobre aria-labels ausentes/truncados)
+        try:
+            recovered = geometry.attach_geometry_values(session['driver'], page_data, target_class=target_class,
+                                                        additional_selectors=additional_selectors)
+            print(f"  ✓ Geometria: {recovered} marca(s) com valor reconstruído")
+        except Exception as e:
+            print(f"  ⚠️  Geometria SVG indisponível nesta página: {e}")
+        
+        if 'tooltips' in strategies:
+            # Todos os tooltips da página em uma única chamada ao navegador
+            try:
+                harvest = tooltips.harvest_tooltips(session['driver'], target_class=target_class,
+                                                    additional_selectors=additional_selectors)
+                attached = tooltips.attach_tooltips(page_data, harvest)
+                stats = harvest['stats']
+                print(f"  ✓ Tooltips: {attached}/{stats['points']} ponto(s) em {stats['seconds']}s "
+                      f"({stats['points_per_second']} pontos/s)")
+            except Exception as e:
+                print(f"  ⚠️  Erro ao coletar tooltips: {e}")
+        
+        if 'show_data' in strategies:
+            # Linhas completas de cada visual via "Exportar dados" / "Mostrar como tabela"
+            try:
+                if not session.get('download_dir'):
+                    # Uma pasta de downloads por sessão do navegador
+                    session['download_dir'] = tempfile.mkdtemp(prefix='ons_powerbi_export_')
+                tables, stats = show_data.extract_visual_tables(session['driver'],
+                                                                download_dir=session['download_dir'])
+                page_data['visual_tables'] = tables
+                page_data['visual_table_stats'] = stats
+                print(f"  ✓ Dados dos visuais: {stats['export']} exportado(s), {stats['show_as_table']} como tabela, "
+                      f"{stats['unavailable']} só pelo DOM (de {stats['visuals']})")
+            except Exception as e:
+                print(f"  ⚠️  Erro ao usar 'Mostrar/Exportar dados': {e}")
+        
+    except scheduler.LastPageReached:
+        raise
+    except Exception:
+        session['dirty'] = True
+        raise
+    
+    page_data['page_number'] = unit['page']
+    if unit.get('start_date') or unit.get('end_date'):
+        page_data['date_window'] = [unit.get('start_date'), unit.get('end_date')]
+    if unit.get('filters'):
+        page_data['filters'] = dict(unit['filters'])
+    if session.get('context') is not None:
+        session['context']['units'] += 1
+    page_data['memory'] = dict(session['watchdog']['last'] or {}, recycles=session['watchdog']['recycles'])
+    
+    # Esvazia o log de rede a cada unidade: só as requisições de dados desta página ficam
+    if session.get('network') is not None:
+        page_data['network_requests'] = session['network'].drain()
+    
+    elements = sum(len(series.get('elements', [])) for series in page_data.get('series', []))
+    log.event('unit_done', page=unit['page'], start_date=unit.get('start_date'), end_date=unit.get('end_date'),
+              filters=unit.get('filters') or {}, series=len(page_data.get('series', [])), elements=elements,
+              seconds=round(time.time() - start_time, 2), heap_mb=page_data['memory'].get('heap_mb'))
+    log.count('units_done')
+    log.count('elements', elements)
+    return page_data
+
+
+def build_work_units(max_pages=10, mode='all', target_pages=None, date_windows=None,
+                     filter_combinations=None):
+    """
+    Monta as unidades página × janela de datas × combinação de filtros
+
+    As unidades são ordenadas por janela, combinação e página, para que
+    cada sessão percorra o relatório sempre para frente.
+    """
+    if mode == 'all':
+        pages = list(range(1, max_pages + 1))
+    else:
+        pages = sorted(p for p in (target_pages or []) if p <= max_pages)
+    
+    windows = date_windows or [(None, None)]
+    combinations = filter_combinations or [{}]
+    return [scheduler.make_unit(page, start, end, filters)
+            for start, end in windows for filters in combinations for page in pages]
+
+
+def build_all_pages_data(unit_results, mode='all', target_pages=None, failed_units=None):
+    """
+    Consolida os resultados das unidades na estrutura de extract_all_pages_data()
+    """
+    all_data = {
+        'pages': [],
+        'total_tables': 0,
+        'total_cards': 0,
+        'total_charts': 0,
+        'mode': mode,
+        'target_pages': target_pages
+    }
+    
+    def unit_order(item):
+        # Janelas em ordem cronológica (as datas são DD/MM/AAAA, não ordenáveis como texto)
+        unit = item[0]
+        start = datetime.strptime(unit['start_date'], "%d/%m/%Y") if unit.get('start_date') else datetime.min
+        return unit['page'], start, slicers.filter_tag(unit.get('filters'))
+    
+    ordered = sorted(unit_results, key=unit_order)
+    for unit, page_data in ordered:
+        all_data['pages'].append(page_data)
+        all_data['total_tables'] += len(page_data.get('tables', []))
+        all_data['total_cards'] += len(page_data.get('cards', []))
+        all_data['total_charts'] += len(page_data.get('charts', []))
+    
+    if failed_units:
+        all_data['failed_units'] = [
+            {'page': unit['page'], 'start_date': unit.get('start_date'), 'end_date': unit.get('end_date'),
+             'filters': unit.get('filters') or {}, 'attempts': unit['attempts'], 'errors': unit['errors']}
+            for unit in failed_units
+        ]
+    
+    return all_data
+
+
+def open_extraction_queue(queue, queue_name, reopen_queue=False):
+    """
+    Abre a fila compartilhada de uma extração
+    
+    Uma fila já consolidada não recebe unidades novas (as unidades
+    concluídas seriam ignoradas e nada seria consolidado de novo): exige
+    outro nome ou reopen_queue, que apaga a fila anterior.
+    
+    Raises:
+        ValueError: queue_name não informado
+        RuntimeError: fila já consolidada e reopen_queue falso
+    """
+    if not queue_name:
+        raise ValueError("Informe o nome da fila (--queue-name): cada extração usa uma fila própria")
+    backend = work_queue.open_backend(queue)
+    merged_by = work_queue.merged_by(backend, queue_name)
+    if merged_by is not None:
+        if not reopen_queue:
+            raise RuntimeError(f"A fila '{queue_name}' já foi consolidada por {merged_by}; "
+                               f"use outro --queue-name ou --queue-reopen")
+        print(f"\n♻️  Reabrindo a fila '{queue_name}' (consolidada por {merged_by})")
+        work_queue.reopen(backend, queue_name)
+    return backend
+
+
+def extract_all_pages_data(driver, max_pages=10, mode='all', target_pages=None,
+                           start_date="01/10/2021", end_date=None,
+                           target_class='column setFocusRing', additional_selectors=None,
+                           date_windows=None, filter_combinations=None, embed_url=None, headless=False,
+                           workers=1, strategies=(), sync_groups=None, max_retries=DEFAULT_MAX_RETRIES,
+                           unit_timeout=DEFAULT_UNIT_TIMEOUT,
+                           recycle_after=DEFAULT_RECYCLE_AFTER,
+                           queue=None, queue_name=None, reopen_queue=False, browser_contexts=False,
+                           memory_limits=None, timing=None, artifact_store=None):
     """
     Extrai dados de todas as páginas do Power BI ou páginas específicas
     
+    Cada página × janela de datas é uma unidade de trabalho com retry e
+    backoff: uma falha de navegação não interrompe as demais páginas.
+    
     Args:
-        driver: Selenium WebDriver
+        driver: Selenium WebDriver já carregado no relatório (página 1)
         max_pages: Número máximo de páginas a navegar (para modo 'all')
         mode: 'all' (todas), 'specific' (específicas), 'range' (intervalo)
         target_pages: Lista de páginas a extrair (para modes 'specific' e 'range')
+        start_date / end_date: Datas DD/MM/AAAA aplicadas nos slicers de data
+        target_class / additional_selectors: Ver extract_specific_class_data()
+        date_windows: Lista de (início, fim); substitui start_date/end_date
+        filter_combinations: Lista de {slicer: valor}; cada combinação é extraída separadamente
+        embed_url: URL do relatório para abrir sessões novas (padrão: URL atual)
+        headless: Modo das sessões novas
+        workers: Número de sessões em paralelo (as extras abrem um navegador novo)
+        strategies: Estratégias opcionais por página (ver EXTRACTION_STRATEGIES)
+        sync_groups: Grupos de sincronização dos slicers (ver filter_state)
+        max_retries / unit_timeout / recycle_after: Ver scheduler.run_work_units()
+        queue: URL da fila compartilhada (ver work_queue); as unidades são
+            divididas com as outras máquinas que usam a mesma fila
+        queue_name: Nome da fila (obrigatório com queue; uma fila por extração)
+        reopen_queue: Apaga e reutiliza uma fila já consolidada com o mesmo nome
+        browser_contexts: Sessões extras como contextos isolados do mesmo
+            Chrome (ver browser_pool) em vez de um navegador por sessão
+        memory_limits: Limites de memória por sessão (ver memory_watchdog.new_watchdog)
+        timing: Perfil de tempos compartilhado pelas sessões (ver timings)
+        artifact_store: artifacts.ArtifactStore; captura screenshot/HTML das
+            unidades com falha (conforme o modo)
     """
+    max_retries, unit_timeout, recycle_after = resolve(max_retries), resolve(unit_timeout), resolve(recycle_after)
     print("\n" + "="*70)
     if mode == 'all':
         print("  EXTRAÇÃO DE TODAS AS PÁGINAS")
@@ -699,120 +1181,91 @@ def extract_all_pages_data(driver, max_pages=10, mode='all', target_pages=None):
         print(f"  EXTRAÇÃO DE INTERVALO: páginas {min(target_pages)} a {max(target_pages)}")
     print("="*70)
     
-    all_data = {
-        'pages': [],
-        'total_tables': 0,
-        'total_cards': 0,
-        'total_charts': 0,
-        'mode': mode,
-        'target_pages': target_pages
-    }
+    if date_windows is None:
+        date_windows = [(start_date, end_date)]
+    units = build_work_units(max_pages=max_pages, mode=mode, target_pages=target_pages,
+                             date_windows=date_windows, filter_combinations=filter_combinations)
     
-    page_count = 1
+    embed_url = embed_url or driver.current_url
+    initial_session = {'driver': driver, 'embed_url': embed_url, 'page': 1, 'owned': False, 'dirty': False,
+                       'network': network_observer.NetworkObserver(driver), 'timing': timing}
     
-    while page_count <= max_pages:
-        print(f"\n{'='*70}")
-        print(f"  PÁGINA {page_count}")
-        print(f"{'='*70}")
-        
-        # Verifica se deve extrair esta página
-        should_extract = False
-        
-        if mode == 'all':
-            should_extract = True
-        elif mode in ['specific', 'range'] and target_pages:
-            should_extract = page_count in target_pages
-        
-        if should_extract:
-            print("  ✓ Extraindo dados desta página...")
-            select_date_in_powerbi_calendar(driver, target_date="01/10/2021", date_type="início")
-
-            # Extrai dados da página atual
-            page_data = extract_specific_class_data(driver, target_class='column setFocusRing')
-            
-            if page_data:
-                page_data['page_number'] = page_count
-                all_data['pages'].append(page_data)
-                
-                all_data['total_tables'] += len(page_data.get('tables', []))
-                all_data['total_cards'] += len(page_data.get('cards', []))
-                all_data['total_charts'] += len(page_data.get('charts', []))
-        else:
-            print("  ⊘ Pulando esta página (não selecionada)")
-        
-        # Verifica se deve continuar navegando
-        should_continue = False
-        
-        if mode == 'all' and page_count < max_pages:
-            should_continue = True
-        elif mode in ['specific', 'range'] and target_pages:
-            # Continua se ainda há páginas a extrair
-            remaining_pages = [p for p in target_pages if p > page_count]
-            if remaining_pages:
-                should_continue = True
-                next_target = min(remaining_pages)
-                print(f"\n  ℹ️  Próxima página alvo: {next_target}")
-        
-        # Tenta ir para próxima página
-        if should_continue:
-            print(f"\n➡️  Tentando navegar para página {page_count + 1}...")
-            
-            try:
-                # Procura pelo botão de próxima página
-                next_button_selectors = [
-                    "//button[@aria-label='Próxima Página' and @aria-disabled='false']",
-                    "//button[contains(@aria-label, 'Próxima') and @aria-disabled='false']",
-                    "//button[@aria-label='Next Page' and @aria-disabled='false']",
-                ]
-                
-                next_button = None
-                for selector in next_button_selectors:
-                    try:
-                        next_button = WebDriverWait(driver, 3).until(
-                            EC.element_to_be_clickable((By.XPATH, selector))
-                        )
-                        if next_button:
-                            break
-                    except:
-                        continue
-                
-                if not next_button:
-                    print("  ✓ Última página alcançada (botão não encontrado)")
-                    break
-                
-                # Scroll até o botão
-                driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", next_button)
-                time.sleep(0.5)
-                
-                # Clica no botão
-                try:
-                    next_button.click()
-                except:
-                    driver.execute_script("arguments[0].click();", next_button)
-                
-                print(f"  ✓ Navegado para página {page_count + 1}")
-                
-                # Aguarda a nova página carregar
-                print("  ⏳ Aguardando nova página carregar...")
-                time.sleep(5)  # Aguarda 5 segundos para conteúdo carregar
-                
-                # Aguarda elementos visuais carregarem
-                try:
-                    WebDriverWait(driver, 15).until(
-                        EC.presence_of_element_located((By.CSS_SELECTOR, "[class*='visual'], svg, table"))
-                    )
-                except:
-                    print("  ⚠️  Timeout aguardando elementos visuais")
-                
-                page_count += 1
-                
-            except Exception as e:
-                print(f"  ✗ Não foi possível navegar: {e}")
-                print("  ✓ Finalizando extração")
-                break
-        else:
-            print(f"\n  ⚠️  Limite de {max_pages} páginas alcançado")
-            break
+    factory_lock = threading.Lock()
+    pool = browser_pool.BrowserPool(driver) if browser_contexts and workers > 1 else None
+    
+    def session_factory():
+        # A primeira sessão reaproveita o navegador já aberto pelo chamador
+        with factory_lock:
+            reuse = initial_session.get('available', True)
+            initial_session['available'] = False
+        if reuse:
+            return initial_session
+        if pool is not None:
+            print("\n🆕 Abrindo novo contexto no navegador...")
+            return open_context_session(pool, embed_url, timing=timing)
+        print("\n🆕 Abrindo nova sessão do navegador...")
+        return open_powerbi_session(embed_url, headless=headless, timing=timing)
+    
+    def execute_unit(session, unit):
+        try:
+            return extract_page_unit(session, unit, target_class=target_class,
+                                     additional_selectors=additional_selectors,
+                                     strategies=strategies, sync_groups=sync_groups,
+                                     memory_limits=memory_limits)
+        except scheduler.LastPageReached:
+            raise
+        except Exception:
+            if artifact_store is not None:
+                artifact_store.capture(session['driver'], f"unit_p{unit['page']}_attempt{unit['attempts'] + 1}",
+                                       failure=True)
+            raise
+    
+    if queue:
+        backend = open_extraction_queue(queue, queue_name, reopen_queue)
+        added = work_queue.enqueue_units(backend, queue_name, units, metadata={
+            'mode': mode, 'target_pages': target_pages, 'embed_url': embed_url,
+        })
+        print(f"\n📬 Fila '{queue_name}': {added} unidade(s) nova(s) de {len(units)}")
+        
+        worker_id = work_queue.default_worker_id()
+        counts = work_queue.run_queue_worker(
+            backend, queue_name,
+            session_factory=session_factory,
+            execute_unit=execute_unit,
+            close_session=close_powerbi_session,
+            workers=workers,
+            worker_id=worker_id,
+            max_retries=max_retries,
+            unit_timeout=unit_timeout,
+            recycle_after=recycle_after,
+        )
+        if pool is not None:
+            pool.close()
+        print(f"  ✓ Este worker: {counts['done']} concluída(s), {counts['failed']} com falha, "
+              f"{counts['retried']} reenfileirada(s), {counts['skipped']} além da última página")
+        
+        # A fila esvaziou; só a primeira máquina a chegar aqui consolida o resultado
+        if not backend.set_meta_if_absent(queue_name, 'merged_by', worker_id):
+            print(f"  ℹ️  Resultado consolidado por {backend.get_meta(queue_name, 'merged_by')}")
+            all_data = build_all_pages_data([], mode=mode, target_pages=target_pages)
+            all_data['queue_status'] = backend.stats(queue_name)
+            return all_data
+        results, failed = work_queue.collect_results(backend, queue_name)
+    else:
+        results, failed = scheduler.run_work_units(
+            units,
+            session_factory=session_factory,
+            execute_unit=execute_unit,
+            close_session=close_powerbi_session,
+            workers=workers,
+            max_retries=max_retries,
+            unit_timeout=unit_timeout,
+            recycle_after=recycle_after,
+        )
+        if pool is not None:
+            pool.close()
+    
+    all_data = build_all_pages_data(results, mode=mode, target_pages=target_pages, failed_units=failed)
     
     print(f"\n{'='*70}")
     print(f"  RESUMO DA EXTRAÇÃO")
@@ -829,26 +1282,49 @@ def extract_all_pages_data(driver, max_pages=10, mode='all', target_pages=None):
     if all_data['pages']:
         extracted_pages = [p['page_number'] for p in all_data['pages']]
         print(f"  • Páginas extraídas: {', '.join(map(str, extracted_pages))}")
+    if failed:
+        print(f"  • Unidades com falha: {len(failed)} ({', '.join(str(u['page']) for u in failed)})")
     print(f"  • Total de tabelas: {all_data['total_tables']}")
     print(f"  • Total de cards/KPIs: {all_data['total_cards']}")
     print(f"  • Total de gráficos: {all_data['total_charts']}")
+    if pool is not None and pool.recycled:
+        print(f"  • Contextos do navegador reciclados: {pool.recycled}")
     
     return all_data
 
 
-def save_data(data, prefix="powerbi", output_folder="."):
-    """Salva os dados extraídos em diferentes formatos - suporta múltiplas páginas e estrutura por séries"""
+def save_data(data, prefix="powerbi", output_folder=".", json_format='json', json_compression=None,
+              store_path=None, source_url=None, writer_workers=DEFAULT_WRITER_WORKERS):
+    """
+    Salva os dados extraídos em diferentes formatos - suporta múltiplas páginas e estrutura por séries
+    
+    Args:
+        data: Resultado de extract_all_pages_data()
+        prefix: Prefixo dos arquivos gerados
+        output_folder: Pasta de destino
+        json_format: 'json' (documento único) ou 'jsonl' (compacto, uma série por linha)
+        json_compression: None, 'gzip' ou 'zstd' para o arquivo JSON completo
+        store_path: Caminho do banco SQLite local (None desativa o armazenamento)
+        source_url: URL de origem registrada nos metadados da execução
+        writer_workers: Arquivos gravados em paralelo (ver writers); o
+            manifesto {prefix}_manifest.json registra o estado de cada um
+    """
+    writer_workers = resolve(writer_workers)
     print(f"\n💾 Salvando dados...")
     
     saved_files = []
     main_dataframe = None  # DataFrame principal consolidado
+    pool = writers.WriterPool(os.path.join(output_folder, writers.manifest_filename(prefix)), workers=writer_workers)
+    
+    def write_csv(df):
+        return lambda path: df.to_csv(path, index=False, encoding='utf-8-sig')
     
     # 1. JSON completo
-    json_file = os.path.join(output_folder, f"{prefix}_data_complete.json")
-    with open(json_file, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
-    print(f"✓ {json_file}")
-    saved_files.append(json_file)
+    json_file = os.path.join(output_folder, json_export.output_filename(prefix, json_format, json_compression))
+    pool.submit(json_file, json_format,
+                lambda path: json_export.save_complete_json(data, output_folder=output_folder, prefix=prefix,
+                                                            json_format=json_format, compression=json_compression),
+                detail=f"backend: {json_export.json_backend_name()}")
     
     # Se for estrutura de múltiplas páginas
     if 'pages' in data:
@@ -857,8 +1333,31 @@ def save_data(data, prefix="powerbi", output_folder="."):
         all_series_data = []
         consolidated_elements = []
         
+        # Com várias janelas de datas a mesma página aparece mais de uma vez
+        windows = {tuple(page['date_window']) for page in data['pages'] if page.get('date_window')}
+        
         for page in data['pages']:
             page_num = page.get('page_number', 'unknown')
+            page_tag = f"page{page_num}"
+            if len(windows) > 1 and page.get('date_window'):
+                page_tag += "_" + "_".join((d or '').replace('/', '') for d in page['date_window'])
+            if page.get('filters'):
+                page_tag += "_" + slicers.filter_tag(page['filters'])
+            filter_values = slicers.filter_columns(page.get('filters'))
+            
+            # Dados completos dos visuais (estratégia 'show_data')
+            for table in page.get('visual_tables', []):
+                try:
+                    df_visual = show_data.visual_table_frame(table)
+                    df_visual.insert(0, 'Página', page_num)
+                    safe_title = "".join(c for c in table.get('title', '') if c.isalnum() or c in (' ', '-', '_')).strip()
+                    safe_title = safe_title.replace(' ', '_')[:50]
+                    csv_file = os.path.join(output_folder,
+                                            f"{prefix}_{page_tag}_visual_{table['visual_index']}_{safe_title}.csv")
+                    pool.submit(csv_file, 'csv', write_csv(df_visual), rows=df_visual.shape[0],
+                                detail=f"{df_visual.shape[0]} linhas ({table['source']})")
+                except Exception as e:
+                    print(f"⚠️  Erro ao salvar dados do visual {table.get('visual_index')} da página {page_num}: {e}")
             
             # Verifica se a página tem estrutura por séries
             if 'series' in page:
@@ -883,8 +1382,13 @@ def save_data(data, prefix="powerbi", output_folder="."):
                                 'Element_Index': element.get('element_index', ''),
                                 'Element_Aria_Label': element.get('aria_label', ''),
                                 'Text_Content': element.get('text_content', ''),
-                                'Inner_Text': element.get('inner_text', '')
+                                'Inner_Text': element.get('inner_text', ''),
+                                'Tooltip': tooltips.tooltip_text(element.get('tooltip')),
+                                'Valor_Geometria': element.get('geometry_value'),
+                                'Categoria_Geometria': element.get('geometry_category'),
+                                'Precisao_Geometria': element.get('geometry_precision')
                             }
+                            row.update(filter_values)
                             series_data.append(row)
                             consolidated_elements.append(row)
                         
@@ -895,10 +1399,9 @@ def save_data(data, prefix="powerbi", output_folder="."):
                             safe_series_name = "".join(c for c in series_label if c.isalnum() or c in (' ', '-', '_')).rstrip()
                             safe_series_name = safe_series_name.replace(' ', '_')[:50]  # Limita tamanho
                             
-                            csv_file = os.path.join(output_folder, f"{prefix}_page{page_num}_serie_{series_idx}_{safe_series_name}.csv")
-                            df_series.to_csv(csv_file, index=False, encoding='utf-8-sig')
-                            print(f"    ✓ {os.path.basename(csv_file)} - {df_series.shape[0]} elementos")
-                            saved_files.append(csv_file)
+                            csv_file = os.path.join(output_folder, f"{prefix}_{page_tag}_serie_{series_idx}_{safe_series_name}.csv")
+                            pool.submit(csv_file, 'csv', write_csv(df_series), rows=df_series.shape[0],
+                                        detail=f"{df_series.shape[0]} elementos")
                             
                             all_series_data.append(df_series)
             
@@ -914,10 +1417,9 @@ def save_data(data, prefix="powerbi", output_folder="."):
                                 df = pd.DataFrame(table['rows'])
                             
                             df.insert(0, 'Página', page_num)
-                            csv_file = os.path.join(output_folder, f"{prefix}_page{page_num}_table_{i+1}.csv")
-                            df.to_csv(csv_file, index=False, encoding='utf-8-sig')
-                            print(f"✓ {csv_file} - {df.shape[0]} linhas × {df.shape[1]} colunas")
-                            saved_files.append(csv_file)
+                            csv_file = os.path.join(output_folder, f"{prefix}_{page_tag}_table_{i+1}.csv")
+                            pool.submit(csv_file, 'csv', write_csv(df), rows=df.shape[0],
+                                        detail=f"{df.shape[0]} linhas × {df.shape[1]} colunas")
                         except Exception as e:
                             print(f"⚠️  Erro ao salvar tabela {i+1} da página {page_num}: {e}")
         
@@ -925,74 +1427,57 @@ def save_data(data, prefix="powerbi", output_folder="."):
         if consolidated_elements:
             try:
                 consolidated_df = pd.DataFrame(consolidated_elements)
+                value_parsing.add_point_columns(consolidated_df)
+                # Lacunas do aria-label: primeiro o tooltip (exato), depois a geometria (aproximada)
+                tooltips.fill_missing_points(consolidated_df)
+                geometry.fill_missing_points(consolidated_df)
                 main_dataframe = consolidated_df
                 
                 consolidated_file = os.path.join(output_folder, f"{prefix}_ALL_SERIES_CONSOLIDATED.csv")
-                consolidated_df.to_csv(consolidated_file, index=False, encoding='utf-8-sig')
-                print(f"\n✓ {consolidated_file} - {consolidated_df.shape[0]} elementos × {consolidated_df.shape[1]} colunas")
-                print("  (Todos os elementos de todas as séries de todas as páginas)")
-                saved_files.append(consolidated_file)
-                
-                # Mostra preview consolidado
-                print("\n" + "="*80)
-                print("Preview dos Dados Consolidados por Série:")
-                print("="*80)
-                # Mostra apenas algumas colunas essenciais para caber na tela
-                display_columns = ['Página', 'Serie_Label', 'Element_Aria_Label', 'Text_Content']
-                available_columns = [col for col in display_columns if col in consolidated_df.columns]
-                print(consolidated_df[available_columns].head(10).to_string())
-                print("="*80 + "\n")
+                pool.submit(consolidated_file, 'csv', write_csv(consolidated_df), rows=consolidated_df.shape[0],
+                            detail=f"{consolidated_df.shape[0]} elementos × {consolidated_df.shape[1]} colunas "
+                                   f"(todas as séries de todas as páginas)")
                 
-                # Estatísticas por série
-                print("📊 Estatísticas por Série:")
-                series_stats = consolidated_df.groupby(['Serie_Label']).agg({
-                    'Text_Content': 'count',
-                    'Element_Aria_Label': lambda x: sum(1 for val in x if val.strip())
-                }).rename(columns={
-                    'Text_Content': 'Total_Elementos',
-                    'Element_Aria_Label': 'Elementos_com_Aria_Label'
-                })
-                print(series_stats.to_string())
+                # Prévia e estatísticas por série: calculadas só com as prévias ligadas
+                log.preview(lambda: consolidated_preview(consolidated_df))
                 
             except Exception as e:
                 print(f"⚠️  Erro ao consolidar dados das séries: {e}")
         
-        # 4. DataFrame consolidado em Pickle (para uso em Python/Pandas)
-        if main_dataframe is not None:
+        # 4. Banco local com upsert idempotente (consultas indexadas por série e data)
+        if main_dataframe is not None and store_path:
             try:
-                pickle_file = os.path.join(output_folder, f"{prefix}_dataframe.pkl")
-                main_dataframe.to_pickle(pickle_file)
-                print(f"\n✓ {pickle_file} - DataFrame salvo em formato Pickle")
-                print(f"  💡 Para carregar: df = pd.read_pickle('{pickle_file}')")
-                saved_files.append(pickle_file)
+                result = store.save_dataframe(
+                    main_dataframe, db_path=store_path, source_url=source_url,
+                    mode=data.get('mode'), target_pages=data.get('target_pages'),
+                    metadata={'prefix': prefix, 'output_folder': os.path.abspath(output_folder)},
+                    dimensions={'dashboard': prefix}
+                )
+                print(f"\n✓ {store_path} - {result['written']} observações gravadas (execução {result['run_id']})")
+                if result['skipped']:
+                    print(f"  ⚠️  {result['skipped']} elemento(s) sem data identificável não foram gravados no banco")
+                saved_files.append(store_path)
+                
+                # Agregados por hora/dia/mês/ano: só as partições tocadas por esta execução
+                refreshed = rollups.refresh_rollups(store_path, run_id=result['run_id'])
+                print(f"  ✓ Agregados: {refreshed['rows']} linha(s) por série e {refreshed['dimension_rows']} "
+                      f"por dimensão em {refreshed['partitions']} partição(ões)")
             except Exception as e:
-                print(f"⚠️  Erro ao salvar DataFrame pickle: {e}")
+                print(f"⚠️  Erro ao gravar no banco local: {e}")
         
-        # 5. DataFrame consolidado em Excel
+        # 5. DataFrame consolidado em Pickle (para uso em Python/Pandas)
         if main_dataframe is not None:
-            try:
-                if len(main_dataframe) <= 1000000:  # Limite do Excel
-                    excel_file = os.path.join(output_folder, f"{prefix}_dataframe.xlsx")
-                    
-                    # Cria Excel com múltiplas abas
-                    with pd.ExcelWriter(excel_file, engine='openpyxl') as writer:
-                        # Aba principal com todos os dados
-                        main_dataframe.to_excel(writer, sheet_name='Todos_Dados', index=False)
-                        
-                        # Aba por série (máximo 10 séries para não sobrecarregar)
-                        unique_series = main_dataframe['Serie_Label'].unique()[:10]
-                        for series_label in unique_series:
-                            series_df = main_dataframe[main_dataframe['Serie_Label'] == series_label]
-                            safe_sheet_name = "".join(c for c in series_label if c.isalnum() or c in (' ', '-', '_'))[:31]
-                            series_df.to_excel(writer, sheet_name=safe_sheet_name, index=False)
-                    
-                    print(f"✓ {excel_file} - DataFrame salvo em formato Excel com múltiplas abas")
-                    saved_files.append(excel_file)
-                else:
-                    print(f"⚠️  DataFrame muito grande ({len(main_dataframe)} linhas) para Excel - use CSV ou Pickle")
-            except Exception as e:
-                print(f"⚠️  Erro ao salvar DataFrame Excel: {e}")
-                print(f"   (Instale openpyxl: pip install openpyxl)")
+            pickle_file = os.path.join(output_folder, f"{prefix}_dataframe.pkl")
+            pool.submit(pickle_file, 'pickle', main_dataframe.to_pickle, rows=main_dataframe.shape[0],
+                        detail=f"para carregar: df = pd.read_pickle('{pickle_file}')")
+        
+        # 6. DataFrame consolidado em Excel (escrita em fluxo, uma aba por série)
+        if main_dataframe is not None:
+            excel_file = os.path.join(output_folder, f"{prefix}_dataframe.xlsx")
+            pool.submit(excel_file, 'xlsx',
+                        lambda path: excel_export.export_excel(main_dataframe, path, group_column='Serie_Label'),
+                        rows=main_dataframe.shape[0], detail=f"Excel, uma aba por série "
+                                                             f"({excel_export.excel_engine_name()})")
     
     else:
         # Estrutura de página única - mantém compatibilidade
@@ -1000,7 +1485,7 @@ def save_data(data, prefix="powerbi", output_folder="."):
         # [Código existente para estrutura antiga permanece o mesmo]
         pass
     
-    return saved_files
+    return pool.close() + saved_files
 
 def select_date_in_powerbi_calendar(driver, target_date="01/10/2021", date_type="início"):
     """
@@ -1135,95 +1620,208 @@ def select_date_in_powerbi_calendar(driver, target_date="01/10/2021", date_type=
         return False
 
 
-def main():
-    """Função principal"""
-    print("="*70)
-    print("  EXTRATOR DE DADOS - POWER BI ONS (VIA PÁGINA ONS)")
-    print("="*70)
+def apply_date_filters(driver, start_date=None, end_date=None, state=None):
+    """
+    Aplica as datas de início e/ou fim nos slicers de data do Power BI
+    Retorna True se todas as datas informadas foram aplicadas
+    
+    Com state (ver filter_state), lê antes o valor atual dos campos e só
+    reaplica a data que difere da pedida.
+    """
+    inputs = None
+    if state is not None and (start_date or end_date):
+        inputs = filter_state.read_date_inputs(driver)
+    
+    ok = True
+    for target_date, date_type in ((start_date, "início"), (end_date, "fim")):
+        if not target_date:
+            continue
+        if state is not None and filter_state.date_is_current(driver, state, date_type, target_date, inputs=inputs):
+            print(f"  ✓ Data de {date_type} já é {target_date} (slicer não reaplicado)")
+            continue
+        applied = select_date_in_powerbi_calendar(driver, target_date=target_date, date_type=date_type)
+        if state is not None:
+            if applied:
+                filter_state.record(state, date_type, target_date)
+            else:
+                filter_state.forget(state, date_type)
+        ok = applied and ok
+    return ok
+
+
+def run_extraction(page_url=PAGE_URL, embed_url=None, mode='all', target_pages=None,
+                   start_date="01/10/2021", end_date=None, max_pages=20,
+                   target_class='column setFocusRing', additional_selectors=None,
+                   output_folder=None, prefix="ons_powerbi",
+                   store_path=DEFAULT_STORE_PATH, headless=False,
+                   window_days=None, workers=1, incremental=False,
+                   json_format='json', json_compression=None, strategies=(), slicer_filters=None,
+                   sync_groups=None, max_retries=DEFAULT_MAX_RETRIES,
+                   unit_timeout=DEFAULT_UNIT_TIMEOUT, queue=None,
+                   queue_name=None, reopen_queue=False, browser_contexts=False,
+                   memory_limits=None, timings_path=DEFAULT_TIMINGS_PATH, timeout_margin=DEFAULT_TIMEOUT_MARGIN,
+                   artifact_mode=DEFAULT_ARTIFACT_MODE, artifact_options=None,
+                   writer_workers=DEFAULT_WRITER_WORKERS, interactive=False):
+    """
+    Executa uma extração completa: localiza o Power BI, aplica filtros,
+    extrai as páginas e salva os resultados
+    
+    Args:
+        page_url: Página da ONS que contém o iframe do Power BI
+        embed_url: URL do Power BI (se informada, dispensa a busca do iframe)
+        mode: 'all', 'specific' ou 'range'
+        target_pages: Lista de páginas para os modos 'specific' e 'range'
+        start_date / end_date: Datas DD/MM/AAAA aplicadas nos slicers de data
+        max_pages: Número máximo de páginas a navegar
+        target_class / additional_selectors: Ver extract_specific_class_data()
+        output_folder: Pasta de saída (padrão: create_output_folder())
+        prefix: Prefixo dos arquivos gerados
+        store_path: Banco SQLite local (None desativa)
+        headless: Executa o Chrome sem interface
+        window_days: Divide o intervalo de datas em janelas de N dias
+        workers: Número de sessões do navegador em paralelo
+        incremental: Começa na data mais recente já gravada no banco local
+        json_format / json_compression: Ver save_data()
+        strategies: Estratégias opcionais por página (ver EXTRACTION_STRATEGIES)
+        slicer_filters: {slicer: 'all' | [valores]}; extrai cada combinação (ver slicers)
+        sync_groups: {filtro: grupo} dos slicers sincronizados entre páginas (ver filter_state)
+        max_retries / unit_timeout: Ver scheduler.run_work_units()
+        queue / queue_name: Fila compartilhada entre máquinas (ver work_queue);
+            o nome é obrigatório e identifica a extração
+        reopen_queue: Reutiliza uma fila já consolidada (ver open_extraction_queue)
+        browser_contexts: Sessões paralelas como contextos do mesmo Chrome (ver browser_pool)
+        memory_limits: {max_heap_mb, max_rss_mb, growth_factor} do vigia de memória
+        timings_path: Histórico dos tempos de carregamento usado nos timeouts
+            adaptativos (None usa os timeouts fixos)
+        timeout_margin: Multiplicador do p99 dos tempos observados (ver timings)
+        artifact_mode: Screenshots/HTML de diagnóstico: 'always', 'on-failure',
+            'sampled' ou 'off' (ver artifacts)
+        artifact_options: {folder, sample_rate, max_mb, max_age_days} dos artefatos
+        writer_workers: Arquivos de saída gravados em paralelo (ver save_data)
+        interactive: Pergunta as páginas no terminal (ignora mode/target_pages);
+            só a linha de comando com --interactive liga
+    
+    Returns:
+        Dict com 'data', 'saved_files', 'output_folder', 'embed_url' e
+        'timings' (timings.report), ou None se a extração não pôde ser feita
+    """
+    store_path, timings_path = resolve(store_path), resolve(timings_path)
+    timeout_margin, artifact_mode = resolve(timeout_margin), resolve(artifact_mode)
+    if output_folder is None:
+        output_folder = create_output_folder()
+    elif not os.path.exists(output_folder):
+        os.makedirs(output_folder)
     
-    # Cria pasta para salvar os arquivos
-    output_folder = create_output_folder()
+    if incremental and store_path:
+        latest = store.latest_observation_date(store_path, dimensions={'dashboard': prefix})
+        if latest:
+            print(f"\n♻️  Modo incremental: última data gravada {latest}")
+            start_date = latest
+    
+    date_windows = None
+    if window_days:
+        window_end = end_date or datetime.now().strftime("%d/%m/%Y")
+        date_windows = scheduler.split_date_range(start_date, window_end, window_days)
+        print(f"\n🗓️  {len(date_windows)} janela(s) de até {window_days} dia(s)")
+    
+    if queue:
+        # Valida a fila antes de abrir o Chrome
+        open_extraction_queue(queue, queue_name, reopen_queue)
+    
+    # Também validado antes do Chrome: um modo inválido não deixa o navegador aberto
+    artifact_store = artifacts.ArtifactStore(mode=artifact_mode, run_label=os.path.basename(output_folder),
+                                             **(artifact_options or {}))
     
     # Setup
-    driver = setup_driver()
+    driver = setup_driver(headless=headless)
     if not driver:
-        return
+        return None
     
+    timing = None
     try:
-        # Acessa a página da ONS primeiro
-        print(f"\n🌐 Acessando página da ONS...")
-        print(f"URL: {PAGE_URL}")
-        
-        driver.get(PAGE_URL)
-        
-        # Aguarda a página da ONS carregar
-        print("⏳ Aguardando página da ONS carregar...")
-        time.sleep(5)
+        powerbi_url = embed_url
         
-        # Procura pelo iframe do Power BI
-        powerbi_url = find_powerbi_iframe(driver)
+        if not powerbi_url:
+            # Tenta primeiro o HTML estático (HTTP + cache), sem carregar a página no Chrome
+            print(f"\n🔍 Procurando URL do Power BI via HTTP...")
+            try:
+                powerbi_url = discovery.discover_embed_url(page_url)
+            except Exception as e:
+                print(f"  ⚠️  Erro na descoberta via HTTP: {e}")
         
         if not powerbi_url:
-            print("\n❌ Power BI não encontrado na página da ONS!")
-            print("\n🔍 Salvando screenshot e HTML para diagnóstico...")
+            # Fallback: acessa a página da ONS no navegador
+            print(f"\n🌐 Acessando página da ONS...")
+            print(f"URL: {page_url}")
             
-            # Salva screenshot para diagnóstico
-            debug_screenshot = os.path.join(output_folder, "debug_ons_page.png")
-            driver.save_screenshot(debug_screenshot)
-            print(f"📸 Screenshot: {debug_screenshot}")
+            driver.get(page_url)
             
-            # Salva HTML para diagnóstico
-            debug_html = os.path.join(output_folder, "debug_ons_page.html")
-            with open(debug_html, 'w', encoding='utf-8') as f:
-                f.write(driver.page_source)
-            print(f"📄 HTML: {debug_html}")
+            # Aguarda a página da ONS carregar
+            print("⏳ Aguardando página da ONS carregar...")
+            time.sleep(5)
             
-            print("\n💡 Verifique os arquivos de diagnóstico para entender a estrutura da página")
-            return
+            # Procura pelo iframe do Power BI
+            powerbi_url = find_powerbi_iframe(driver)
+            try:
+                discovery.remember_embed_url(page_url, powerbi_url)
+            except OSError as e:
+                print(f"  ⚠️  Não foi possível gravar o cache de URLs ({e})")
+        
+        if not powerbi_url:
+            print("\n❌ Power BI não encontrado na página da ONS!")
+            if artifact_store.capture(driver, 'debug_ons_page', failure=True):
+                print(f"\n💡 Screenshot e HTML de diagnóstico em {artifact_store.folder} "
+                      f"(index.jsonl lista as capturas)")
+            return None
         
         # Acessa o Power BI encontrado
         print(f"\n🌐 Acessando Power BI encontrado...")
         print(f"URL: {powerbi_url[:80]}...")
         
+        if timings_path:
+            timing = timings.new_profile(powerbi_url, path=timings_path, margin=timeout_margin)
+        
         driver.get(powerbi_url)
         
         # Aguarda carregar
-        wait_for_powerbi_load(driver, timeout=60)
+        wait_for_powerbi_load(driver, timeout=60, timing=timing)
         
         print("\n" + "="*70)
         print("  CONFIGURANDO FILTROS DE DATA")
         print("="*70)
         
-        # Seleciona data de início
-        if select_date_in_powerbi_calendar(driver, target_date="01/10/2021", date_type="início"):
-            print("✅ Data de início configurada!")
+        # Seleciona datas de início/fim
+        if apply_date_filters(driver, start_date=start_date, end_date=end_date):
+            print("✅ Filtros de data configurados!")
             
             # Aguarda o dashboard atualizar após mudança de filtro
             print("⏳ Aguardando dashboard atualizar...")
             time.sleep(5)
             
             # Aguarda novamente o carregamento após filtro
-            wait_for_powerbi_load(driver, timeout=30)
+            wait_for_powerbi_load(driver, timeout=30, timing=timing, phase='filter_refresh')
         else:
-            print("⚠️  Falha ao configurar data de início, continuando mesmo assim...")
+            print("⚠️  Falha ao configurar filtros de data, continuando mesmo assim...")
         
-        # Salva screenshot da primeira página (APÓS configurar filtros)
-        screenshot_file = os.path.join(output_folder, "powerbi_screenshot_page1.png")
-        driver.save_screenshot(screenshot_file)
-        print(f"\n📸 Screenshot salvo: {screenshot_file}")
+        # Screenshot e HTML da primeira página (APÓS configurar filtros), gravados em segundo plano
+        artifact_store.capture(driver, 'page1')
         
-        # Salva HTML completo
-        html_file = os.path.join(output_folder, "powerbi_page_source.html")
-        with open(html_file, 'w', encoding='utf-8') as f:
-            f.write(driver.page_source)
-        print(f"📄 HTML salvo: {html_file}")
+        filter_combinations = None
+        if slicer_filters:
+            print("\n🎛️  Listando slicers do relatório...")
+            found = slicers.discover_slicers(driver)
+            for slicer in found:
+                print(f"  • {slicer['title']} ({slicer['kind']}): {len(slicer['values'])} valor(es)")
+            filter_combinations = slicers.build_filter_combinations(found, slicer_filters)
+            print(f"  ✓ {len(filter_combinations)} combinação(ões) de filtros")
         
-        # Solicita seleção de páginas ao usuário
-        mode, target_pages = get_user_page_selection()
+        # Solicita seleção de páginas ao usuário (apenas no modo interativo)
+        if interactive:
+            mode, target_pages = get_user_page_selection()
         
         if mode is None:
             print("\n❌ Extração cancelada.")
-            return
+            return None
         
         # Extrai dados das páginas selecionadas
         print("\n" + "="*70)
@@ -1235,36 +1833,353 @@ def main():
         print("  3. Salvar os dados extraídos")
         print("="*70)
 
-        data = extract_all_pages_data(driver, max_pages=20, mode=mode, target_pages=target_pages)
+        data = extract_all_pages_data(
+            driver, max_pages=max_pages, mode=mode, target_pages=target_pages,
+            start_date=start_date, end_date=end_date,
+            target_class=target_class, additional_selectors=additional_selectors,
+            date_windows=date_windows, filter_combinations=filter_combinations,
+            embed_url=powerbi_url, headless=headless, sync_groups=sync_groups,
+            workers=workers, strategies=strategies, max_retries=max_retries, unit_timeout=unit_timeout,
+            queue=queue, queue_name=queue_name, browser_contexts=browser_contexts,
+            memory_limits=memory_limits, timing=timing, artifact_store=artifact_store
+        )
         
+        saved_files = []
         if data and data.get('pages'):
-            # Salva screenshot da última página
-            last_page = len(data['pages'])
-            screenshot_file = os.path.join(output_folder, f"powerbi_screenshot_page{last_page}.png")
-            driver.save_screenshot(screenshot_file)
-            print(f"\n📸 Screenshot da última página salvo: {screenshot_file}")
+            # Screenshot da última página (o driver do chamador é o único ainda aberto)
+            artifact_store.capture(driver, f"page{len(data['pages'])}", html=False)
             
             # Salva resultados
-            saved_files = save_data(data, prefix="ons_powerbi", output_folder=output_folder)
-            
-            print("\n" + "="*70)
-            print("✅ EXTRAÇÃO CONCLUÍDA COM SUCESSO!")
-            print("="*70)
-            print(f"\n📊 Estatísticas:")
-            print(f"  • Páginas processadas: {len(data['pages'])}")
-            print(f"  • Total de tabelas: {data['total_tables']}")
-            print(f"  • Total de cards/KPIs: {data['total_cards']}")
-            print(f"  • Total de gráficos: {data['total_charts']}")
-            print(f"\n📁 Pasta de saída: {os.path.abspath(output_folder)}")
-            print(f"\n📁 Arquivos gerados ({len(saved_files)}):")
-            for f in saved_files:
-                file_size = os.path.getsize(f) / 1024  # KB
-                filename = os.path.basename(f)
-                print(f"  📄 {filename} ({file_size:.1f} KB)")
-            
+            saved_files = save_data(data, prefix=prefix, output_folder=output_folder,
+                                    json_format=json_format, json_compression=json_compression,
+                                    store_path=store_path, source_url=powerbi_url,
+                                    writer_workers=writer_workers)
+        elif not (data and data.get('queue_status')):
+            artifact_store.capture(driver, 'no_data', failure=True)
+        
+        return {
+            'data': data,
+            'saved_files': saved_files,
+            'output_folder': output_folder,
+            'embed_url': powerbi_url,
+            'timings': timings.report(timing),
+        }
+        
+    finally:
+        try:
+            timings.save(timing)
+        except OSError as e:
+            print(f"⚠️  Não foi possível gravar o histórico de tempos: {e}")
+        
+        print("\n🔒 Fechando navegador...")
+        try:
+            driver.quit()
+        except Exception:
+            pass  # o navegador pode já ter sido fechado após um timeout
+        
+        # Espera as gravações de fundo (que não usam mais o driver) e aplica a retenção
+        artifact_stats = artifact_store.close()
+        if artifact_stats['captured']:
+            print(f"📸 Artefatos em {artifact_store.folder}: {artifact_stats['written']} gravado(s), "
+                  f"{artifact_stats['deduplicated']} repetido(s), {artifact_stats['removed']} removido(s) "
+                  f"pela retenção")
+
+
+def merge_queue_results(queue, queue_name, output_folder=None,
+                        prefix="ons_powerbi", store_path=DEFAULT_STORE_PATH,
+                        json_format='json', json_compression=None, writer_workers=DEFAULT_WRITER_WORKERS):
+    """
+    Consolida e salva os resultados gravados na fila, sem abrir o navegador
+    
+    Útil quando o worker que esvaziou a fila caiu antes de salvar, ou para
+    salvar um resultado parcial enquanto as máquinas ainda trabalham.
+    
+    Returns:
+        Dict no formato de run_extraction()
+    """
+    store_path = resolve(store_path)
+    if output_folder is None:
+        output_folder = create_output_folder()
+    elif not os.path.exists(output_folder):
+        os.makedirs(output_folder)
+    
+    backend = work_queue.open_backend(queue)
+    stats = backend.stats(queue_name)
+    print(f"\n📬 Fila '{queue_name}': " + (", ".join(f"{k}={v}" for k, v in sorted(stats.items())) or "vazia"))
+    if not work_queue.is_drained(backend, queue_name):
+        print("  ⚠️  Ainda há unidades pendentes ou em andamento: o resultado será parcial")
+    
+    results, failed = work_queue.collect_results(backend, queue_name)
+    data = build_all_pages_data(results, mode=backend.get_meta(queue_name, 'mode') or 'all',
+                                target_pages=backend.get_meta(queue_name, 'target_pages'),
+                                failed_units=failed)
+    embed_url = backend.get_meta(queue_name, 'embed_url')
+    
+    saved_files = []
+    if data['pages']:
+        saved_files = save_data(data, prefix=prefix, output_folder=output_folder,
+                                json_format=json_format, json_compression=json_compression,
+                                store_path=store_path, source_url=embed_url, writer_workers=writer_workers)
+    
+    return {
+        'data': data,
+        'saved_files': saved_files,
+        'output_folder': output_folder,
+        'embed_url': embed_url,
+    }
+
+
+def build_arg_parser():
+    """Argumentos de linha de comando do extrator"""
+    parser = argparse.ArgumentParser(
+        description="Extrai dados do Power BI da ONS sem interação (use --interactive para o menu)"
+    )
+    parser.add_argument('--page-url', default=PAGE_URL, help="Página da ONS que contém o Power BI")
+    parser.add_argument('--embed-url', help="URL do Power BI (dispensa a busca do iframe)")
+    parser.add_argument('--pages', default='all', help="'all', lista ou intervalos (ex.: 1,3,5-7)")
+    parser.add_argument('--max-pages', type=int, default=20, help="Máximo de páginas navegadas")
+    parser.add_argument('--start-date', default="01/10/2021", help="Data inicial DD/MM/AAAA")
+    parser.add_argument('--end-date', help="Data final DD/MM/AAAA")
+    parser.add_argument('--window-days', type=int, help="Divide o período em janelas de N dias")
+    parser.add_argument('--format', dest='json_format', choices=['json', 'jsonl'], default='json',
+                        help="Formato do arquivo de dados completo")
+    parser.add_argument('--compression', choices=['gzip', 'zstd'], help="Compressão do arquivo de dados completo")
+    parser.add_argument('--output', help="Pasta de saída")
+    parser.add_argument('--prefix', default="ons_powerbi", help="Prefixo dos arquivos gerados")
+    parser.add_argument('--writer-workers', type=int, default=DEFAULT_WRITER_WORKERS,
+                        help="Arquivos de saída gravados em paralelo")
+    parser.add_argument('--store', default=DEFAULT_STORE_PATH, help="Banco SQLite local")
+    parser.add_argument('--no-store', action='store_true', help="Não grava no banco local")
+    parser.add_argument('--pool-size', type=int, default=1, help="Sessões do navegador em paralelo")
+    parser.add_argument('--browser-contexts', action='store_true',
+                        help="Sessões paralelas como contextos isolados de um único Chrome")
+    parser.add_argument('--max-heap-mb', type=int, default=lazy_attribute('ons_powerbi.memory_watchdog', 'DEFAULT_MAX_HEAP_MB'),
+                        help="Recicla a sessão quando o heap de JavaScript passa deste valor (MB)")
+    parser.add_argument('--max-rss-mb', type=int, default=lazy_attribute('ons_powerbi.memory_watchdog', 'DEFAULT_MAX_RSS_MB'),
+                        help="Recicla a sessão quando o Chrome passa deste RSS (MB, requer psutil)")
+    parser.add_argument('--timings', default=DEFAULT_TIMINGS_PATH,
+                        help="Histórico dos tempos de carregamento usado nos timeouts adaptativos")
+    parser.add_argument('--fixed-timeouts', action='store_true',
+                        help="Usa os timeouts fixos (não lê nem grava o histórico de tempos)")
+    parser.add_argument('--timeout-margin', type=float, default=DEFAULT_TIMEOUT_MARGIN,
+                        help="Multiplicador do p99 dos tempos observados nos timeouts adaptativos")
+    parser.add_argument('--artifacts', dest='artifact_mode', metavar='MODO', default=DEFAULT_ARTIFACT_MODE,
+                        help="Screenshots/HTML de diagnóstico: always (sempre), on-failure (só em falhas, padrão), "
+                             "sampled (amostrados) ou off (nunca)")
+    parser.add_argument('--artifact-dir', default=lazy_attribute('ons_powerbi.artifacts', 'DEFAULT_DIR'),
+                        help="Pasta dos artefatos de diagnóstico")
+    parser.add_argument('--artifact-sample-rate', type=float,
+                        default=lazy_attribute('ons_powerbi.artifacts', 'DEFAULT_SAMPLE_RATE'),
+                        help="Fração das capturas sem falha gravadas no modo 'sampled'")
+    parser.add_argument('--artifact-max-mb', type=int, default=lazy_attribute('ons_powerbi.artifacts', 'DEFAULT_MAX_MB'),
+                        help="Tamanho máximo da pasta de artefatos (MB)")
+    parser.add_argument('--artifact-max-days', type=int, default=lazy_attribute('ons_powerbi.artifacts', 'DEFAULT_MAX_AGE_DAYS'),
+                        help="Idade máxima dos artefatos (dias)")
+    parser.add_argument('--filter', dest='filters', action='append', default=[],
+                        help="Filtro de slicer 'Título=valor1,valor2' ou 'Título=all' (pode repetir)")
+    parser.add_argument('--strategy', dest='strategies', action='append', choices=EXTRACTION_STRATEGIES,
+                        default=[], help="Estratégia de extração adicional (pode repetir)")
+    parser.add_argument('--max-retries', type=int, default=DEFAULT_MAX_RETRIES,
+                        help="Tentativas extras por página")
+    parser.add_argument('--unit-timeout', type=int, default=DEFAULT_UNIT_TIMEOUT,
+                        help="Timeout (s) por página")
+    parser.add_argument('--queue', help="Fila compartilhada entre máquinas (sqlite:///arquivo.sqlite, "
+                                         "redis://host:6379/0)")
+    parser.add_argument('--queue-name', help="Nome da fila, obrigatório com --queue (uma fila por extração, "
+                                              "ex.: curtailment-2024-06-01)")
+    parser.add_argument('--queue-reopen', action='store_true',
+                        help="Apaga e reutiliza uma fila já consolidada com o mesmo nome (só na primeira máquina)")
+    parser.add_argument('--queue-merge', action='store_true',
+                        help="Apenas consolida e salva os resultados da fila, sem abrir o navegador")
+    parser.add_argument('--headless', action='store_true', help="Executa o Chrome sem interface")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Começa na data mais recente já gravada no banco local")
+    parser.add_argument('--interactive', action='store_true', help="Pergunta as páginas no terminal")
+    parser.add_argument('--summary-json', help="Grava o resumo estruturado da execução neste arquivo")
+    parser.add_argument('--log-json', help="Eventos da execução em JSON Lines neste arquivo ('-' = saída padrão)")
+    parser.add_argument('--log-level', metavar='NÍVEL', default='info',
+                        help="Nível mínimo dos eventos registrados: debug, info (padrão), warning ou error")
+    parser.add_argument('--quiet', action='store_true', help="Sem mensagens de progresso (só avisos e erros)")
+    parser.add_argument('--previews', dest='previews', action='store_true', default=None,
+                        help="Mostra as prévias das séries (padrão: só em terminal interativo)")
+    parser.add_argument('--no-previews', dest='previews', action='store_false', help="Não mostra prévias")
+    parser.add_argument('--rebuild-rollups', action='store_true',
+                        help="Recalcula todos os agregados do banco local e sai (sem navegador)")
+    parser.add_argument('--status', action='store_true',
+                        help="Lista as execuções gravadas no banco local e sai")
+    parser.add_argument('--discover-only', action='store_true',
+                        help="Mostra a URL do Power BI (cache ou HTTP) e sai, sem abrir o navegador")
+    return parser
+
+
+def print_store_status(store_path, limit=10):
+    """Lista as últimas execuções do banco local (não importa pandas nem selenium)"""
+    if not os.path.exists(store_path):
+        print(f"Banco local não encontrado: {store_path}")
+        return 1
+    
+    conn = store.connect(store_path)
+    try:
+        runs = store.list_runs(conn)
+    finally:
+        conn.close()
+    
+    print(f"📚 {len(runs)} execução(ões) em {store_path}")
+    for run in runs[:limit]:
+        print(f"  • {run['run_id']}  {run['started_at']} → {run['finished_at'] or '-'}  "
+              f"páginas={run['total_pages']}  linhas={run['total_rows']}")
+    return 0
+
+
+def print_discovered_url(page_url):
+    """Mostra a URL do Power BI encontrada via cache/HTTP (sem navegador)"""
+    embed_url = discovery.discover_embed_url(page_url)
+    if not embed_url:
+        print("❌ URL do Power BI não encontrada via HTTP (execute a extração para usar o navegador)")
+        return 1
+    print(embed_url)
+    return 0
+
+
+def extraction_summary(result):
+    """Resumo estruturado (serializável) de um resultado de run_extraction()"""
+    if result is None:
+        return {'status': 'error', 'pages': [], 'saved_files': []}
+    
+    data = result['data'] or {}
+    pages = data.get('pages', [])
+    if pages:
+        status = 'ok'
+    else:
+        status = 'queued' if data.get('queue_status') else 'empty'
+    return {
+        'status': status,
+        'embed_url': result['embed_url'],
+        'output_folder': os.path.abspath(result['output_folder']),
+        'pages': [page.get('page_number') for page in pages],
+        'failed_units': data.get('failed_units', []),
+        'total_series': sum(len(page.get('series', [])) for page in pages),
+        'saved_files': result['saved_files'],
+        # Amostras e percentis por fase/página que definiram os timeouts desta execução
+        'timings': result.get('timings', {}),
+    }
+
+
+def parse_arguments(argv=None):
+    """
+    Lê a linha de comando
+    
+    Os padrões que vêm dos submódulos e as opções validadas por eles só
+    são resolvidos depois do parse, assim --help não importa nenhum submódulo
+    (e --status/--discover-only só o que usam).
+    """
+    parser = build_arg_parser()
+    args = parser.parse_args(argv)
+    if args.status or args.discover_only:
+        # Consultas rápidas: só precisam do caminho do banco
+        args.store = resolve(args.store)
+        return args
+    for name, value in vars(args).items():
+        setattr(args, name, resolve(value))
+    if args.artifact_mode not in artifacts.MODES:
+        parser.error(f"--artifacts: modo inválido '{args.artifact_mode}' (use {', '.join(artifacts.MODES)})")
+    if args.log_level not in log.LEVELS:
+        parser.error(f"--log-level: nível inválido '{args.log_level}' (use {', '.join(log.LEVELS)})")
+    return args
+
+
+def main(argv=None):
+    """Função principal"""
+    args = parse_arguments(argv)
+    
+    # Consultas rápidas: respondem sem carregar pandas/selenium
+    if args.status:
+        return print_store_status(args.store)
+    if args.discover_only:
+        return print_discovered_url(args.page_url)
+    log.configure(level=args.log_level, json_path=args.log_json, quiet=args.quiet, previews=args.previews)
+    try:
+        return run_cli(args)
+    finally:
+        log.close()
+
+
+def run_cli(args):
+    """Executa a extração (ou consolidação) pedida na linha de comando; retorna o código de saída"""
+    if args.rebuild_rollups:
+        refreshed = rollups.refresh_rollups(args.store)
+        print(f"✓ {refreshed['rows']} linha(s) de agregados por série e {refreshed['dimension_rows']} por dimensão "
+              f"em {refreshed['partitions']} partição(ões)")
+        return 0
+    
+    print("="*70)
+    print("  EXTRATOR DE DADOS - POWER BI ONS (VIA PÁGINA ONS)")
+    print("="*70)
+    
+    mode, target_pages = parse_page_spec(args.pages)
+    
+    result = None
+    try:
+        if args.queue and not args.queue_name:
+            print("❌ --queue exige --queue-name (uma fila por extração)")
+            return 2
+        if args.queue_merge:
+            if not args.queue:
+                print("❌ --queue-merge exige --queue")
+                return 2
+            result = merge_queue_results(
+                args.queue, queue_name=args.queue_name, output_folder=args.output, prefix=args.prefix,
+                store_path=None if args.no_store else args.store,
+                json_format=args.json_format, json_compression=args.compression,
+                writer_workers=args.writer_workers,
+            )
         else:
-            print("\n❌ Nenhum dado foi extraído")
-            print("Verifique o screenshot e HTML para diagnóstico")
+            result = run_extraction(
+                page_url=args.page_url, embed_url=args.embed_url,
+                mode=mode, target_pages=target_pages, interactive=args.interactive,
+                start_date=args.start_date, end_date=args.end_date, max_pages=args.max_pages,
+                output_folder=args.output, prefix=args.prefix,
+                store_path=None if args.no_store else args.store, headless=args.headless,
+                window_days=args.window_days, workers=args.pool_size, incremental=args.incremental,
+                json_format=args.json_format, json_compression=args.compression,
+                strategies=args.strategies, slicer_filters=slicers.parse_filter_spec(args.filters) or None,
+                max_retries=args.max_retries, unit_timeout=args.unit_timeout,
+                queue=args.queue, queue_name=args.queue_name, reopen_queue=args.queue_reopen,
+                browser_contexts=args.browser_contexts,
+                memory_limits={'max_heap_mb': args.max_heap_mb, 'max_rss_mb': args.max_rss_mb},
+                timings_path=None if args.fixed_timeouts else args.timings, timeout_margin=args.timeout_margin,
+                artifact_mode=args.artifact_mode,
+                artifact_options={'folder': args.artifact_dir, 'sample_rate': args.artifact_sample_rate,
+                                  'max_mb': args.artifact_max_mb, 'max_age_days': args.artifact_max_days},
+                writer_workers=args.writer_workers,
+            )
+        
+        if result is not None:
+            data = result['data']
+            saved_files = result['saved_files']
+            output_folder = result['output_folder']
+            
+            if data and data.get('pages'):
+                print("\n" + "="*70)
+                print("✅ EXTRAÇÃO CONCLUÍDA COM SUCESSO!")
+                print("="*70)
+                print(f"\n📊 Estatísticas:")
+                print(f"  • Páginas processadas: {len(data['pages'])}")
+                print(f"  • Total de tabelas: {data['total_tables']}")
+                print(f"  • Total de cards/KPIs: {data['total_cards']}")
+                print(f"  • Total de gráficos: {data['total_charts']}")
+                print(f"\n📁 Pasta de saída: {os.path.abspath(output_folder)}")
+                print(f"\n📁 Arquivos gerados ({len(saved_files)}):")
+                for f in saved_files:
+                    file_size = os.path.getsize(f) / 1024  # KB
+                    filename = os.path.basename(f)
+                    print(f"  📄 {filename} ({file_size:.1f} KB)")
+                
+            elif data and data.get('queue_status'):
+                print("\n✅ Unidades deste worker gravadas na fila; a consolidação ficou com outro worker")
+            else:
+                print("\n❌ Nenhum dado foi extraído")
+                print(f"Verifique os artefatos de diagnóstico em {args.artifact_dir}")
         
     except Exception as e:
         print(f"\n❌ Erro durante execução: {e}")
@@ -1272,10 +2187,21 @@ def main():
         traceback.print_exc()
         
     finally:
-        print("\n🔒 Fechando navegador...")
-        driver.quit()
         print("✓ Concluído!")
+    
+    summary = extraction_summary(result)
+    if summary.get('timings'):
+        print("\n⏱️  Tempos de carregamento (base dos timeouts adaptativos):")
+        for key, stats in summary['timings'].items():
+            print(f"  • {key}: " + ", ".join(f"{name}={value}" for name, value in stats.items()))
+    log.event('run_summary', status=summary['status'], pages=len(summary['pages']),
+              failed_units=len(summary.get('failed_units', [])), files=len(summary['saved_files']), **log.summary())
+    if args.summary_json:
+        with open(args.summary_json, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2, ensure_ascii=False)
+    
+    return 0 if summary['status'] in ('ok', 'queued') else 1
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
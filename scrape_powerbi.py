@@ -1,103 +1,33 @@
-import time
 import json
-import pandas as pd
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.common.action_chains import ActionChains
-from selenium.webdriver.common.keys import Keys
 from datetime import datetime
 import os
+import sys
 
-# URL do Power BI embedado
-POWERBI_URL = "https://app.powerbi.com/view?r=eyJrIjoiYmU0ODUxNGMtNWU2MS00YTM5LThkMGYtNWFkYWQzYmU3ZWY2IiwidCI6IjNhZGVlNWZjLTkzM2UtNDkxMS1hZTFiLTljMmZlN2I4NDQ0OCIsImMiOjR9"
-
-
-def create_output_folder():
-    """Cria pasta para salvar os arquivos gerados"""
-    folder_name = f"extracao_powerbi"
-    
-    if not os.path.exists(folder_name):
-        os.makedirs(folder_name)
-        print(f"📁 Pasta criada: {folder_name}")
-    
-    return folder_name
+from ons_powerbi import network_observer
+from ons_powerbi._lazy import lazy_import
+from ons_powerbi.browser import By, setup_driver, wait_for_powerbi_iframe
+from ons_powerbi.output import create_output_folder
 
+pd = lazy_import('pandas')
 
-def setup_driver():
-    """Configura o Chrome com opções para capturar requisições de rede"""
-    options = Options()
-    # options.add_argument('--headless')  # Descomente para executar sem interface
-    options.add_argument('--no-sandbox')
-    options.add_argument('--disable-dev-shm-usage')
-    options.add_argument('--disable-blink-features=AutomationControlled')
-    
-    # Habilita logging de performance para capturar requisições
-    options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
-    
-    driver = webdriver.Chrome(options=options)
-    driver.maximize_window()
-    return driver
+# URL do Power BI embedado (pode ser informada como argumento: python scrape_powerbi.py <url>)
+POWERBI_URL = "https://app.powerbi.com/view?r=eyJrIjoiYmU0ODUxNGMtNWU2MS00YTM5LThkMGYtNWFkYWQzYmU3ZWY2IiwidCI6IjNhZGVlNWZjLTkzM2UtNDkxMS1hZTFiLTljMmZlN2I4NDQ0OCIsImMiOjR9"
 
-def wait_for_powerbi_load(driver, timeout=60):
-    """Aguarda o Power BI carregar completamente"""
-    print("Aguardando Power BI carregar...")
-    
-    # Aguarda elementos específicos do Power BI
-    wait = WebDriverWait(driver, timeout)
-    
-    try:
-        # Aguarda iframe principal carregar
-        wait.until(EC.frame_to_be_available_and_switch_to_it((By.TAG_NAME, "iframe")))
-        print("✓ Iframe carregado")
-        
-        # Aguarda visualizações carregarem
-        time.sleep(15)  # Power BI precisa de tempo para renderizar
-        
-        # Tenta encontrar elementos visuais
-        visual_loaded = wait.until(EC.presence_of_element_located((
-            By.XPATH, 
-            "//div[contains(@class, 'visual') or contains(@class, 'card')]"
-        )))
-        print("✓ Visualizações carregadas")
-        
-        return True
-        
-    except Exception as e:
-        print(f"⚠️  Timeout ao aguardar Power BI: {e}")
-        driver.switch_to.default_content()
-        return False
 
-def extract_network_requests(driver, output_folder="."):
+def extract_network_requests(driver, output_folder=".", observer=None):
     """Extrai requisições de rede que podem conter dados"""
     print("\nExtraindo requisições de rede...")
     
-    logs = driver.get_log('performance')
-    network_data = []
+    # Esvazia o buffer do log (apenas eventos de rede relevantes são decodificados)
+    observer = observer or network_observer.NetworkObserver(driver)
+    observer.drain()
+    network_data = list(observer.entries)
     
-    for entry in logs:
-        try:
-            log = json.loads(entry['message'])['message']
-            
-            # Procura por requisições de resposta
-            if log['method'] == 'Network.responseReceived':
-                response = log['params']['response']
-                url = response.get('url', '')
-                
-                # Filtra requisições do Power BI que podem conter dados
-                if any(keyword in url.lower() for keyword in ['query', 'data', 'api', 'execute']):
-                    network_data.append({
-                        'url': url,
-                        'status': response.get('status'),
-                        'mimeType': response.get('mimeType'),
-                        'requestId': log['params']['requestId']
-                    })
-                    print(f"✓ Requisição encontrada: {url[:100]}...")
-        
-        except Exception as e:
-            continue
+    for request in network_data:
+        print(f"✓ Requisição encontrada: {request['url'][:100]}...")
+    
+    stats = observer.stats()
+    print(f"  ({stats['events_seen']} eventos lidos, {stats['events_parsed']} decodificados)")
     
     # Salva requisições encontradas
     if network_data:
@@ -241,7 +171,7 @@ def extract_visual_data(driver, output_folder="."):
     
     return all_data
 
-def main():
+def main(powerbi_url=POWERBI_URL):
     print("="*60)
     print("EXTRATOR DE DADOS DO POWER BI")
     print("="*60)
@@ -249,14 +179,22 @@ def main():
     # Cria pasta para salvar os arquivos
     output_folder = create_output_folder()
     
-    driver = setup_driver()
+    # Mesmas opções de sempre deste script; '--headless=new' pode ser ativado com setup_driver(headless=True)
+    driver = setup_driver(capture_network=True, maximize=True, tuned=False,
+                          extra_arguments=('--disable-blink-features=AutomationControlled',))
+    if driver is None:
+        return
     
     try:
-        print(f"\nAcessando Power BI: {POWERBI_URL}")
-        driver.get(POWERBI_URL)
+        print(f"\nAcessando Power BI: {powerbi_url}")
+        driver.get(powerbi_url)
+        observer = network_observer.NetworkObserver(driver)
         
         # Aguarda Power BI carregar
-        if wait_for_powerbi_load(driver):
+        loaded = wait_for_powerbi_iframe(driver)
+        observer.drain()  # mantém o buffer do log pequeno durante a execução
+        
+        if loaded:
             
             # Extrai dados visuais
             visual_data = extract_visual_data(driver, output_folder=output_folder)
@@ -265,7 +203,7 @@ def main():
             driver.switch_to.default_content()
             
             # Extrai requisições de rede
-            network_data = extract_network_requests(driver, output_folder=output_folder)
+            network_data = extract_network_requests(driver, output_folder=output_folder, observer=observer)
             
             print("\n" + "="*60)
             print("EXTRAÇÃO CONCLUÍDA!")
@@ -291,4 +229,4 @@ def main():
         driver.quit()
 
 if __name__ == "__main__":
-    main()
+    main(sys.argv[1] if len(sys.argv) > 1 else POWERBI_URL)
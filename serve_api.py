@@ -0,0 +1,31 @@
+"""
+API HTTP local de leitura das séries gravadas no banco local
+
+Uso:
+    python serve_api.py [--store extracao_powerbi/ons_powerbi.sqlite] [--port 8765]
+
+Ver ons_powerbi/read_api.py para as rotas e formatos.
+"""
+
+import argparse
+import sys
+
+from ons_powerbi import read_api, store
+
+
+def main(argv=None):
+    """Sobe a API com as opções da linha de comando"""
+    parser = argparse.ArgumentParser(description="API local de leitura das séries extraídas")
+    parser.add_argument('--store', default=store.DEFAULT_DB_PATH, help="Banco SQLite local")
+    parser.add_argument('--host', default=read_api.DEFAULT_HOST, help="Endereço de escuta")
+    parser.add_argument('--port', type=int, default=read_api.DEFAULT_PORT, help="Porta")
+    parser.add_argument('--reload-interval', type=int, default=read_api.DEFAULT_RELOAD_INTERVAL,
+                        help="Intervalo (s) da verificação de novas execuções")
+    args = parser.parse_args(argv)
+
+    read_api.serve(args.store, host=args.host, port=args.port, reload_interval=args.reload_interval)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())